@@ -1,13 +1,13 @@
 # buy_option.py
 from error_handler import error_log_and_discord_message
-from order_handler import get_unique_order_id_and_is_active, manage_active_order
+from order_handler import manage_active_order
 from submit_order import find_what_to_buy, submit_option_order, get_order_status
-from utils.order_utils import get_expiration, calculate_quantity, build_active_order
+from utils.order_utils import get_expiration, calculate_quantity, build_active_order, log_order_details
 from utils.json_utils import read_config
+from utils.position_manager import POSITIONS
 from data_acquisition import get_account_balance, add_markers
 from print_discord_messages import print_discord
 from datetime import datetime
-import asyncio
 
 message_ids_dict = {}
 used_buying_power = {}
@@ -23,16 +23,11 @@ def reset_usedBP_messageIDs():
     used_buying_power.clear()
     message_ids_dict.clear()
 
-async def buy_option_cp(real_money_activated, ticker_symbol, cp, TP_value, session, headers, strategy_name):
-    unique_order_id, current_order_active = get_unique_order_id_and_is_active()
-    prev_option_type = unique_order_id.split('-')[1] if unique_order_id else None
-
-    if current_order_active: # and prev_option_type == cp: Trying to keep it simple
-        return False, None, None, None, None, "Another Order Active."
-    #elif current_order_active and prev_option_type != cp:
-        # IDK if we should keep this because it auto got out of a order and tried to get into another one while seniment was 0. idk if thats in accordance to this strategy.
-        # Sell the current active order if it's of a different type
-        #await sell_rest_of_active_order(message_ids_dict, "Switching option type.")
+async def buy_option_cp(real_money_activated, ticker_symbol, cp, TP_value, session, headers, strategy_name, entry_context=None):
+    # Open positions limit (`MAX_OPEN_POSITIONS`), the exposure limit is checked once the order cost is known
+    can_open, reason = POSITIONS.can_open()
+    if not can_open:
+        return False, None, None, None, None, reason
 
     try:
         bid = None
@@ -79,6 +74,10 @@ Order Cost Buffer exceded BP
 """)
             return False, None, None, None, None, "Not Enough Buying Power."
 
+        can_open, reason = POSITIONS.can_open(order_cost)
+        if not can_open: # `MAX_EXPOSURE_PERCENTAGE` of the start-of-day balance across all open positions
+            return False, None, None, None, None, reason
+
         if real_money_activated: 
             order_result = await submit_option_order(strategy_name, ticker_symbol, strike_price, cp, bid, expiration_date, quantity, side, order_type)
             
@@ -110,13 +109,19 @@ Order Cost Buffer exceded BP
             await add_markers("buy", None, None, 0)
             used_buying_power[active_order['order_id']] = (active_order["entry_price"] * 100) * active_order["quantity"]
         
-        # Start Managing Order
-        asyncio.create_task(
-            manage_active_order(active_order, message_ids_dict),
-            name=f"OrderManaging_{active_order['order_id']}"
+        order_cost = (active_order["entry_price"] * 100) * active_order["quantity"]
+
+        # Journal the entry before management starts updating it (`entry_context`: candle type etc. from the caller)
+        log_order_details(
+            active_order['order_id'], **(entry_context or {}),
+            time_entered=datetime.now().isoformat(timespec="seconds"), ticker_symbol=ticker_symbol,
+            strike_price=float(strike_price), option_type=cp, expiration_date=expiration_date,
+            order_quantity=active_order["quantity"], order_bid_price=active_order["entry_price"], total_investment=order_cost
         )
+
+        # Start Managing Order (registered before we return, so the next entry sees it in the limits)
+        await manage_active_order(active_order, message_ids_dict)
         
-        order_cost = (active_order["entry_price"] * 100) * active_order["quantity"]
         return True, strike_price, active_order["quantity"], active_order["entry_price"], order_cost, None
 
     except Exception as e:
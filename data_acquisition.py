@@ -16,6 +16,8 @@ from utils.json_utils import read_config
 from utils.data_utils import get_dates
 from utils.file_utils import get_current_candle_index
 from paths import pretty_path, get_merged_ema_csv_path, MARKERS_PATH
+from storage.warmup_cache import get_warmup_history
+from utils.quote_book import QUOTES
 
 RETRY_INTERVAL = 1  # Seconds between reconnection attempts
 should_close = False  # Global variable to signal if the WebSocket should close
@@ -160,6 +162,108 @@ def get_session_id(retry_attempts=3, backoff_factor=1):
     print_log("[TRADIER] Failed to get session ID after retries.")
     return None
 
+# ───🔹 OPTION QUOTES ─────────────────────────────
+
+class OptionQuoteStream:
+    """
+    One Tradier `markets/events` websocket carrying `quote` events for the option
+    contracts we hold (OCC symbols), written into the local `QUOTES` book.
+    Starts on the first `watch()`, stops when nothing is watched anymore. Sending
+    a new payload on the open socket replaces its symbol list, so adding/removing
+    a contract doesn't reconnect.
+    """
+    URL = "wss://ws.tradier.com/v1/markets/events"
+
+    def __init__(self, book=QUOTES):
+        self.book = book
+        self.symbols = set()
+        self._ws = None
+        self._session_id = None
+        self._task = None
+
+    def watch(self, occ_symbol):
+        if occ_symbol in self.symbols:
+            return
+        self.symbols.add(occ_symbol)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="OptionQuoteStream")
+        else:
+            asyncio.create_task(self._resubscribe())
+
+    def unwatch(self, occ_symbol):
+        self.symbols.discard(occ_symbol)
+        self.book.discard(occ_symbol)
+        if not self.symbols:
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+        else:
+            asyncio.create_task(self._resubscribe())
+
+    def _payload(self):
+        return json.dumps({
+            "symbols": sorted(self.symbols),
+            "sessionid": self._session_id,
+            "filter": ["quote"],
+            "linebreak": True
+        })
+
+    async def _resubscribe(self):
+        if self._ws is None or not self.symbols:
+            return  # `_run()` sends the current list when it (re)connects
+        try:
+            await self._ws.send(self._payload())
+        except Exception as e:
+            print_log(f"[QUOTES] Resubscribe failed, will resend on reconnect: {e}")
+
+    async def _run(self):
+        headers = {
+            "Authorization": f"Bearer {cred.TRADIER_BROKERAGE_ACCOUNT_ACCESS_TOKEN}",
+            "Accept": "application/json"
+        }
+        while self.symbols:
+            try:
+                self._session_id = await asyncio.to_thread(get_session_id)
+                if not self._session_id:
+                    await asyncio.sleep(RETRY_INTERVAL)
+                    continue
+                async with websockets.connect(
+                    self.URL, ssl=True, compression=None, extra_headers=headers,
+                    ping_interval=20, ping_timeout=30
+                ) as websocket:
+                    self._ws = websocket
+                    await websocket.send(self._payload())
+                    print_log(f"[QUOTES] Streaming quotes for {sorted(self.symbols)}")
+                    async for message in websocket:
+                        for line in message.splitlines():
+                            if line.strip():
+                                self.book.apply(json.loads(line))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print_log(f"[QUOTES] Stream dropped ({e}); REST quotes until it reconnects.")
+                await asyncio.sleep(RETRY_INTERVAL)
+            finally:
+                self._ws = None
+
+quote_stream = OptionQuoteStream()
+
+async def fetch_option_quotes(session, headers, occ_symbols, book=QUOTES):
+    """
+    REST fallback: one `markets/quotes?symbols=` call for just these contracts, on the
+    caller's pooled aiohttp session. Updates `book`, returns how many quotes came back.
+    """
+    url = f"{cred.TRADIER_BROKERAGE_BASE_URL}markets/quotes"
+    async with session.get(url, params={"symbols": ",".join(occ_symbols), "greeks": "false"}, headers=headers) as response:
+        if response.status != 200:
+            print_log(f"    [QUOTES] markets/quotes returned {response.status}: {await response.text()}")
+            return 0
+        payload = await response.json()
+    quotes = (payload.get("quotes") or {}).get("quote") or []
+    if isinstance(quotes, dict):  # a single symbol comes back as an object, not a list
+        quotes = [quotes]
+    return sum(book.apply(q) for q in quotes)
+
 async def is_market_open():
     """Check if the stock market is open today using Polygon.io API."""
     url = "https://api.polygon.io/v1/marketstatus/now"
@@ -314,52 +418,40 @@ async def add_markers(event_type, x=None, y=None, percentage=None, tf="2M"):
 
 async def get_candle_data_and_merge(candle_interval, candle_timescale, am_label, pm_label, indent_lvl, timeframe):
     max_ema_window = max([window for window, _ in read_config("EMAS")])
-    combined_df = pd.DataFrame()
-    day_offset = 1
     indent_pad = indent(indent_lvl)
+    symbol = read_config('SYMBOL')
 
     print_log(f"{indent_pad}[GCDAM] Trying to gather at least {max_ema_window} candles for {timeframe}...")
 
-    # Fetch premarket of current day first
-    start_date, end_date = get_dates(1, True)
-    pre_df = await get_certain_candle_data(
-        cred.POLYGON_API_KEY,
-        read_config('SYMBOL'),
-        candle_interval,
-        candle_timescale,
-        start_date,
-        end_date,
-        None,
-        "PREMARKET",
-        indent_lvl+1
-    )
-    if pre_df is not None:
-        combined_df = pd.concat([combined_df, pre_df], ignore_index=True)
-
-    # If that's not enough, keep pulling full day candles
-    while len(combined_df) < max_ema_window:
-        day_offset += 1
-        start_date, end_date = get_dates(day_offset, True)
+    async def _fetch_full_day(day):
+        return await get_certain_candle_data(
+            cred.POLYGON_API_KEY, symbol, candle_interval, candle_timescale,
+            day, day, None, "ALL", indent_lvl+1
+        )
 
-        full_df = await get_certain_candle_data(
+    # Today's premarket is still growing (delayed feed) so it is fetched fresh;
+    # the older days come from the warm-up cache (fetched once per session).
+    start_date, end_date = get_dates(1, True)
+    pre_df, history_df = await asyncio.gather(
+        get_certain_candle_data(
             cred.POLYGON_API_KEY,
-            read_config('SYMBOL'),
+            symbol,
             candle_interval,
             candle_timescale,
             start_date,
             end_date,
             None,
-            "ALL",
+            "PREMARKET",
             indent_lvl+1
-        )
-        if full_df is not None:
-            combined_df = pd.concat([full_df, combined_df], ignore_index=True)  # prepend older candles
-
-        print_log(f"{indent_pad}→ Total gathered: {len(combined_df)} candles after offset {day_offset}")
+        ),
+        get_warmup_history(timeframe, max_ema_window, _fetch_full_day, start_date, indent_lvl+1),
+    )
 
-        if day_offset > 10:
-            print_log(f"{indent_pad}[WARN] Reached 10-day limit. Still short of {max_ema_window} candles.")
-            break
+    frames = [df for df in (history_df, pre_df) if df is not None and not df.empty]
+    combined_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if not combined_df.empty:
+        combined_df = combined_df.drop_duplicates("timestamp", keep="last").reset_index(drop=True)
+    print_log(f"{indent_pad}→ Total gathered: {len(combined_df)} candles")
 
     # Final check
     if len(combined_df) < max_ema_window:
@@ -398,7 +490,7 @@ async def get_certain_candle_data(api_key, symbol, interval, timescale, start_da
     url = f"https://api.polygon.io/v2/aggs/ticker/{symbol}/range/{interval}/{timescale}/{start_date}/{end_date}?adjusted=true&sort=asc&apiKey={api_key}"
 
     try:
-        response = requests.get(url)
+        response = await asyncio.to_thread(requests.get, url, timeout=15)  # keep the event loop free
         response.raise_for_status()
 
         data = response.json()
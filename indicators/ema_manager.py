@@ -1,16 +1,14 @@
 # indicators/ema_manager.py
 from shared_state import indent, print_log, safe_read_json, safe_write_json
 from data_acquisition import get_candle_data_and_merge
-from utils.json_utils import reset_json, initialize_json
 from paths import (
-    get_ema_path,
     AFTERMARKET_EMA_PATH,
     PREMARKET_EMA_PATH,
     MERGED_EMA_PATH,
     EMA_STATE_PATH,
 )
 from utils.file_utils import get_current_candle_index
-from utils.ema_utils import calculate_save_EMAs
+from utils.ema_utils import calculate_save_EMAs, seed_ema_engine
 from datetime import datetime, timedelta, time
 import pytz
 import os
@@ -127,6 +125,11 @@ def _remove_merge_artifacts():
         if os.path.exists(p):
             os.remove(p)
 
+def _seed_from_history(tf: str, history):
+    """Warm the incremental EMA engine from the merged pre/after-market history (starts empty if unavailable)."""
+    closes = history["close"].tolist() if history is not None and "close" in history else []
+    seed_ema_engine(tf, closes)
+
 def _get_open_plus_15() -> time:
     today = datetime.now(NY_TZ).date()
     mo = datetime.combine(today, MARKET_OPEN)
@@ -155,10 +158,6 @@ async def update_ema(candle: dict, timeframe: str):
     now_time = datetime.now(NY_TZ).time()
     open_plus_15 = _get_open_plus_15()
 
-    # EMA output file (list of snapshots with 'x' and per-window values)
-    ema_path = get_ema_path(timeframe)
-    initialize_json(ema_path, [])
-
     indent_pad = indent(1)
 
     # ---- PRE 09:45 ET ----
@@ -171,7 +170,7 @@ async def update_ema(candle: dict, timeframe: str):
 
         # Keep temp EMAs consistent and isolated
         _remove_merge_artifacts()
-        await get_candle_data_and_merge(
+        history = await get_candle_data_and_merge(
             int(timeframe.replace("M", "").replace("m", "")),
             "minute",
             "AFTERMARKET",
@@ -179,7 +178,7 @@ async def update_ema(candle: dict, timeframe: str):
             2,
             timeframe,
         )
-        reset_json(ema_path, [])
+        _seed_from_history(timeframe, history)
 
         # Rebuild temp EMAs from today's buffer only
         clist = st["candle_list"]
@@ -194,7 +193,7 @@ async def update_ema(candle: dict, timeframe: str):
     if not st.get("has_calculated", False):
         # One-time finalize: get merged history, replay buffer, flip flag, clear buffer
         print_log(f"{indent_pad}[EMA CS] Finalizing EMAs after first 15 minutes for {timeframe}...")
-        await get_candle_data_and_merge(
+        history = await get_candle_data_and_merge(
             int(timeframe.replace("M", "").replace("m", "")),
             "minute",
             "AFTERMARKET",
@@ -202,7 +201,7 @@ async def update_ema(candle: dict, timeframe: str):
             2,
             timeframe,
         )
-        reset_json(ema_path, [])
+        _seed_from_history(timeframe, history)
 
         # Replay buffered pre-open/open candles
         clist = st["candle_list"]
@@ -1,12 +1,17 @@
 # indicators/flag_manager.py
+import asyncio
 import glob
 import os
 import math
 import json
+import bisect
 from pathlib import Path
+from typing import NamedTuple
 from shared_state import indent, print_log, safe_read_json, safe_write_json
 from utils.json_utils import read_config
 from utils.data_utils import check_valid_points
+from utils.event_bus import BarClosed, FlagsCompleted, subscribe, publish
+from error_handler import error_log_and_discord_message
 from paths import pretty_path, LINE_DATA_PATH, STATES_DIR
 
 # ----------------------
@@ -15,11 +20,137 @@ from paths import pretty_path, LINE_DATA_PATH, STATES_DIR
 
 USE_DICT_STATE = True  # Set to True to use in-memory dictionary storage
 STATE_MEMORY = {}  # Holds state files in memory when USE_DICT_STATE is True
+TRACKERS = {}  # state name -> FlagTracker (running regression sums), rebuilt from `candle_points` when missing
+USE_DICT_LINE_DATA = False  # True keeps trendlines in `LINE_DATA_MEMORY` instead of re-writing `line_data.json` per update (backtests)
+LINE_DATA_MEMORY = {"active_flags": [], "completed_flags": []}
+
+# ----------------------
+# 📐 Flag Points & Tracker
+# ----------------------
+
+PRICE_SCALE = 1_000_000  # Y values are summed as integer micro-units, same 1e-6 tolerance the filters use
+
+def _price_key(y):
+    return round(y * PRICE_SCALE)
+
+class FlagPoint(NamedTuple):
+    """A flag candle point (NamedTuple => `__slots__ = ()`, still JSON-serializable as [X, Y, HL])."""
+    x: int      # candle index
+    y: float    # open/close extreme used for the trendline
+    hl: float   # high (bull) or low (bear) wick
+
+def as_point(p):
+    return p if isinstance(p, FlagPoint) or p is None else FlagPoint(*p)
+
+class FlagTracker:
+    """
+    Points of one flag (start point + candle points, ordered by X) with running
+    regression sums, so adding/removing a point and re-fitting the line is O(1)
+    regardless of how long the flag is. Y sums are exact integers (micro-units),
+    so removals never drift.
+    """
+    __slots__ = ("start", "points", "_xs", "n", "sx", "sxx", "sy", "sxy")
+
+    def __init__(self, start_point=None, points=()):
+        self.reset(start_point, points)
+
+    def reset(self, start_point, points=()):
+        self.start = as_point(start_point)
+        self.points, self._xs = [], []
+        self.n = self.sx = self.sxx = self.sy = self.sxy = 0
+        if self.start is not None:
+            self._add_sums(self.start, 1)
+        for p in points:
+            self.add(p)
+        return self
+
+    def _add_sums(self, p, sign):
+        x, yq = p[0], _price_key(p[1])
+        self.n += sign
+        self.sx += sign * x
+        self.sxx += sign * x * x
+        self.sy += sign * yq
+        self.sxy += sign * x * yq
+
+    def add(self, point):
+        p = as_point(point)
+        if not self._xs or p.x > self._xs[-1]:  # the live case: new candle index
+            self.points.append(p)
+            self._xs.append(p.x)
+        else:
+            i = bisect.bisect_left(self._xs, p.x)
+            if i < len(self._xs) and self._xs[i] == p.x:
+                return p  # already tracked
+            self.points.insert(i, p)
+            self._xs.insert(i, p.x)
+        self._add_sums(p, 1)
+        return p
+
+    def pop(self):
+        """Drop the newest point (highest X)."""
+        p = self.points.pop()
+        self._xs.pop()
+        self._add_sums(p, -1)
+        return p
+
+    def retain(self, kept_points):
+        """Keep only `kept_points` (a subset, ordered by X); sums lose what was dropped."""
+        kept = [as_point(p) for p in kept_points]
+        kept_x = {p.x for p in kept}
+        for p in self.points:
+            if p.x not in kept_x:
+                self._add_sums(p, -1)
+        self.points = kept
+        self._xs = [p.x for p in kept]
+
+    def matches(self, start_point, candle_points):
+        return self.start == as_point(start_point) and len(self.points) == len(candle_points)
+
+    def fit(self):
+        """Least-squares (slope, mean_intercept) through start + points, None if undefined."""
+        den = self.n * self.sxx - self.sx * self.sx
+        if self.n == 0 or den == 0:
+            return None
+        slope = (self.n * self.sxy - self.sx * self.sy) / (den * PRICE_SCALE)
+        intercept = self.sy / (self.n * PRICE_SCALE) - slope * (self.sx / self.n)
+        return slope, intercept
+
+    def all_points(self):
+        return [self.start] + self.points if self.start is not None else list(self.points)
+
+def get_tracker(state_name, start_point, candle_points):
+    """The state's tracker, rebuilt only if it no longer mirrors the stored points."""
+    tracker = TRACKERS.get(state_name)
+    if tracker is None or not tracker.matches(start_point, candle_points):
+        tracker = FlagTracker(start_point, candle_points)
+        TRACKERS[state_name] = tracker
+    return tracker
 
 # ----------------------
 # 🚩 Flag Detection & Breakout Processing
 # ----------------------
 
+def start_flag_detector(timeframe="2M", indent_lvl=2, print_satements=False):
+    """
+    Subscribe to closed `timeframe` bars and run `identify_flag()` on each one,
+    publishing a `FlagsCompleted` per bar (empty `flag_names` when nothing broke out).
+    Subscribes before returning, so no bar published after this call is missed.
+    """
+    sub = subscribe(BarClosed, name="flag detector", timeframe=timeframe)
+    return asyncio.create_task(_run_flag_detector(sub, indent_lvl, print_satements), name="FlagDetector")
+
+async def _run_flag_detector(sub, indent_lvl, print_satements):
+    try:
+        async for bar in sub:
+            try:
+                completed = await identify_flag(bar.as_candle(zone_type="None"), indent_lvl, print_satements)
+            except Exception as e:
+                await error_log_and_discord_message(e, "flag_manager", "_run_flag_detector")
+                continue
+            publish(FlagsCompleted(bar, tuple(completed)))
+    finally:
+        sub.close()
+
 async def identify_flag(candle, indent_lvl=2, print_satements=True):
     completed_flag_names = []
     ensure_states_dir_exists(STATES_DIR)
@@ -28,6 +159,7 @@ async def identify_flag(candle, indent_lvl=2, print_satements=True):
     for state_file_path in state_files:
         state = get_state(state_file_path, indent_lvl)
         flag_type, flag_names, start_point, slope, intercept, point_type, candle_points, breakout_info = unpack_state(state)
+        tracker = get_tracker(state_file_path, start_point, candle_points)
 
         if print_satements:
             print_log(f"{indent(indent_lvl-1)}[IDF] {flag_type}, '{state_file_path}'")
@@ -39,13 +171,14 @@ async def identify_flag(candle, indent_lvl=2, print_satements=True):
                 if slope is not None and intercept is not None:
                     slope, intercept, flag_names, breakout_info, completed_flag_names, point_type, candle_points = await process_breakout_detection(
                         indent_lvl+1, slope, intercept, candle, flag_type, point_type, candle_points, start_point,
-                        completed_flag_names, flag_names, breakout_info, print_satements, state_file_path)
+                        completed_flag_names, flag_names, breakout_info, print_satements, state_file_path, tracker)
 
                 start_point, candle_points, slope, intercept, point_type = await start_new_flag_values(
                     indent_lvl+1, candle, flag_type, current_oc_high, current_oc_low, print_satements)
+                tracker.reset(start_point)
                 breakout_info = return_breakout_info_setup(None, False)
             else:
-                candle_points = add_candle_to_candle_points(flag_type, candle, candle_points)
+                candle_points = add_candle_to_candle_points(flag_type, candle, candle_points, tracker)
 
             total_candles = 1 + len(candle_points)
             if print_satements:
@@ -53,7 +186,7 @@ async def identify_flag(candle, indent_lvl=2, print_satements=True):
 
             if total_candles >= read_config('FLAGPOLE_CRITERIA')['MIN_NUM_CANDLES'] and (slope is None or intercept is None):
                 slope, intercept, first_point, second_point = calculate_slope_intercept(
-                    indent_lvl+1, candle_points, start_point, flag_type, print_satements)
+                    indent_lvl+1, candle_points, start_point, flag_type, print_satements, tracker=tracker)
                 state_id = os.path.basename(state_file_path).replace(".json", "")
                 line_name = f"{state_id}_flag_{flag_type}"
                 update_line_data(indent_lvl+1, line_name, flag_type, status="active", point_1=first_point, point_2=second_point, print_statements=print_satements)
@@ -64,7 +197,7 @@ async def identify_flag(candle, indent_lvl=2, print_satements=True):
                     print_log(f"{indent(indent_lvl)}[IDF PBD 2] process_breakout_detection()")
                 slope, intercept, flag_names, breakout_info, completed_flag_names, point_type, candle_points = await process_breakout_detection(
                     indent_lvl+1, slope, intercept, candle, flag_type, point_type, candle_points, start_point,
-                    completed_flag_names, flag_names, breakout_info, print_satements, state_file_path)
+                    completed_flag_names, flag_names, breakout_info, print_satements, state_file_path, tracker)
 
         else:
             if print_satements:
@@ -75,7 +208,7 @@ async def identify_flag(candle, indent_lvl=2, print_satements=True):
     manage_states(1, print_satements=print_satements)
     return completed_flag_names
 
-async def process_breakout_detection(indent_lvl, slope, intercept, candle, flag_type, point_type, candle_points, start_point, completed_flag_names, flag_names, breakout_info, print_satements, state_file_path):
+async def process_breakout_detection(indent_lvl, slope, intercept, candle, flag_type, point_type, candle_points, start_point, completed_flag_names, flag_names, breakout_info, print_satements, state_file_path, tracker=None):
     trendline_y = slope * candle['candle_index'] + intercept
     if print_satements:
         print_log(f"{indent(indent_lvl)}[PBD] Slope: {slope}; Intercept: {intercept}")
@@ -86,6 +219,8 @@ async def process_breakout_detection(indent_lvl, slope, intercept, candle, flag_
 
     current_point = formated_candle_point(flag_type, candle)
     candle_points, point_type = filter_candles(indent_lvl+1, start_point, candle_points, current_point, flag_type, print_satements, point_type)
+    if tracker is not None:
+        tracker.retain(candle_points)
     
     if print_satements:
         print_log(f'{indent(indent_lvl)}[PBD] Last Candle Breakout Active? [{breakout_info["is_active"]}]')
@@ -115,7 +250,7 @@ async def process_breakout_detection(indent_lvl, slope, intercept, candle, flag_
         if success:
             completed_flag_names.append(completed_flag)
 
-    slope, intercept, first_point, second_point = calculate_slope_intercept(indent_lvl+1, candle_points, start_point, flag_type, print_satements, current_point[0])
+    slope, intercept, first_point, second_point = calculate_slope_intercept(indent_lvl+1, candle_points, start_point, flag_type, print_satements, current_point[0], tracker)
     update_line_data(indent_lvl+1, line_name, flag_type, status="active", point_1=first_point, point_2=second_point, print_statements=print_satements)
     breakout_info = return_breakout_info_setup(current_point, True) if detected else return_breakout_info_setup(None, False)
 
@@ -149,7 +284,7 @@ async def check_for_bullish_breakout(indent_lvl, candle, trendline_y, print_sate
 
 def handle_breakout(indent_lvl, line_type, line_name, print_satements):
     #check if points are valid
-    vp_1, vp_2, line_degree_angle, correct_flag = check_valid_points(indent_lvl+1, line_name, line_type, print_satements) #vp means valid point
+    vp_1, vp_2, line_degree_angle, correct_flag = check_valid_points(indent_lvl+1, line_name, line_type, print_satements, line_data=read_line_data(indent_lvl+1)) #vp means valid point
     if print_satements:
         print_log(f"{indent(indent_lvl)}[HB CONDITIONS] {line_name}: {vp_1}, {vp_2}, {line_degree_angle}, {correct_flag}")
     
@@ -185,7 +320,7 @@ async def start_new_flag_values(indent_level, candle, candle_flag_type, current_
     # Set new starting point
     current_hl = candle['high'] if candle_flag_type == "bull" else candle['low']
     important_candle_value = current_oc_high if candle_flag_type == "bull" else current_oc_low
-    start_point = (candle['candle_index'], important_candle_value, current_hl)
+    start_point = FlagPoint(candle['candle_index'], important_candle_value, current_hl)
     if print_satements:
         print_log(f"{indent(indent_level)}[SNFV] {'Highest' if candle_flag_type=='bull' else 'Lowest'} Point: {start_point}")
     point_type = {
@@ -195,14 +330,25 @@ async def start_new_flag_values(indent_level, candle, candle_flag_type, current_
 
     return start_point, [], None, None, point_type
 
-def update_line_data(indent_lvl, line_name, line_type, status=None, point_1=None, point_2=None, print_statements=True):
-    data = safe_read_json(LINE_DATA_PATH, default={}, indent_lvl=indent_lvl+1)
-
+def read_line_data(indent_lvl=1):
+    """`{"active_flags": [...], "completed_flags": [...]}`, from memory or `line_data.json` (see `USE_DICT_LINE_DATA`)."""
+    if USE_DICT_LINE_DATA:
+        return LINE_DATA_MEMORY
+    data = safe_read_json(LINE_DATA_PATH, default={}, indent_lvl=indent_lvl)
     if not isinstance(data, dict):
         data = {}
-
     data.setdefault("active_flags", [])
     data.setdefault("completed_flags", [])
+    return data
+
+def write_line_data(data, indent_lvl=1):
+    if USE_DICT_LINE_DATA:
+        LINE_DATA_MEMORY.update(data)
+        return True
+    return safe_write_json(LINE_DATA_PATH, data, indent_lvl=indent_lvl)
+
+def update_line_data(indent_lvl, line_name, line_type, status=None, point_1=None, point_2=None, print_statements=True):
+    data = read_line_data(indent_lvl+1)
     
     # Define the updated flag line entry
     line_data = {
@@ -214,7 +360,7 @@ def update_line_data(indent_lvl, line_name, line_type, status=None, point_1=None
 
     if status == "complete":
         # Give completed flags a new unique name to avoid overwriting
-        completed_name = f"{line_name}_{count_flags(line_type)}"
+        completed_name = f"{line_name}_{count_flags(line_type, data)}"
         line_data["name"] = completed_name
         data["completed_flags"].append(line_data)
     else:
@@ -222,7 +368,7 @@ def update_line_data(indent_lvl, line_name, line_type, status=None, point_1=None
         data["active_flags"] = [line for line in data["active_flags"] if line["name"] != line_name]
         data["active_flags"].append(line_data)
 
-    saved_correctly = safe_write_json(LINE_DATA_PATH, data, indent_lvl=indent_lvl+1)
+    saved_correctly = write_line_data(data, indent_lvl+1)
     
     if print_statements:
         status_msg = "SAVED" if saved_correctly else "FALIED to save"
@@ -231,24 +377,28 @@ def update_line_data(indent_lvl, line_name, line_type, status=None, point_1=None
 
     return line_data["name"]
 
-def count_flags(flag_type):
+def count_flags(flag_type, data=None):
     """
     Counts all flags (active + completed) of a specific type.
     """
-    try:
-        with open(LINE_DATA_PATH, 'r') as file:
-            data = json.load(file)
-            all_flags = data.get("active_flags", []) + data.get("completed_flags", [])
-            return len([flag for flag in all_flags if flag.get('type') == flag_type])
-    except (FileNotFoundError, json.JSONDecodeError):
-        return 0
+    if data is None:
+        if USE_DICT_LINE_DATA:
+            data = LINE_DATA_MEMORY
+        else:
+            try:
+                with open(LINE_DATA_PATH, 'r') as file:
+                    data = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return 0
+    all_flags = data.get("active_flags", []) + data.get("completed_flags", [])
+    return len([flag for flag in all_flags if flag.get('type') == flag_type])
 
 def get_active_flag_point_1(line_name, indent_lvl=0):
     """
     Retrieves the 'point_1' from an active flag in line_data.json using the given line_name.
     """
     try:
-        data = safe_read_json(LINE_DATA_PATH, default={}, indent_lvl=indent_lvl+1)
+        data = read_line_data(indent_lvl+1)
         for flag in data.get("active_flags", []):
             if flag["name"] == line_name:
                 return flag.get("point_1", (None, None))
@@ -387,6 +537,7 @@ def manage_states(indent_lvl, print_satements=True):
                 del STATE_MEMORY[state_file]
             else:
                 os.remove(state_file)
+            TRACKERS.pop(state_file, None)
             if print_satements:
                 print_log(f"{indent(indent_lvl)}[MSF] Removed duplicate state: `{pretty_path(state_file)}`")
         else:
@@ -411,9 +562,10 @@ def update_state(state_file_path, flag_names, flag_type, start_point, slope, int
         "point_type": point_type
     })
 
-    # Update candle points (remove duplicates and sort)
-    new_candle_points = [tuple(cp) for cp in candle_points if cp[0] > start_point[0]]
-    state["candle_points"] = sorted(set(new_candle_points), key=lambda x: x[0]) if new_candle_points else []
+    # Candle points are kept unique and X-ordered by the tracker/filters; only guard the start boundary
+    if candle_points and candle_points[0][0] <= start_point[0]:
+        candle_points = [cp for cp in candle_points if cp[0] > start_point[0]]
+    state["candle_points"] = candle_points
     
     # Handle breakout tracker logic (if needed)
     if "breakout_tracker" not in state:
@@ -434,34 +586,25 @@ def update_state(state_file_path, flag_names, flag_type, start_point, slope, int
 # 📈 Trendline & Slope Calculations
 # ----------------------
 
-def calculate_slope_intercept(indent_lvl, points, start_point, flag_type="bull", print_satements=True, current_point_x=None):
+def calculate_slope_intercept(indent_lvl, points, start_point, flag_type="bull", print_satements=True, current_point_x=None, tracker=None):
     """
     Calculates the slope and intercept for trendlines.
+    With a `tracker` the regression sums are already maintained (O(1)); without one they are built here.
     """
     if print_satements:
         print_log(f"{indent(indent_lvl)}[CSI] Calculating Slope Line...")
 
-    if start_point not in points: # Ensure the start_point is included in the points list
-        points = [start_point] + points
-    points = sorted(points, key=lambda x: x[0]) # Sort by X
-    
-    # Calculate slope (m) using the linear regression formula
-    n = len(points)
-    sum_x = sum(point[0] for point in points)
-    sum_y = sum(point[1] for point in points)
-    sum_xy = sum(point[0] * point[1] for point in points)
-    sum_x_squared = sum(point[0] ** 2 for point in points)
-    
-    denominator = n * sum_x_squared - sum_x ** 2
-    if denominator == 0:  # Check for vertical line or insufficient points
+    if tracker is None or not tracker.matches(start_point, points):
+        tracker = FlagTracker(start_point, [p for p in points if p[0] != start_point[0]])
+    points = tracker.all_points()  # start point first, sorted by X
+
+    # m = [n(Σxy) - (Σx)(Σy)] / [n(Σx²) - (Σx)²]
+    fit = tracker.fit()
+    if fit is None:  # Check for vertical line or insufficient points
         if print_satements:
             print_log(f"{indent(indent_lvl)}[CSI ERROR] ZeroDivisionError avoided. Vertical line or insufficient data. Points: {points}")
         return None, None, None, None
-    
-    # m = [n(Σxy) - (Σx)(Σy)] / [n(Σx²) - (Σx)²]
-    slope = (n * sum_xy - sum_x * sum_y) / denominator
-    mean_x, mean_y = sum_x / n, sum_y / n
-    intercept = mean_y - slope * mean_x
+    slope, intercept = fit
     
     # Perform the translation to avoid the slope line cutting through the body of the candles
     intercept = max(point[1] - slope * point[0] for point in points) if flag_type == "bull" else min(point[1] - slope * point[0] for point in points)
@@ -498,8 +641,9 @@ def is_angle_valid(indent_lvl, slope, flag_type, print_satements):
         angle = math.atan(slope) * (180 / math.pi)
     
     # Extract min and max angles from config
-    min_angle = read_config('FLAGPOLE_CRITERIA')['MIN_ANGLE']
-    max_angle = read_config('FLAGPOLE_CRITERIA')['MAX_ANGLE']
+    criteria = read_config('FLAGPOLE_CRITERIA')
+    min_angle = criteria['MIN_ANGLE']
+    max_angle = criteria['MAX_ANGLE']
 
     # Adjust the angle check based on bullish or bearish criteria
     if flag_type == "bear":
@@ -555,6 +699,7 @@ def filter_candles(indent_lvl, start_point, candle_points, current_point, candle
         pco_intercept = y1 - pco_slope * x1
 
     filtered_points = []
+    flow_by_price = {}  # price key -> point, flow-mode dedupe (latest X wins for the same Y)
 
     for point in candle_points:
         x, y = point[0], point[1]
@@ -594,22 +739,24 @@ def filter_candles(indent_lvl, start_point, candle_points, current_point, candle
                 )
         if mode == "flow" and is_valid:
             # Check if a point with the same Y value already exists
-            existing = next((p for p in filtered_points if abs(p[1] - point[1]) < 1e-6), None)
+            key = _price_key(point[1])
+            existing = flow_by_price.get(key)
             if existing:
                 # If current point has higher X, replace the old one
                 if point[0] > existing[0]:
-                    filtered_points.remove(existing)
-                    filtered_points.append(point)
+                    del flow_by_price[key]
+                    flow_by_price[key] = point
                     if print_statements:
                         print_log(f"{indent(indent_lvl)}[FC flow] {point} replaced {existing} ✅ (same Y)")
                 else:
                     if print_statements:
                         print_log(f"{indent(indent_lvl)}[FC flow] {point} skipped ❌ (older X for same Y)")
             else:
-                filtered_points.append(point)
+                flow_by_price[key] = point
                 if print_statements:
                     print_log(f"{indent(indent_lvl)}[FC flow] {point} added ✅")
 
+    filtered_points.extend(flow_by_price.values())
     filtered_points = sorted(filtered_points, key=lambda p: p[0]) # Sort by X (candle index)
     after_cal = len(filtered_points)
     
@@ -643,16 +790,21 @@ def formated_candle_point(flag_type, candle):
     # 'oc' means Open or Close
     if flag_type == "bull":              # Bull candle list
         candle_oc = candle['open'] if candle['open']>=candle['close'] else candle['close']
-        return (candle['candle_index'], candle_oc, candle['high'])
+        return FlagPoint(candle['candle_index'], candle_oc, candle['high'])
     else:                                # Bear candle list
         candle_oc = candle['close'] if candle['close']<=candle['open'] else candle['open']
-        return (candle['candle_index'], candle_oc, candle['low'])
-
-def add_candle_to_candle_points(flag_type, candle, candle_points):
-    # Append point to point list
-    candle_points.append(formated_candle_point(flag_type, candle))
-    # Organize the points into ascending order, where the X value is the indicator for the order
-    candle_points = sorted(candle_points, key=lambda x: x[0])
+        return FlagPoint(candle['candle_index'], candle_oc, candle['low'])
+
+def add_candle_to_candle_points(flag_type, candle, candle_points, tracker=None):
+    # Append point to point list, kept in ascending X order (live candles arrive in order, so this is an append)
+    point = formated_candle_point(flag_type, candle)
+    if tracker is not None:
+        tracker.add(point)
+        return tracker.points
+    if candle_points and point[0] <= candle_points[-1][0]:
+        candle_points = sorted(candle_points + [point], key=lambda x: x[0])
+    else:
+        candle_points.append(point)
     return candle_points 
 
 def ensure_states_dir_exists(states_dir):
@@ -665,6 +817,8 @@ def clear_all_states(indent_lvl=1):
     Clears all state data, both from disk and from in-memory dictionary.
     This ensures a fresh start regardless of storage mode.
     """
+    TRACKERS.clear()
+    LINE_DATA_MEMORY.update({"active_flags": [], "completed_flags": []})
     if USE_DICT_STATE:
         STATE_MEMORY.clear()
         print_log(f"{indent(indent_lvl)}[RESET] In-memory STATE_MEMORY cleared.")
@@ -0,0 +1,384 @@
+# indicators/indicator_engine.py
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+import paths
+from shared_state import print_log
+from utils.json_utils import read_config
+from utils.config_service import subscribe
+from utils.time_utils import to_ms
+from utils.ema_utils import ema_alpha, ema_step
+
+"""
+Columnar indicator engine.
+
+Per timeframe we keep a NumPy ring buffer of closed bars (ts/open/high/low/close/volume)
+and a small float64 array with the latest value of every registered indicator.
+Each closed bar steps every indicator once (O(1)), the strategy/sentiment side reads
+the latest values through `latest(tf)`, a read-only view on that array (no copies,
+no JSON round-trip).
+
+`compute_batch(df)` computes the exact same columns over a whole DataFrame at once
+(vectorized) for backtests; `batch_from_storage(tf)` feeds it our Parquet dayfiles.
+Incremental and batch results are bit-identical, the unit tests hold us to that.
+
+Registered by default:
+  - ema_<w> for every window in config.json `EMAS`
+  - vwap                (session-anchored, equal-weighted if the feed has no volume)
+  - atr_14, rsi_14      (Wilder smoothing: ewm(alpha=1/n, adjust=False))
+  - session_high/low    (reset every NY trading date)
+"""
+
+MARKET_TZ = "America/New_York"
+DEFAULT_CAPACITY = 2000
+ATR_PERIOD = 14
+RSI_PERIOD = 14
+OHLCV = ("ts", "open", "high", "low", "close", "volume")
+
+def _session_cumsum(values: np.ndarray, sessions: np.ndarray) -> np.ndarray:
+    """Plain left-to-right cumsum restarting at each session (bars are sorted, sessions contiguous).
+    pandas' groupby().cumsum() uses compensated summation, which would drift from the incremental path."""
+    out = np.empty(len(values))
+    if not len(values):
+        return out
+    starts = np.flatnonzero(np.r_[True, sessions[1:] != sessions[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+    for a, b in zip(starts, ends):
+        out[a:b] = np.cumsum(values[a:b])
+    return out
+
+# ───🔹 INDICATORS ─────────────────────────────
+# An indicator has `names` (output columns), `reset()`, `update(bar) -> tuple`
+# and a static-ish `batch(df) -> dict[name, np.ndarray]` that must agree with update.
+# `bar` is a dict with open/high/low/close/volume plus "session" (NY date string).
+
+class EMAIndicator:
+    def __init__(self, window: int):
+        self.window = int(window)
+        self.alpha = ema_alpha(self.window)
+        self.names = (f"ema_{self.window}",)
+        self.reset()
+
+    def reset(self):
+        self.value = None
+
+    def update(self, bar):
+        self.value = ema_step(self.value, bar["close"], self.alpha)
+        return (self.value,)
+
+    def batch(self, df):
+        return {self.names[0]: df["close"].ewm(span=self.window, adjust=False).mean().to_numpy()}
+
+class VWAPIndicator:
+    names = ("vwap",)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.session = None
+        self.pv = self.vol = self.tp_sum = 0.0
+        self.n = 0
+
+    def update(self, bar):
+        if bar["session"] != self.session:
+            self.reset()
+            self.session = bar["session"]
+        tp = (bar["high"] + bar["low"] + bar["close"]) / 3.0
+        self.pv += tp * bar["volume"]
+        self.vol += bar["volume"]
+        self.tp_sum += tp
+        self.n += 1
+        return (self.pv / self.vol if self.vol > 0 else self.tp_sum / self.n,)
+
+    def batch(self, df):
+        tp = ((df["high"] + df["low"] + df["close"]) / 3.0).to_numpy()
+        volume = df["volume"].to_numpy()
+        g = df["session"].to_numpy()
+        pv = _session_cumsum(tp * volume, g)
+        vol = _session_cumsum(volume, g)
+        tp_sum = _session_cumsum(tp, g)
+        n = _session_cumsum(np.ones(len(tp)), g)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = np.where(vol > 0, pv / vol, tp_sum / n)
+        return {"vwap": out}
+
+class ATRIndicator:
+    def __init__(self, period: int = ATR_PERIOD):
+        self.period = int(period)
+        self.alpha = 1.0 / self.period
+        self.names = (f"atr_{self.period}",)
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.prev_close = None
+
+    def update(self, bar):
+        h, l = bar["high"], bar["low"]
+        if self.prev_close is None:
+            tr = h - l
+        else:
+            tr = max(h - l, abs(h - self.prev_close), abs(l - self.prev_close))
+        self.prev_close = bar["close"]
+        self.value = ema_step(self.value, tr, self.alpha)
+        return (self.value,)
+
+    def batch(self, df):
+        h, l, pc = df["high"], df["low"], df["close"].shift(1)
+        tr = pd.concat([h - l, (h - pc).abs(), (l - pc).abs()], axis=1).max(axis=1)
+        tr.iloc[:1] = (h - l).iloc[:1]
+        return {self.names[0]: tr.ewm(alpha=self.alpha, adjust=False).mean().to_numpy()}
+
+def _rsi(avg_gain, avg_loss):
+    return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + avg_gain / np.where(avg_loss == 0, 1, avg_loss)))
+
+class RSIIndicator:
+    def __init__(self, period: int = RSI_PERIOD):
+        self.period = int(period)
+        self.alpha = 1.0 / self.period
+        self.names = (f"rsi_{self.period}",)
+        self.reset()
+
+    def reset(self):
+        self.gain = self.loss = None
+        self.prev_close = None
+
+    def update(self, bar):
+        c = bar["close"]
+        if self.prev_close is None:
+            self.prev_close = c
+            return (np.nan,)
+        delta = c - self.prev_close
+        self.prev_close = c
+        self.gain = ema_step(self.gain, max(delta, 0.0), self.alpha)
+        self.loss = ema_step(self.loss, max(-delta, 0.0), self.alpha)
+        return (float(_rsi(self.gain, self.loss)),)
+
+    def batch(self, df):
+        delta = df["close"].diff()
+        gain = delta.clip(lower=0).ewm(alpha=self.alpha, adjust=False).mean().to_numpy()
+        loss = (-delta).clip(lower=0).ewm(alpha=self.alpha, adjust=False).mean().to_numpy()
+        out = _rsi(gain, loss)
+        out[:1] = np.nan
+        return {self.names[0]: out}
+
+class SessionHighLowIndicator:
+    names = ("session_high", "session_low")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.session = None
+        self.high = self.low = None
+
+    def update(self, bar):
+        if bar["session"] != self.session:
+            self.session, self.high, self.low = bar["session"], bar["high"], bar["low"]
+        else:
+            self.high = max(self.high, bar["high"])
+            self.low = min(self.low, bar["low"])
+        return (self.high, self.low)
+
+    def batch(self, df):
+        g = df["session"]
+        return {
+            "session_high": df["high"].groupby(g).cummax().to_numpy(),
+            "session_low": df["low"].groupby(g).cummin().to_numpy(),
+        }
+
+_REGISTRY: List[Callable[[], object]] = []
+
+def register_indicator(factory: Callable[[], object]) -> None:
+    """Add an indicator factory; engines created afterwards include it."""
+    _REGISTRY.append(factory)
+
+def default_indicators() -> list:
+    inds = [EMAIndicator(window) for window, _ in read_config("EMAS")]  # window, color
+    inds += [VWAPIndicator(), ATRIndicator(), RSIIndicator(), SessionHighLowIndicator()]
+    inds += [factory() for factory in _REGISTRY]
+    return inds
+
+# ───🔹 RING BUFFER + LATEST VIEW ─────────────────────────────
+
+class BarRing:
+    """Fixed-size columnar ring of closed bars."""
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = int(capacity)
+        self.cols = {c: np.full(self.capacity, np.nan) for c in OHLCV}
+        self.size = 0
+        self.head = 0  # next write slot
+
+    def append(self, row: dict) -> None:
+        i = self.head
+        for c in OHLCV:
+            self.cols[c][i] = row[c]
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def last(self, column: str, n: Optional[int] = None) -> np.ndarray:
+        """Oldest→newest values of `column`; a view when the span doesn't wrap."""
+        n = self.size if n is None else min(int(n), self.size)
+        start = (self.head - n) % self.capacity
+        arr = self.cols[column]
+        if start + n <= self.capacity:
+            return arr[start:start + n]
+        return np.concatenate((arr[start:], arr[:self.head]))
+
+class LatestView:
+    """Read-only window on an engine's latest-values array (no copies)."""
+    __slots__ = ("_arr", "_index")
+
+    def __init__(self, arr: np.ndarray, index: Dict[str, int]):
+        self._arr = arr.view()
+        self._arr.setflags(write=False)
+        self._index = index
+
+    def __getitem__(self, name: str) -> float:
+        return float(self._arr[self._index[name]])
+
+    def get(self, name: str, default=None):
+        i = self._index.get(name)
+        return default if i is None else float(self._arr[i])
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._arr
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._index)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {k: float(self._arr[i]) for k, i in self._index.items()}
+
+# ───🔹 ENGINE ─────────────────────────────
+
+def _session_of(ts_ms: int) -> str:
+    return pd.Timestamp(ts_ms, unit="ms", tz="UTC").tz_convert(MARKET_TZ).strftime("%Y-%m-%d")
+
+class IndicatorEngine:
+    def __init__(self, timeframe: str, indicators: Optional[list] = None, capacity: int = DEFAULT_CAPACITY):
+        self.timeframe = timeframe
+        self.indicators = indicators if indicators is not None else default_indicators()
+        names = [n for ind in self.indicators for n in ind.names]
+        self.index = {n: i for i, n in enumerate(names)}
+        self.values = np.full(len(names), np.nan)
+        self.ring = BarRing(capacity)
+        self.last_ts = None
+        self._view = LatestView(self.values, self.index)
+
+    def on_bar(self, candle: dict) -> LatestView:
+        """Fold one closed candle in. Bars at or before the last seen ts are ignored."""
+        ts = int(candle["ts"]) if candle.get("ts") is not None else to_ms(candle["timestamp"])
+        if self.last_ts is not None and ts <= self.last_ts:
+            return self._view
+        bar = {
+            "ts": ts,
+            "open": float(candle.get("open") or 0.0),
+            "high": float(candle.get("high") or 0.0),
+            "low": float(candle.get("low") or 0.0),
+            "close": float(candle.get("close") or 0.0),
+            "volume": float(candle.get("volume") or 0.0),
+        }
+        bar["session"] = _session_of(ts)
+        self.ring.append(bar)
+        self.last_ts = ts
+
+        i = 0
+        for ind in self.indicators:
+            for v in ind.update(bar):
+                self.values[i] = np.nan if v is None else v
+                i += 1
+        return self._view
+
+    def warm(self, df: pd.DataFrame) -> "IndicatorEngine":
+        """Replay historical bars (oldest first) through the incremental path."""
+        for row in df.itertuples(index=False):
+            self.on_bar(row._asdict())
+        return self
+
+    def latest(self) -> LatestView:
+        return self._view
+
+_ENGINES: Dict[str, IndicatorEngine] = {}
+
+def get_indicator_engine(timeframe: str, warm: bool = True) -> IndicatorEngine:
+    """Engine for `timeframe`; on first use it is warmed from `storage/data` history."""
+    eng = _ENGINES.get(timeframe)
+    if eng is None:
+        eng = IndicatorEngine(timeframe)
+        if warm:
+            hist = load_history(timeframe, bars=eng.ring.capacity)
+            if hist is not None:
+                eng.warm(hist)
+                print_log(f"[INDICATORS] {timeframe} warmed from {len(hist)} stored bars.")
+        _ENGINES[timeframe] = eng
+    return eng
+
+def on_bar(timeframe: str, candle: dict) -> LatestView:
+    return get_indicator_engine(timeframe).on_bar(candle)
+
+def latest(timeframe: str) -> LatestView:
+    return get_indicator_engine(timeframe).latest()
+
+def reset_indicator_engines(*_args) -> None:
+    _ENGINES.clear()
+
+# EMA windows are baked into each engine; rebuild (and re-warm) them lazily after an `EMAS` edit
+subscribe(reset_indicator_engines, keys=["EMAS"])
+
+# ───🔹 BATCH MODE ─────────────────────────────
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.copy()
+    if "ts" not in out.columns:
+        out["ts"] = pd.to_datetime(out["timestamp"], utc=True).astype("int64") // 1_000_000
+    if "volume" not in out.columns:
+        out["volume"] = 0.0
+    out = out.sort_values("ts").drop_duplicates("ts", keep="last").reset_index(drop=True)
+    for c in ("open", "high", "low", "close", "volume"):
+        out[c] = out[c].astype("float64").fillna(0.0)
+    out["session"] = pd.to_datetime(out["ts"], unit="ms", utc=True).dt.tz_convert(MARKET_TZ).dt.strftime("%Y-%m-%d")
+    return out
+
+def compute_batch(df: pd.DataFrame, indicators: Optional[list] = None) -> pd.DataFrame:
+    """Vectorized version of the incremental path: one indicator column per name, row per bar."""
+    prepared = _prepare(df)
+    out = prepared.drop(columns=["session"])
+    for ind in (indicators if indicators is not None else default_indicators()):
+        for name, col in ind.batch(prepared).items():
+            out[name] = col
+    return out
+
+def load_history(timeframe: str, bars: Optional[int] = None, days: Optional[Iterable[str]] = None) -> Optional[pd.DataFrame]:
+    """Stored candles (dayfiles + parts) for `timeframe`, oldest first; optionally only `days` or the last `bars`."""
+    import duckdb
+    root = paths.DATA_DIR / timeframe.lower()
+    if not root.exists():
+        return None
+    files = [str(p) for p in root.glob("*.parquet")] + [str(p) for p in root.glob("*/part-*.parquet")]
+    if days is not None:
+        wanted = set(days)
+        files = [f for f in files if any(d in f for d in wanted)]
+    if not files:
+        return None
+    limit = f"LIMIT {int(bars)}" if bars else ""
+    con = duckdb.connect(":memory:")
+    try:
+        df = con.execute(f"""
+            SELECT DISTINCT ts, open, high, low, close, volume
+            FROM read_parquet(?, union_by_name=1)
+            WHERE ts IS NOT NULL
+            ORDER BY ts DESC {limit}
+        """, [files]).df()
+    finally:
+        con.close()
+    return df.sort_values("ts").reset_index(drop=True) if not df.empty else None
+
+def batch_from_storage(timeframe: str, days: Optional[Iterable[str]] = None) -> Optional[pd.DataFrame]:
+    """Backtest helper: indicators over our own Parquet history."""
+    hist = load_history(timeframe, days=days)
+    return compute_batch(hist) if hist is not None else None
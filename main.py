@@ -1,10 +1,14 @@
 # main.py
 from data_acquisition import ws_auto_connect, get_account_balance, active_provider, is_market_open
 from utils.json_utils import read_config, get_correct_message_ids, update_config_value
+from utils.config_service import config
+from utils.log_backend import flush_logs
 from utils.log_utils import write_to_log, clear_temp_logs_and_order_files
-from utils.order_utils import initialize_csv_order_log
+from utils.order_utils import initialize_order_journal, compact_order_journal
 from utils.time_utils import generate_candlestick_times, add_seconds_to_time
 from indicators.ema_manager import update_ema, hard_reset_ema_state, migrate_ema_state_schema
+from indicators.indicator_engine import on_bar as update_indicators
+from utils.event_bus import BarClosed, publish as publish_bar
 from shared_state import price_lock, print_log
 from storage.parquet_writer import append_candle
 from tools.compact_parquet import end_of_day_compaction
@@ -23,7 +27,7 @@ import httpx
 import cred
 import json
 import pytz
-from paths import TERMINAL_LOG, CANDLE_LOGS, SPY_15M_ZONE_CHART_PATH, SPY_2M_CHART_PATH, SPY_5M_CHART_PATH, SPY_15M_CHART_PATH, get_ema_path
+from paths import TERMINAL_LOG, CANDLE_LOGS, SPY_15M_ZONE_CHART_PATH, SPY_2M_CHART_PATH, SPY_5M_CHART_PATH, SPY_15M_CHART_PATH, get_ema_series_path
 import subprocess
 
 async def bot_start():
@@ -67,17 +71,32 @@ current_candles = {tf: {"open": None, "high": None, "low": None, "close": None}
 start_times = {tf: datetime.now() for tf in read_config('TIMEFRAMES')}
 candle_counts = {tf: 0 for tf in read_config('TIMEFRAMES')}
 
-def refresh_chart(timeframe, chart_type="live"):
+def refresh_chart(timeframe, chart_type="live", bar=None):
+    """Tell the dashboard a chart changed (broadcast only, no PNG, see `render_chart()`); a closed `bar` rides along."""
+    body = {"timeframe": timeframe, "chart_type": chart_type}
+    if bar is not None:
+        body["bar"] = {k: bar[k] for k in ("timestamp", "open", "high", "low", "close")}
     try:
-        # give Kaleido room on cold start
         httpx.post("http://127.0.0.1:8000/refresh-chart",
-                   json={"timeframe": timeframe, "chart_type": chart_type},
-                   timeout=httpx.Timeout(connect=2.0, read=15.0, write=5.0, pool=5.0))
+                   json=body,
+                   timeout=httpx.Timeout(connect=2.0, read=5.0, write=5.0, pool=5.0))
     except httpx.ReadTimeout:
-        print_log(f"    [refresh_chart] timed out (render likely completed anyway)")
+        print_log(f"    [refresh_chart] timed out")
     except Exception as e:
         print_log(f"[refresh_chart] failed: {e}")
 
+async def render_chart(timeframe, chart_type="live"):
+    """Have the render workers write the chart's PNG (skipped when unchanged) before we send it. True on success."""
+    try:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(connect=2.0, read=60.0, write=5.0, pool=5.0)) as client:
+            r = await client.post("http://127.0.0.1:8000/render-chart", json={"timeframe": timeframe, "chart_type": chart_type})
+        info = r.json()
+        print_log(f"    [render_chart] {timeframe} {chart_type}: {info.get('status')}, render {info.get('render_ms')} ms, queued {info.get('queued_ms')} ms")
+        return r.status_code == 200
+    except Exception as e:
+        print_log(f"[render_chart] {timeframe} {chart_type} failed: {e}")
+        return False
+
 async def process_data(queue):
     print_log("Starting `process_data()`...")
     global current_candles, candle_counts, start_times
@@ -130,6 +149,7 @@ async def process_data(queue):
 
             message = await queue.get()
             data = json.loads(message)
+            cfg = config()  # one snapshot per tick, attribute reads from here on
 
             if 'type' in data and data['type'] == 'trade':
                 price = float(data.get("price", 0))
@@ -138,7 +158,7 @@ async def process_data(queue):
                 async with price_lock:
                     shared_state.latest_price = price  # Update shared_state.latest_price
 
-                for timeframe in read_config('TIMEFRAMES'):
+                for timeframe in cfg.TIMEFRAMES:
                     current_candle = current_candles[timeframe]
                     if current_candle["open"] is None:
                         current_candle["open"] = price
@@ -152,8 +172,8 @@ async def process_data(queue):
 
                     if (f_now in timestamps[timeframe]) or (f_now in buffer_timestamps[timeframe]):
                         current_candle["timestamp"] = start_times[timeframe].isoformat()
-                        write_to_log(current_candle, read_config('SYMBOL'), timeframe)
-                        append_candle(read_config('SYMBOL'), timeframe, current_candle)
+                        bar_index = write_to_log(current_candle, cfg.SYMBOL, timeframe)
+                        append_candle(cfg.SYMBOL, timeframe, current_candle)
                         
                         # ✅ LOG THE CANDLE COUNT BEFORE EMA UPDATES
                         f_current_time = datetime.now().strftime("%H:%M:%S")
@@ -162,9 +182,13 @@ async def process_data(queue):
 
                         # 🔁 NOW update EMA
                         await update_ema(current_candle, timeframe)
+                        update_indicators(timeframe, current_candle)
+
+                        # 🔁 Tell subscribers (flags, sentiment, orders); EMAs above are already current
+                        publish_bar(BarClosed.from_candle(cfg.SYMBOL, timeframe, bar_index, current_candle))
 
                         # 🔁 NOW update Chart
-                        refresh_chart(timeframe, chart_type="live")
+                        refresh_chart(timeframe, chart_type="live", bar=current_candle)
                         
                         # Reset the current candle and start time
                         current_candles[timeframe] = {
@@ -177,10 +201,10 @@ async def process_data(queue):
                         # Remove the timestamp to avoid duplication
                         if f_now in timestamps[timeframe]:
                             timestamps[timeframe].remove(f_now)
-                            buffer_timestamps[timeframe].remove(add_seconds_to_time(f_now, read_config('CANDLE_BUFFER'))) #add CANDLE_BUFFER to f_now and remove it from the buffer_timestamps list.
+                            buffer_timestamps[timeframe].remove(add_seconds_to_time(f_now, cfg.CANDLE_BUFFER)) #add CANDLE_BUFFER to f_now and remove it from the buffer_timestamps list.
                         elif f_now in buffer_timestamps[timeframe]:
                             buffer_timestamps[timeframe].remove(f_now)
-                            timestamps[timeframe].remove(add_seconds_to_time(f_now, -read_config('CANDLE_BUFFER'))) #subtract CANDLE_BUFFER from f_now and remove it from the timestamps list.
+                            timestamps[timeframe].remove(add_seconds_to_time(f_now, -cfg.CANDLE_BUFFER)) #subtract CANDLE_BUFFER from f_now and remove it from the timestamps list.
 
         queue.task_done()
 
@@ -270,7 +294,7 @@ async def main_loop():
         await wait_until_market_open(market_open_time, new_york)
 
     # ✅ INIT after waiting
-    initialize_csv_order_log()
+    initialize_order_journal()
 
     # Track whether we actually ran trading work (so we only run EOD once)
     did_run_intraday = False
@@ -288,6 +312,7 @@ async def main_loop():
                 start_of_day_account_balance = await get_account_balance(read_config('REAL_MONEY_ACTIVATED')) if read_config('REAL_MONEY_ACTIVATED') else read_config('START_OF_DAY_BALANCE')
                 f_s_account_balance = "{:,.2f}".format(start_of_day_account_balance)
                 await print_discord(f"Market is Open! Account BP: ${f_s_account_balance}")
+                await render_chart("15M", chart_type="zones")
                 await send_file_discord(SPY_15M_ZONE_CHART_PATH)
                 await print_discord(setup_economic_news_message())
 
@@ -341,8 +366,9 @@ async def process_end_of_day():
         "5M": SPY_5M_CHART_PATH,
         "15M": SPY_15M_CHART_PATH
     }
+    await asyncio.gather(*(render_chart(tf) for tf in today_chart_info))  # the workers render them in parallel
     for tf, chart_path in today_chart_info.items():
-        files = [chart_path, CANDLE_LOGS.get(tf), get_ema_path(tf)]
+        files = [chart_path, CANDLE_LOGS.get(tf), get_ema_series_path(tf)]
         for f in files:
             if not f:
                 continue
@@ -352,6 +378,7 @@ async def process_end_of_day():
                 print_log(f"[WARN] Failed to send {tf} file {f}: {e}")
 
     #await send_file_discord(MARKERS_PATH)
+    flush_logs()
     await send_file_discord(TERMINAL_LOG)
 
     # 4. Administrative/config updates (do this last so nothing breaks mid-report)
@@ -366,6 +393,7 @@ async def process_end_of_day():
     ny = pytz.timezone('America/New_York')
     day = datetime.now(ny).strftime("%Y-%m-%d")
     end_of_day_compaction(day, TFs=["2m","5m","15m"])
+    compact_order_journal(day)
     process_end_of_day_15m_candles_for_objects()
 
 async def shutdown(loop):
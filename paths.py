@@ -18,6 +18,9 @@ TERMINAL_LOG = LOGS_DIR / 'terminal_output.log'                         # This i
 # Storage
 STORAGE_DIR = BASE / 'storage'                                          # this holds any sensitive data, most of the stuff below is in this folder.
 DATA_DIR = STORAGE_DIR / 'data'                                         # This is needed, this is where all parquet files are stored.
+WARMUP_DIR = STORAGE_DIR / 'warmup'                                     # This is needed by `storage/warmup_cache.py`, prior-day candles fetched from Polygon for EMA seeding, one parquet per timeframe per date so a day is only ever downloaded once.
+def get_warmup_path(timeframe: str, day: str):                          # `storage/warmup/<tf>/<YYYY-MM-DD>.parquet`
+    return WARMUP_DIR / timeframe.lower() / f"{day}.parquet"
 
 # Objects folder
 OBJECTS_DIR = STORAGE_DIR / 'objects'                                   # The `storage/objects/` folder contains zones and levels calculated by `objects.py`. We consider Zones and Levels as objects.
@@ -30,20 +33,30 @@ TIMELINE_PATH = OBJECTS_DIR / 'timeline.json'                           # This i
 # EMA directory + dynamic EMA path retrieval
 EMAS_DIR = STORAGE_DIR / 'emas'                                         # This is needed by `ema_manager.py`
 EMA_STATE_PATH = EMAS_DIR / "ema_state.json"                            # This is needed by `ema_manager.py`, this is for figuring out if were past the first 15 minutes of market open beacuse were on polygons cheap plan and they have 15 min delayed data, after the first 15 mins were back to the live-correct data.
-def get_ema_path(timeframe: str):                                       # This is needed by `ema_manager.py`, to get the path of the EMA file for every specific timeframe.
+def get_ema_path(timeframe: str):                                       # Legacy, the old whole-list EMA JSON file per timeframe. Replaced by the two helpers below (incremental EMA engine in `utils/ema_utils.py`).
     return EMAS_DIR / f"{timeframe}.json"
+def get_ema_series_path(timeframe: str):                                # This is needed by `utils/ema_utils.py`, append-only EMA series (one JSON row per closed bar: {"13":..,"48":..,"200":..,"x":..}).
+    return EMAS_DIR / f"{timeframe}.jsonl"
+def get_ema_engine_state_path(timeframe: str):                          # This is needed by `utils/ema_utils.py`, compact state record of the running EMA values so a bar update is O(1) and survives restarts.
+    return EMAS_DIR / f"{timeframe}_state.json"
 
 # JSONs                                                                 # Everything below this line is no longer needed, but later development will require the replacement of these in a working fashion, EMA's is a good example of what I had to replace `EMAs.json` with.
 LINE_DATA_PATH = STORAGE_DIR / 'line_data.json'                         # No longer needed, worked in older version, newer version require different timeframe flags hence the 'flags' folder which replaces this
 MARKERS_PATH = STORAGE_DIR / 'markers.json'                             # No longer needed, worked in older version, newer version require different timeframe markers hence the 'markers' folder which replaces this
 ORDER_CANDLE_TYPE_PATH = STORAGE_DIR / 'order_candle_type.json'         # No longer needed, worked in older version, newer version doesn't require this
-PRIORITY_CANDLES_PATH = STORAGE_DIR / 'priority_candles.json'           # No longer needed, worked in older version, newer version doesn't require this
 MESSAGE_IDS_PATH = STORAGE_DIR / 'message_ids.json'                     # This is needed, this records all message ID's sent to discord the same day, doesn't remember anything greater than the current day its running. After market ends it resets to zero meaning `{}`.
 WEEK_ECOM_CALENDER_PATH = STORAGE_DIR / 'week_ecom_calendar.json'       # This is needed for the weekly economic calendar events. This is being used to fetch major, relevant events for the current week. So it knows if it should take trades or not at certian times where news can alter the trades results.
 
 # CSVs
+ORDERS_DIR = STORAGE_DIR / 'orders'                                     # This is needed by `utils/order_utils.py`, order journal + one folder per trading day with that day's trade table.
+ORDER_JOURNAL_PATH = ORDERS_DIR / 'journal.jsonl'                        # Append-only order events of the current session (open/update), compacted into the day's `trades.parquet` at EOD.
+def get_trades_path(day: str):                                          # `storage/orders/<YYYY-MM-DD>/trades.parquet`, one row per order (query with DuckDB, see `query_trades()`)
+    return ORDERS_DIR / day / 'trades.parquet'
+def get_order_ticks_path(day: str, order_id: str):                      # `storage/orders/<YYYY-MM-DD>/<order_id>.parquet`, the bid/ask/underlying path of one order (`utils/order_path.py`), replaces the old `order_log(...).txt` files
+    return ORDERS_DIR / day / f'{order_id}.parquet'
+
 CSV_DIR = STORAGE_DIR / 'csv'
-ORDER_LOG_PATH = CSV_DIR / 'order_log.csv'                              # This is needed for logging all orders made during the trading session. For further study later on.
+ORDER_LOG_PATH = CSV_DIR / 'order_log.csv'                              # Legacy, orders were logged here before the order journal (`ORDERS_DIR`). Kept so old files aren't deleted by EOD cleanup.
 SPY_15_MINUTE_CANDLES_PATH = CSV_DIR / 'SPY_15_minute_candles.csv'      # This is needed for 2 reasons; 1) this is previous days 15 min candles to not only plot previous history but used to calulate zones and levels, 2) As a backup of the parquet data, just in case something goes wrong with the parquet data, this is a quick way to get the data back.
 AFTERMARKET_EMA_PATH = CSV_DIR / f"SPY_2_minute_AFTERMARKET.csv"        # IDK if these are used, I do see them used in `indicators/ema_manager.py` but I don't know if this is used in practice or is just ghost code, if it is I will remove it in the future.
 PREMARKET_EMA_PATH = CSV_DIR / f"SPY_2_minute_PREMARKET.csv"            # IDK if these are used, I do see them used in `indicators/ema_manager.py` but I don't know if this is used in practice or is just ghost code, if it is I will remove it in the future.
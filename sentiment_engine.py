@@ -1,6 +1,11 @@
 # sentiment_engine.py; use specific indicators in a ranking/weighted system to...
 from utils.ema_utils import get_last_emas
-from shared_state import indent, print_log
+from utils.json_utils import read_config
+from utils.event_bus import BarClosed, SentimentUpdated, subscribe, publish
+from shared_state import indent, print_log, latest_sentiment_score
+import numpy as np
+import pandas as pd
+import asyncio
 
 # ----------------------
 # 🎯 Sentiment Ranking System (OFFLINE REFERENCE)
@@ -47,146 +52,167 @@ from shared_state import indent, print_log
 # Example: exit CALL if score <= -3, exit PUT is score >= +3.
 # This confirms a full sentiment reversal (not just a pullback)
 
-def get_current_sentiment(candle, zones, tp_lines, log_indent, print_statements=True):
-    total_score = 0
+# ----------------------
+# 🧮 Rule Weights (the table above, as arrays)
+# ----------------------
+# Every rule is a comparison over arrays, so the same code scores one live bar
+# (arrays of length 1) or a whole history (`score_history()`) in one call.
+EMA_KEYS = ("13", "48", "200")
+EMA_CROSS_RULES = ((0, 1, 1), (0, 2, 2), (1, 2, 3))  # (fast, slow, weight) as indexes into EMA_KEYS
+CANDLE_EMA_WEIGHTS = np.array([1, 2, 3])             # close above (+) / not above (-) the 13, 48, 200
+ZONE_WEIGHT = 3
+TPL_CLOSE_WEIGHT = 2
+TPL_TAP_WEIGHT = 1
+
+def get_current_sentiment(candle, zones, tp_lines, log_indent, print_statements=True, scorer=None):
+    """
+    Score one closed bar against the live EMA engine values, `zones` and `tp_lines`.
+    A prebuilt `scorer` (`SentimentScorer`) skips turning the objects into arrays again.
+    """
+    scorer = scorer or SentimentScorer(zones, tp_lines)
     if print_statements:
         print_log(f"\n{indent(log_indent)}[SENTIMENT] Evaluating candle sentiment...\n")
 
-    # 1️⃣ --- EMA-Based Sentiment
-    ema_values = get_last_emas(log_indent+1, print_statements)
-    if ema_values:
-        total_score += evaluate_ema_crosses(ema_values, log_indent+1, print_statements)
-        total_score += evaluate_candle_vs_emas(candle, ema_values, log_indent+1, print_statements)
-
-    # 2️⃣ --- Zone-Based Sentiment
-    total_score += evaluate_zone_interaction(candle, zones, log_indent+1, print_statements)
-
-    # 3️⃣ --- TPL-Based Sentiment
-    total_score += evaluate_tpl_interaction(candle, tp_lines, log_indent+1, print_statements)
+    # 1️⃣ EMA-based (0 until the engine has values), 2️⃣ zone-based, 3️⃣ TPL-based
+    ema_values = get_last_emas(read_config('TIMEFRAMES')[0], log_indent+1, print_statements)
+    parts = scorer.components(candle, ema_values)
+    total_score = sum(parts.values())
 
     # 🔁 Add trend structure (HH/HL/LH/LL) in the future here.
 
     if print_statements:
+        detail = ", ".join(f"{name} {value:+d}" for name, value in parts.items())
+        print_log(f"{indent(log_indent+1)}[SENTIMENT] {detail}")
         print_log(f"{indent(log_indent)}[SENTIMENT] Total Score: {total_score}\n")
 
     return total_score
 
 # ----------------------
-# 🛠️ Utility & Helper Functions
+# 📡 Bar-Event Subscriber
 # ----------------------
 
-def evaluate_ema_crosses(emas, indent_lvl, print_statements=True):
-    score = 0
-    if emas['13'] > emas['48']:
-        score += 1
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA] 13 > 48 → +1")
-    elif emas['13'] < emas['48']:
-        score -= 1
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA] 13 < 48 → -1")
-
-    if emas['13'] > emas['200']:
-        score += 2
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA] 13 > 200 → +2")
-    elif emas['13'] < emas['200']:
-        score -= 2
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA] 13 < 200 → -2")
-
-    if emas['48'] > emas['200']:
-        score += 3
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA] 48 > 200 → +3")
-    elif emas['48'] < emas['200']:
-        score -= 3
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA] 48 < 200 → -3")
-
-    return score
-
-def evaluate_candle_vs_emas(candle, emas, indent_lvl, print_statements=True):
-    score = 0
-    close = candle['close']
-    if close > emas['13']:
-        score += 1
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA-CANDLE] Close > 13 EMA → +1")
-    else:
-        score -= 1
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA-CANDLE] Close < 13 EMA → -1")
-
-    if close > emas['48']:
-        score += 2
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA-CANDLE] Close > 48 EMA → +2")
-    else:
-        score -= 2
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA-CANDLE] Close < 48 EMA → -2")
-
-    if close > emas['200']:
-        score += 3
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA-CANDLE] Close > 200 EMA → +3")
-    else:
-        score -= 3
-        if print_statements:
-            print_log(f"{indent(indent_lvl)}[EMA-CANDLE] Close < 200 EMA → -3")
-
-    return score
-
-def evaluate_zone_interaction(candle, zones, indent_lvl, print_statements=True):
-    score = 0
-    c_open, c_close, c_high, c_low = candle['open'], candle['close'], candle['high'], candle['low']
-
-    for name, (_, zone_IV, zone_buffer) in zones.items():
-        zone_top = zone_IV if zone_IV > zone_buffer else zone_buffer
-        zone_bottom = zone_IV if zone_IV < zone_buffer else zone_buffer
-        in_zone = zone_top >= c_close >= zone_bottom
-
-        if in_zone:
-            if print_statements:
-                print_log(f"{indent(indent_lvl)}[ZONE] Inside zone '{name}' → 0")
-            return 0  # Neutral (only check one zone for now)
-
-        if c_open < zone_top and c_close > zone_top:
-            score += 3
-            if print_statements:
-                print_log(f"{indent(indent_lvl)}[ZONE] Breakout above '{name}' → +3")
-            return score
-
-        if c_open > zone_bottom and c_close < zone_bottom:
-            score -= 3
-            if print_statements:
-                print_log(f"{indent(indent_lvl)}[ZONE] Breakdown below '{name}' → -3")
-            return score
-
-    return score
-
-def evaluate_tpl_interaction(candle, tp_lines, indent_lvl, print_statements=True):
-    score = 0
-    open, close, high, low = candle['open'], candle['close'], candle['high'], candle['low']
-
-    for _, (_, tpl_value) in tp_lines.items():
-        if open < tpl_value < close:
-            score += 2
-            if print_statements:
-                print_log(f"{indent(indent_lvl)}[TPL] Closed above TPL ({tpl_value}) → +2")
-        elif open > tpl_value > close:
-            score -= 2
-            if print_statements:
-                print_log(f"{indent(indent_lvl)}[TPL] Closed below TPL ({tpl_value}) → -2")
-        elif high >= tpl_value > close:
-            score -= 1
-            if print_statements:
-                print_log(f"{indent(indent_lvl)}[TPL] Tapped from below and rejected ({tpl_value}) → -1")
-        elif low <= tpl_value < close:
-            score += 1
-            if print_statements:
-                print_log(f"{indent(indent_lvl)}[TPL] Tapped from above and held ({tpl_value}) → +1")
-
-    return score
+def start_sentiment_subscriber(zones, tp_lines, timeframe=None, log_indent=2, print_statements=False):
+    """
+    Score every closed bar (default: first configured timeframe), keep
+    `latest_sentiment_score` current for the position manager's stop-loss and
+    publish a `SentimentUpdated`. Subscribes before returning.
+    """
+    timeframe = timeframe or read_config('TIMEFRAMES')[0]
+    sub = subscribe(BarClosed, name="sentiment", timeframe=timeframe)
+    scorer = SentimentScorer(zones, tp_lines)  # objects are fixed for the session, arrays built once
+    return asyncio.create_task(_run_sentiment(sub, scorer, log_indent, print_statements), name="Sentiment")
+
+async def _run_sentiment(sub, scorer, log_indent, print_statements):
+    try:
+        async for bar in sub:
+            try:
+                score = get_current_sentiment(bar.as_candle(), None, None, log_indent, print_statements, scorer=scorer)
+            except Exception as e:
+                print_log(f"{indent(log_indent)}[SENTIMENT] Scoring bar {bar.index} failed: {e}")
+                continue
+            latest_sentiment_score["score"] = score
+            publish(SentimentUpdated(bar, score))
+    finally:
+        sub.close()
+
+# ----------------------
+# 🧮 Vectorized Scoring
+# ----------------------
+
+class SentimentScorer:
+    """
+    Zones and TPL lines as arrays, built once. Zones keep their dict order: like the
+    old per-zone loop, a bar is decided by the FIRST zone it closes inside of (0),
+    breaks out of (+3) or breaks down from (-3). Every TPL line counts.
+    """
+    def __init__(self, zones=None, tp_lines=None):
+        zone_rows = [(zone_IV, zone_buffer) for (_, zone_IV, zone_buffer) in (zones or {}).values()]
+        zone_cols = np.array(zone_rows, dtype=np.float64).reshape(-1, 2)
+        self.zone_top = zone_cols.max(axis=1)
+        self.zone_bottom = zone_cols.min(axis=1)
+        self.tpl = np.array([tpl_value for (_, tpl_value) in (tp_lines or {}).values()], dtype=np.float64)
+
+    def components(self, candle, emas=None):
+        """Per-rule scores of one bar; `emas` like `{"13": .., "48": .., "200": ..}` or None."""
+        o, h, l, c = (np.array([float(candle[k])]) for k in ("open", "high", "low", "close"))
+        ema = np.array([[emas[k]] for k in EMA_KEYS], dtype=np.float64) if emas else None
+        return {name: int(part[0]) for name, part in self.score_arrays(o, h, l, c, ema).items()}
+
+    def score_arrays(self, open_, high, low, close, ema=None):
+        """
+        Per-rule score arrays for N bars. `ema` is a (3, N) array of the 13/48/200
+        EMAs at each bar (a NaN column, or no `ema` at all, scores the EMA rules 0).
+        """
+        n = len(close)
+        parts = {}
+        if ema is None:
+            parts["ema_cross"] = np.zeros(n, dtype=np.int64)
+            parts["candle_ema"] = np.zeros(n, dtype=np.int64)
+        else:
+            have = ~np.isnan(ema).any(axis=0)
+            cross = sum(w * np.sign(ema[a] - ema[b]) for a, b, w in EMA_CROSS_RULES)
+            above = (np.where(close > ema, 1, -1) * CANDLE_EMA_WEIGHTS[:, None]).sum(axis=0)
+            parts["ema_cross"] = np.where(have, cross, 0).astype(np.int64)
+            parts["candle_ema"] = np.where(have, above, 0).astype(np.int64)
+        parts["zone"] = self._zone_scores(open_, close)
+        parts["tpl"] = self._tpl_scores(open_, high, low, close)
+        return parts
+
+    def score(self, open_, high, low, close, ema=None):
+        return sum(self.score_arrays(open_, high, low, close, ema).values())
+
+    def _zone_scores(self, o, c):
+        if not self.zone_top.size:
+            return np.zeros(len(c), dtype=np.int64)
+        o, c = o[:, None], c[:, None]  # bars x zones
+        top, bottom = self.zone_top[None, :], self.zone_bottom[None, :]
+        inside = (bottom <= c) & (c <= top)
+        up = (o < top) & (c > top)
+        down = (o > bottom) & (c < bottom)
+        hit = inside | up | down
+        first = hit.argmax(axis=1)  # the zone that decides each bar
+        rows = np.arange(len(first))
+        score = ZONE_WEIGHT * (up[rows, first].astype(np.int64) - down[rows, first])
+        return np.where(hit.any(axis=1), score, 0)
+
+    def _tpl_scores(self, o, h, l, c):
+        if not self.tpl.size:
+            return np.zeros(len(c), dtype=np.int64)
+        o, h, l, c = o[:, None], h[:, None], l[:, None], c[:, None]  # bars x lines
+        v = self.tpl[None, :]
+        closed_above = (o < v) & (v < c)
+        closed_below = (o > v) & (v > c)
+        crossed = closed_above | closed_below
+        tap_below = ~crossed & (h >= v) & (v > c)               # tapped from below and rejected
+        tap_above = ~crossed & ~tap_below & (l <= v) & (v < c)  # tapped from above and held
+        per_line = (TPL_CLOSE_WEIGHT * (closed_above.astype(np.int64) - closed_below)
+                    + TPL_TAP_WEIGHT * (tap_above.astype(np.int64) - tap_below))
+        return per_line.sum(axis=1)
+
+# ----------------------
+# 📚 Batch Mode (history / threshold tuning)
+# ----------------------
 
+def score_history(candles, zones, tp_lines, ema_windows=(13, 48, 200), components=False):
+    """
+    Sentiment of every bar in `candles` (open/high/low/close, oldest first, e.g. a
+    day or a year from `storage.viewport.load_viewport()`) in one call. EMAs are
+    taken from `"13"/"48"/"200"` columns when present, else computed like the live
+    engine (`ewm(span=w, adjust=False)` over these closes). Returns the score
+    Series, or with `components=True` a DataFrame of the rule parts plus "score".
+    """
+    cols = {k: candles[k].to_numpy(dtype=np.float64) for k in ("open", "high", "low", "close")}
+    ema = np.vstack([
+        candles[str(w)].to_numpy(dtype=np.float64) if str(w) in candles
+        else candles["close"].astype(float).ewm(span=w, adjust=False).mean().to_numpy()
+        for w in ema_windows
+    ])
+    parts = SentimentScorer(zones, tp_lines).score_arrays(cols["open"], cols["high"], cols["low"], cols["close"], ema)
+    out = pd.DataFrame(parts, index=candles.index)
+    out["score"] = out.sum(axis=1)
+    return out if components else out["score"]
+
+def sentiment_reversals(scores, position_type, threshold):
+    """Mask of bars where a `["SENTIMENT", threshold]` stop would exit a "call"/"put" position."""
+    scores = np.asarray(scores)
+    return scores <= -threshold if position_type == "call" else scores >= threshold
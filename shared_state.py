@@ -1,6 +1,7 @@
 # shared_state.py
 from pathlib import Path
-from paths import pretty_path, TERMINAL_LOG, LOGS_DIR  # and any others you may need later
+from paths import pretty_path  # and any others you may need later
+from utils.log_backend import get_writer
 import asyncio
 import json
 import time
@@ -11,27 +12,13 @@ price_lock = asyncio.Lock()  # To ensure thread-safe access
 
 latest_sentiment_score = {"score": 0} # Used for order_handler.py access
 
-def print_log(message: str):
+def print_log(message: str, level: str = "INFO", component: str = None):
     """
-    Logs a message to the terminal and appends it to a log file.
-    Includes a timestamp for each entry.
+    Logs a message to the terminal and appends it to the log files.
+    Only enqueues; printing and file writes happen in batches on the log writer thread (`utils/log_backend.py`).
+    `component` defaults to the leading "[TAG]" of the message.
     """
-    #timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    #formatted_message = f"{timestamp} {message}"
-
-    # Print the message to the console
-    print(message)
-
-    # Ensure the logs folder exists
-    LOGS_DIR.mkdir(parents=True, exist_ok=True)
-
-    # Ensure the log file exists
-    if not TERMINAL_LOG.exists():
-        TERMINAL_LOG.touch()  # Create the file if it doesn't exist
-
-    # Append the message to the log file
-    with open(TERMINAL_LOG, "a", encoding="utf-8") as log_file:
-        log_file.write(message + "\n")
+    get_writer().submit(str(message), level, component)
 
 def indent(level=1):
     """
@@ -0,0 +1,164 @@
+# storage/option_chain_cache.py
+from __future__ import annotations
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from shared_state import print_log
+
+"""
+Option chain cache per (symbol, expiration) for entry selection.
+
+`find_what_to_buy()` used to download the full `markets/options/chains`
+response (several hundred KB) on every entry signal, then filter and scan it
+in Python. Now a background task refreshes the chain every `REFRESH_SECONDS`
+and keeps it as sorted numpy columns per option type:
+
+    strikes (ascending) | bid | ask        (missing quotes are NaN)
+
+At signal time the strike window is two `searchsorted` (bisect) calls and the
+ask-range checks are vectorized masks, no network involved. A chain older
+than `MAX_AGE` is treated as missing and fetched inline once.
+"""
+
+REFRESH_SECONDS = 15
+MAX_AGE = 60
+PRICE_RANGES = [(0.30, 0.50), (0.20, 0.80), (0.10, 1.25)]  # ask ranges tried in order
+
+FetchChain = Callable[[], Awaitable[Optional[List[dict]]]]
+
+def _num(value) -> float:
+    return np.nan if value is None else float(value)
+
+class ChainSide:
+    """One option type of a chain, sorted by strike."""
+    __slots__ = ("strikes", "bid", "ask")
+
+    def __init__(self, options: List[dict]):
+        rows = sorted((float(o["strike"]), _num(o.get("bid")), _num(o.get("ask"))) for o in options)
+        cols = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        self.strikes, self.bid, self.ask = cols[:, 0].copy(), cols[:, 1].copy(), cols[:, 2].copy()
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def quote(self, strike) -> Optional[Tuple[float, float]]:
+        """(bid, ask) at exactly `strike`, or None."""
+        i = int(np.searchsorted(self.strikes, float(strike)))
+        if i < len(self.strikes) and self.strikes[i] == float(strike):
+            return float(self.bid[i]), float(self.ask[i])
+        return None
+
+    def window(self, cp: str, current_price: float, num_out_of_the_money: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Strikes with a valid ask from the money up to `num_out_of_the_money` away
+        (calls: price <= strike <= price + n, puts: price - n <= strike <= price).
+        """
+        if cp == "call":
+            lo, hi = current_price, current_price + num_out_of_the_money
+        else:
+            lo, hi = current_price - num_out_of_the_money, current_price
+        i = int(np.searchsorted(self.strikes, lo, side="left"))
+        j = int(np.searchsorted(self.strikes, hi, side="right"))
+        strikes, asks = self.strikes[i:j], self.ask[i:j]
+        valid = ~np.isnan(asks)
+        return strikes[valid], asks[valid]
+
+class OptionChain:
+    __slots__ = ("symbol", "expiration", "call", "put", "fetched")
+
+    def __init__(self, symbol: str, expiration: str, options: List[dict], fetched: Optional[float] = None):
+        self.symbol = symbol
+        self.expiration = expiration
+        self.call = ChainSide([o for o in options if o.get("option_type") == "call"])
+        self.put = ChainSide([o for o in options if o.get("option_type") == "put"])
+        self.fetched = time.monotonic() if fetched is None else fetched
+
+    def side(self, cp: str) -> ChainSide:
+        return self.call if cp == "call" else self.put
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched
+
+def select_strike(chain: OptionChain, cp: str, current_price: float, num_out_of_the_money: float,
+                  price_ranges=PRICE_RANGES) -> Optional[Tuple[float, float]]:
+    """
+    First strike (ascending) whose ask sits in the first matching price range.
+    Fallback: the cheapest strictly out-of-the-money strike in the window.
+    """
+    strikes, asks = chain.side(cp).window(cp, current_price, num_out_of_the_money)
+    if not len(strikes):
+        return None
+
+    for lower_bound, upper_bound in price_ranges:
+        hits = np.flatnonzero((asks >= lower_bound) & (asks <= upper_bound))
+        if hits.size:
+            return float(strikes[hits[0]]), float(asks[hits[0]])
+
+    # Tried this for a week, cheap contracts aren't always the best. Kept as fallback: directional cheapest
+    otm = strikes < current_price if cp == "put" else strikes > current_price
+    if otm.any():
+        k = int(np.argmin(np.where(otm, asks, np.inf)))
+        print_log(f"    [Using Cheapest] fallback → Strike: {strikes[k]}, Ask: {asks[k]}")
+        return float(strikes[k]), float(asks[k])
+    return None
+
+class OptionChainCache:
+    def __init__(self):
+        self._chains: Dict[Tuple[str, str], OptionChain] = {}
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def put(self, symbol: str, expiration: str, options: List[dict]) -> OptionChain:
+        chain = OptionChain(symbol, expiration, options)
+        self._chains[(symbol, expiration)] = chain
+        return chain
+
+    def get(self, symbol: str, expiration: str, max_age: Optional[float] = MAX_AGE) -> Optional[OptionChain]:
+        chain = self._chains.get((symbol, expiration))
+        if chain is None or (max_age is not None and chain.age() > max_age):
+            return None
+        return chain
+
+    async def refresh(self, symbol: str, expiration: str, fetch: FetchChain) -> Optional[OptionChain]:
+        options = await fetch()
+        if not options:
+            return None
+        return self.put(symbol, expiration, options)
+
+    async def get_or_fetch(self, symbol: str, expiration: str, fetch: FetchChain,
+                           max_age: Optional[float] = MAX_AGE) -> Optional[OptionChain]:
+        """Cached chain, or one inline download when it is missing/too old."""
+        chain = self.get(symbol, expiration, max_age)
+        if chain is None:
+            print_log(f"    [CHAIN] {symbol} {expiration} not cached, fetching inline.")
+            chain = await self.refresh(symbol, expiration, fetch)
+        return chain
+
+    def start_refresher(self, symbol: str, expiration: str, fetch: FetchChain,
+                        interval: float = REFRESH_SECONDS) -> asyncio.Task:
+        key = (symbol, expiration)
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            task = self._tasks[key] = asyncio.create_task(self._refresh_loop(key, fetch, interval), name=f"ChainRefresh-{symbol}-{expiration}")
+        return task
+
+    async def _refresh_loop(self, key, fetch: FetchChain, interval: float):
+        while True:
+            try:
+                await self.refresh(*key, fetch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print_log(f"[CHAIN] Refresh {key[0]} {key[1]} failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    def clear(self):
+        self.stop()
+        self._chains.clear()
+
+CHAINS = OptionChainCache()
@@ -71,6 +71,30 @@ def _collect_candle_files(timeframe: str, include_days: bool, include_parts: boo
 
     return out
 
+def _files_signature(files) -> Tuple[int, int, int]:
+    """(file count, newest mtime_ns, total bytes); changes whenever a file is written, added or removed."""
+    count = newest = size = 0
+    for f in files:
+        try:
+            st = os.stat(f)
+        except OSError:
+            continue  # compacted away between the glob and the stat
+        count += 1
+        newest = max(newest, st.st_mtime_ns)
+        size += st.st_size
+    return count, newest, size
+
+def data_version(timeframe: str, include_days: bool = True, include_parts: bool = True):
+    """
+    Cheap change signal for a timeframe: a stat of its candle files plus the
+    current objects snapshot, no parquet is opened. Equal versions mean
+    `load_viewport()` would return the same data (`web_dash/figure_cache.py`).
+    Returns `(candles_signature, objects_signature)`.
+    """
+    candles = _files_signature(_collect_candle_files(timeframe, include_days, include_parts))
+    objects = _files_signature([paths.CURRENT_OBJECTS_PATH])
+    return candles, objects
+
 def _ts_sql_expr() -> str:
     """Normalized timestamp expression in local (chart) time."""
     return f"""(COALESCE(
@@ -0,0 +1,195 @@
+# storage/warmup_cache.py
+from __future__ import annotations
+import asyncio
+import math
+import re
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import duckdb
+import pandas as pd
+import pandas_market_calendars as mcal
+import paths
+from shared_state import indent, print_log
+
+"""
+Fetch-once warm-up history for EMA seeding.
+
+Before 09:45 ET `update_ema()` needs "enough" older candles to seed the EMAs
+on every closed bar. Prior days never change, so they are resolved once per
+session per timeframe, in this order:
+
+  1) in-memory session cache            (same process, same day)
+  2) our own `storage/data/<tf>/...`    (when it already holds enough bars)
+  3) `storage/warmup/<tf>/<day>.parquet` (days downloaded on an earlier run)
+  4) the provider, all missing days fetched in parallel, then saved to (3)
+
+Today's premarket is NOT cached here (with delayed data it is still growing
+until ~09:45), the caller fetches that single range itself.
+"""
+
+MARKET_TZ = "America/New_York"
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+EXTENDED_SESSION_MINUTES = 16 * 60  # 04:00 → 20:00 ET, what an "ALL" fetch returns
+MAX_DAYS_BACK = 10
+
+_SESSION: Dict[Tuple[str, str], pd.DataFrame] = {}
+_LOCKS: Dict[Tuple[str, str], asyncio.Lock] = {}
+_TF_MINUTES_RE = re.compile(r"(\d+)")
+
+FetchDay = Callable[[str], Awaitable[Optional[pd.DataFrame]]]
+
+def _tf_minutes(timeframe: str) -> int:
+    m = _TF_MINUTES_RE.search(str(timeframe))
+    return int(m.group(1)) if m else 1
+
+def _normalize(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """Keep only the OHLCV columns, NY-aware timestamps, oldest first."""
+    if df is None or df.empty:
+        return None
+    out = df.copy()
+    if "timestamp" not in out.columns and "ts" in out.columns:
+        out["timestamp"] = pd.to_datetime(out["ts"], unit="ms", utc=True)
+    ts = pd.to_datetime(out["timestamp"])
+    ts = ts.dt.tz_localize("UTC") if ts.dt.tz is None else ts
+    out["timestamp"] = ts.dt.tz_convert(MARKET_TZ)
+    if "volume" not in out.columns:
+        out["volume"] = 0.0
+    out = out[COLUMNS].sort_values("timestamp").drop_duplicates("timestamp", keep="last")
+    return out.reset_index(drop=True)
+
+def previous_trading_days(today: str, n: int = MAX_DAYS_BACK) -> List[str]:
+    """Up to `n` NYSE sessions strictly before `today`, newest first."""
+    end = pd.Timestamp(today) - timedelta(days=1)
+    start = end - timedelta(days=n * 2 + 10)  # weekends + holidays slack
+    days = mcal.get_calendar("NYSE").valid_days(start_date=start, end_date=end)
+    return [d.strftime("%Y-%m-%d") for d in reversed(days)][:n]
+
+# ───🔹 LOCAL DAY FILES ─────────────────────────────
+
+def load_day(timeframe: str, day: str) -> Optional[pd.DataFrame]:
+    path = paths.get_warmup_path(timeframe, day)
+    if not path.exists():
+        return None
+    try:
+        return _normalize(pd.read_parquet(path))
+    except Exception as e:
+        print_log(f"[WARMUP] Unreadable `{paths.pretty_path(path)}`, refetching: {e}")
+        return None
+
+def save_day(timeframe: str, day: str, df: pd.DataFrame) -> None:
+    path = paths.get_warmup_path(timeframe, day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    df.to_parquet(tmp, index=False)
+    tmp.replace(path)
+
+# ───🔹 OUR OWN HISTORY (storage/data) ─────────────────────────────
+
+def history_from_storage(timeframe: str, bars: int, today: str) -> Optional[pd.DataFrame]:
+    """
+    Last `bars` candles before `today` from `storage/data/<tf>` (dayfiles + parts).
+    Returns None when we don't hold that many yet.
+    """
+    root = paths.DATA_DIR / timeframe.lower()
+    if not root.exists():
+        return None
+    files = [str(p) for p in root.glob("*.parquet")]
+    files += [str(p) for p in root.glob("*/part-*.parquet")]
+    if not files:
+        return None
+
+    cutoff_ms = int(pd.Timestamp(today, tz=MARKET_TZ).tz_convert("UTC").timestamp() * 1000)
+    con = duckdb.connect(":memory:")
+    try:
+        df = con.execute("""
+            SELECT ts, open, high, low, close, volume
+            FROM read_parquet(?, union_by_name=1)
+            WHERE ts IS NOT NULL AND ts < ?
+            ORDER BY ts DESC
+            LIMIT ?
+        """, [files, cutoff_ms, int(bars)]).df()
+    except Exception as e:
+        print_log(f"[WARMUP] storage/data read failed for {timeframe}: {e}")
+        return None
+    finally:
+        con.close()
+
+    if len(df) < bars:
+        return None
+    return _normalize(df)
+
+# ───🔹 PUBLIC ─────────────────────────────
+
+async def get_warmup_history(
+    timeframe: str,
+    bars: int,
+    fetch_day: FetchDay,
+    today: str,
+    indent_lvl: int = 1,
+) -> Optional[pd.DataFrame]:
+    """
+    At least `bars` candles from sessions before `today` (oldest first), or
+    whatever could be gathered within MAX_DAYS_BACK. `fetch_day(day)` is only
+    called for days that are in neither cache; one call per missing day, run
+    concurrently.
+    """
+    key = (timeframe.lower(), today)
+    if key in _SESSION:
+        return _SESSION[key]
+
+    lock = _LOCKS.setdefault(key, asyncio.Lock())
+    async with lock:
+        if key in _SESSION:  # another task filled it while we waited
+            return _SESSION[key]
+
+        pad = indent(indent_lvl)
+        df = history_from_storage(timeframe, bars, today)
+        if df is not None:
+            print_log(f"{pad}[WARMUP] {timeframe}: {len(df)} bars served from storage/data.")
+            _SESSION[key] = df
+            return df
+
+        per_day = max(1, EXTENDED_SESSION_MINUTES // _tf_minutes(timeframe))
+        batch = max(1, math.ceil(bars / per_day))
+        days = previous_trading_days(today, MAX_DAYS_BACK)
+
+        frames: List[pd.DataFrame] = []
+        have, fetched, i = 0, 0, 0
+        while have < bars and i < len(days):
+            chunk = days[i:i + batch]
+            i += len(chunk)
+            batch = 1  # first guess was short; widen one day at a time
+
+            loaded = {d: load_day(timeframe, d) for d in chunk}
+            missing = [d for d, v in loaded.items() if v is None]
+            if missing:
+                results = await asyncio.gather(*(fetch_day(d) for d in missing), return_exceptions=True)
+                for d, res in zip(missing, results):
+                    if isinstance(res, Exception):
+                        print_log(f"{pad}[WARMUP] fetch {timeframe} {d} failed: {res}")
+                        continue
+                    res = _normalize(res)
+                    if res is not None:
+                        save_day(timeframe, d, res)
+                        loaded[d] = res
+                        fetched += 1
+
+            for d in chunk:  # newest → oldest
+                if loaded.get(d) is not None:
+                    frames.append(loaded[d])
+                    have += len(loaded[d])
+
+        if not frames:
+            print_log(f"{pad}[WARMUP] {timeframe}: no history available.")
+            return None
+
+        df = pd.concat(list(reversed(frames)), ignore_index=True)
+        print_log(f"{pad}[WARMUP] {timeframe}: {len(df)} bars from {len(frames)} day(s), {fetched} fetched.")
+        if have >= bars:
+            _SESSION[key] = df  # only pin complete results; a short one is retried next bar
+        return df
+
+def clear_session_cache() -> None:
+    """Drop the in-memory session cache (local day files are kept)."""
+    _SESSION.clear()
+    _LOCKS.clear()
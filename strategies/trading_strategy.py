@@ -4,18 +4,19 @@ from datetime import datetime, timedelta, time
 from order_handler import get_profit_loss_orders_list, sell_rest_of_active_order
 from error_handler import error_log_and_discord_message
 from utils.file_utils import get_current_candle_index
-from utils.json_utils import load_json_df, record_priority_candle
-from utils.log_utils import read_last_n_lines
+from utils.event_bus import FlagsCompleted, subscribe
 from objects import candle_zone_handler, get_objects
 from buy_option import reset_usedBP_messageIDs
-from indicators.flag_manager import identify_flag, create_state
+from submit_order import start_option_chain_refresher
+from utils.order_utils import get_expiration
+from utils.json_utils import read_config
+from indicators.flag_manager import start_flag_detector, create_state
 from rule_manager import handle_rules_and_order
-from sentiment_engine import get_current_sentiment
-from shared_state import indent, print_log, latest_sentiment_score
+from sentiment_engine import start_sentiment_subscriber
+from shared_state import indent, print_log
 import pytz
 import cred
 import aiohttp
-from paths import CANDLE_LOGS, PRIORITY_CANDLES_PATH
 
 STRATEGY_NAME = "FLAG/ZONE STRAT"
 
@@ -44,18 +45,21 @@ async def execute_trading_strategy():
 
     zones, tpls = get_objects()
 
-    # Wait for start and populate data
-    while True:
-        await asyncio.sleep(0.5)  # Check every half second
-        f_candle = read_last_n_lines(CANDLE_LOGS.get("2M"), 1)
-        if f_candle:
-            print_log(f"[ETS] First candle processed: {f_candle[0]}")
-            break
+    # Subscribe before the first await so no bar is missed. Flags and sentiment run as their
+    # own bar-event subscribers; we react to the flag detector's per-bar result.
+    flag_results = subscribe(FlagsCompleted, name="strategy", timeframe="2M")
+    workers = [
+        start_flag_detector("2M", indent_lvl=indent_lvl+1, print_satements=False),
+        start_sentiment_subscriber(zones, tpls, log_indent=indent_lvl+1),  # keeps `latest_sentiment_score` current for the position manager's stop checks
+    ]
 
     last_processed_candle = None
 
     async with aiohttp.ClientSession() as session:  # Initialize HTTP session
         headers = {"Authorization": f"Bearer {cred.TRADIER_BROKERAGE_ACCOUNT_ACCESS_TOKEN}", "Accept": "application/json"}
+        # Keep the entry expiration's chain warm, `find_what_to_buy()` reads it from memory
+        expiration_date = get_expiration(read_config('OPTION_EXPIRATION_DTE'))
+        workers.append(start_option_chain_refresher(read_config('SYMBOL'), expiration_date, session, headers))
         try:
             while True:
                 # Check if current time is within one minute of market close
@@ -68,33 +72,25 @@ async def execute_trading_strategy():
                     last_processed_candle = None
                     break
 
-                current_last_candle = read_last_n_lines(CANDLE_LOGS.get("2M"), 1)  # Read the latest candle
-                if current_last_candle and current_last_candle != last_processed_candle:
-                    last_processed_candle = current_last_candle
-                    # Get candle, its OHLC values
-                    candle = last_processed_candle[0]
+                # Woken per closed 2M bar; the timeout keeps the market-close check above ticking
+                result = await flag_results.get(timeout=1)
+                if result is not None:
+                    if last_processed_candle is None:
+                        print_log(f"[ETS] First candle processed: {result.bar}")
+                    # Get candle, its OHLC values (`candle_index` included)
+                    candle = last_processed_candle = result.bar.as_candle(zone_type="None")
 
                     # Figure out where the candle is relative to zones, this tells us if were outside or inside a zone.
                     #candle_zone_type, is_in_zone = candle_zone_handler(candle, zones)
                     #able_to_buy = not is_in_zone # if so, don't buy inside zones
                     #print_log(f"{indent(indent_lvl)}[ETS-CZH] Zone setup: {candle_zone_type}")
                         
-                    # Data allocation
-                    await record_priority_candle(candle, "None", "2M") # Add candle into `priority_candles.json` to store certian vales into
-                    last_candle = load_json_df(PRIORITY_CANDLES_PATH).iloc[-1].to_dict()
-                        
-                    # Flag handling
-                    flags_completed = await identify_flag(last_candle, indent_lvl=indent_lvl+1, print_satements=False)
+                    # Flag handling (already ran in the flag detector for this bar)
+                    flags_completed = list(result.flag_names)
                     print_log(f"{indent(indent_lvl)}[ETS-IF] Num Flags Completed: {len(flags_completed)}")
                     # Len simpler in logs, if need be for more trackable situations just delete the 'len()'
                     #update_2_min(indent_lvl=indent_lvl)
 
-                    #current_candle_score = get_current_sentiment(candle, zones, tpls, indent_lvl+1, False)
-                    #print_log(f"{indent(indent_lvl)}[ETS-GCS] Sentiment Score: {current_candle_score}")
-                        
-                    # Give's `manage_active_order()` 'current_candle_score' access.
-                    #latest_sentiment_score["score"] = current_candle_score
-
                     #if able_to_buy and flags_completed:
                         #handling_detials=await handle_rules_and_order(1, candle, candle_zone_type, zones, flags_completed, session=session, headers=headers, print_statements=False)
                         #if handling_detials[0]:
@@ -104,11 +100,13 @@ async def execute_trading_strategy():
                             #order_status_message = f"Order Blocked, {handling_detials[1]}"
                         #print_log(f"{indent(indent_lvl)}[ETS-HRAO] {order_status_message}")
                     #update_2_min()
-                else:
-                    await asyncio.sleep(1)  # Wait for new candle data
 
         except Exception as e:
             await error_log_and_discord_message(e, "tll_trading_strategy", "execute_trading_strategy")
+        finally:
+            flag_results.close()
+            for task in workers:
+                task.cancel()
     
 def print_log_candle(candle):
     timestamp_str = candle["timestamp"]
@@ -7,7 +7,8 @@ import aiohttp
 from data_acquisition import read_config, get_current_price # this if for shared state get price, more efficient
 from error_handler import error_log_and_discord_message
 from shared_state import print_log
-from utils.order_utils import build_active_order, calculate_quantity, get_strikes_to_consider
+from utils.order_utils import build_active_order, calculate_quantity
+from storage.option_chain_cache import CHAINS, select_strike
 import json
 import sys
 from paths import MESSAGE_IDS_PATH
@@ -30,62 +31,39 @@ def save_message_ids(order_id, message_id):
     with open(MESSAGE_IDS_PATH, 'w') as f:
         json.dump(existing_data, f, indent=4)
 
-async def find_what_to_buy(symbol, cp, num_out_of_the_money, next_expiration_date, TP_value, session, headers):
-    # Replace with actual URL to fetch option chain data
-    option_chain_url = f"{cred.TRADIER_BROKERAGE_BASE_URL}markets/options/chains?symbol={symbol}&expiration={next_expiration_date}"
-    
+async def fetch_option_chain(symbol, expiration_date, session, headers):
+    """Raw `markets/options/chains` list for one expiration (None on a bad response)."""
+    option_chain_url = f"{cred.TRADIER_BROKERAGE_BASE_URL}markets/options/chains?symbol={symbol}&expiration={expiration_date}"
     async with session.get(option_chain_url, headers=headers) as response:
         if response.status != 200:
             print_log(f"Received unexpected status code {response.status}: {await response.text()}")
             return None
-        try:
-            response_json = await response.json()
-            options = response_json.get('options', {}).get('option', [])
-            
-            # Filter the options based on the 'cp' variable (call or put)
-            filtered_options = [opt for opt in options if opt['option_type'] == cp]
-            
-            # Get the current price to determine the range of strikes to consider
-            #current_price = await get_current_price(symbol, session, headers)
-            # TODO shared state, more efficient, less api calls
-            current_price = await get_current_price()
+        response_json = await response.json()
+    return (response_json.get('options') or {}).get('option', [])
 
-            if not current_price:
-                raise ValueError("Could not determine current price.")
-            
-            # Determine the strikes to consider based on the current price
-            strikes_to_consider = get_strikes_to_consider(cp, current_price, num_out_of_the_money, filtered_options)
-            
-            # Define the price ranges
-            price_ranges = [(0.30, 0.50), (0.20, 0.80), (0.10, 1.25)]
+def start_option_chain_refresher(symbol, expiration_date, session, headers):
+    """Keep the (symbol, expiration) chain warm in the background so entries don't wait on a download."""
+    return CHAINS.start_refresher(symbol, expiration_date, lambda: fetch_option_chain(symbol, expiration_date, session, headers))
 
-            # Find the appropriate contract within the asking price ranges
-            for lower_bound, upper_bound in price_ranges:
-                for strike, ask in strikes_to_consider.items():
-                    if lower_bound <= ask <= upper_bound:
-                        return strike, ask
-             
-            # Tried this block of code for a week, turns out cheap contracts arent always the best. Using it as fall back
-            # Fallback: directional cheapest contract
-            if cp == "put":
-                # Sort strikes below current price by ask
-                fallback_candidates = {
-                    k: v for k, v in strikes_to_consider.items()
-                    if float(k) < current_price and v is not None
-                }
-            else:  # cp == "call"
-                fallback_candidates = {
-                    k: v for k, v in strikes_to_consider.items()
-                    if float(k) > current_price and v is not None
-                }
-            if fallback_candidates:
-                cheapest_strike = min(fallback_candidates.items(), key=lambda x: x[1])
-                print_log(f"    [Using Cheapest] fallback → Strike: {cheapest_strike[0]}, Ask: {cheapest_strike[1]}")
-                return cheapest_strike
-            
-        except Exception as e:
-            await error_log_and_discord_message(e, "submit_order", "find_what_to_buy", "Error parsing JSON or processing data")
-            return None
+async def find_what_to_buy(symbol, cp, num_out_of_the_money, next_expiration_date, TP_value, session, headers):
+    try:
+        chain = await CHAINS.get_or_fetch(
+            symbol, next_expiration_date, lambda: fetch_option_chain(symbol, next_expiration_date, session, headers))
+        if chain is None:
+            return None, None
+
+        # TODO shared state, more efficient, less api calls
+        current_price = await get_current_price()
+        if not current_price:
+            raise ValueError("Could not determine current price.")
+
+        # Strike window by bisect, ask ranges as vectorized masks (see `storage/option_chain_cache.py`)
+        picked = select_strike(chain, cp, current_price, num_out_of_the_money)
+        return picked if picked else (None, None)
+
+    except Exception as e:
+        await error_log_and_discord_message(e, "submit_order", "find_what_to_buy", "Error parsing JSON or processing data")
+        return None, None
 
 async def submit_option_order(strategy_name, symbol, strike, option_type, bid, expiration_date, quantity=None, side=None, order_type=None, session=None, headers=None, message_ids_dict=None, buying_power=None, TP_value=None):
     if read_config('REAL_MONEY_ACTIVATED'):
@@ -147,55 +125,46 @@ async def submit_option_order(strategy_name, symbol, strike, option_type, bid, e
             await print_discord(f"\nOrder submission failed. Response status code: {response.status_code}", error_message)
             return None
     else: # Custom Paper Trading Setup
-        option_chain_url = f"{cred.TRADIER_BROKERAGE_BASE_URL}markets/options/chains?symbol={symbol}&expiration={expiration_date}"
-
-        async with session.get(option_chain_url, headers=headers) as response:
-            if response.status != 200:
-                print_log(f"Received unexpected status code {response.status}: {await response.text()}")
-                return None
-            try:
-                response_json = await response.json()
-                options = response_json.get('options', {}).get('option', [])
-                
-                # Filter the options based on the 'cp' variable (call or put)
-                filtered_options = [opt for opt in options if opt['option_type'] == option_type]
-                
-                # Get the ask price for the current contract
-                for option in filtered_options:
-                    if option['strike'] == strike:
-                        ask = option['ask']
-                
-                if ask is not None:
-                    while True:
-                        quantity = calculate_quantity(ask, read_config('ACCOUNT_ORDER_PERCENTAGE'))
-                        order_cost = (ask * 100) * quantity #order_cost = (ask * 100 + commission_fee) * quantity
-                        if order_cost <= buying_power:
-                            break  # If the cost fits within the buying power, proceed with this quantity
-                        else:
-                            percentage_of_balance -= 0.01  # Decrease the percentage and recheck
-                            if percentage_of_balance <= 0:
-                                # If the percentage drops too low (e.g., below 1%), cancel the order
-                                print_log("Not enough buying power for even a single contract.")
-                                return None
-                else:
-                    await error_log_and_discord_message(e, "submit_order", "submit_option_order_v2", "Error getting option [ask] price")
-
-                timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
-                unique_order_ID = f"{symbol}-{option_type}-{strike}-{expiration_date}-{timestamp}"
-                total_investment = (ask * 100) * quantity
-                _message_ = f"**{strategy_name}**\n-----\n**Ticker Symbol:** {symbol}\n**Strike Price:** {strike}\n**Option Type:** {option_type}\n**Quantity:** {quantity} contracts\n**Price:** ${ask:.2f}\n**Total Investment:** ${total_investment:.2f}\n-----"
-                message_obj = await print_discord(_message_)
-                message_ids_dict[unique_order_ID] = message_obj.id # Save message ID for this specific order
-                save_message_ids(unique_order_ID, message_ids_dict[unique_order_ID])
-                
-                active_order = build_active_order(
-                    unique_order_ID, None, ask, quantity, TP_value=TP_value
-                )
-                return active_order
-                
-            except Exception as e:
-                await error_log_and_discord_message(e, "submit_order", "submit_option_order_v2")
-                return None
+        chain = await CHAINS.get_or_fetch(
+            symbol, expiration_date, lambda: fetch_option_chain(symbol, expiration_date, session, headers))
+        if chain is None:
+            return None
+        try:
+            # Get the ask price for the current contract
+            quote = chain.side(option_type).quote(strike)
+            ask = quote[1] if quote else None
+            
+            if ask is not None:
+                while True:
+                    quantity = calculate_quantity(ask, read_config('ACCOUNT_ORDER_PERCENTAGE'))
+                    order_cost = (ask * 100) * quantity #order_cost = (ask * 100 + commission_fee) * quantity
+                    if order_cost <= buying_power:
+                        break  # If the cost fits within the buying power, proceed with this quantity
+                    else:
+                        percentage_of_balance -= 0.01  # Decrease the percentage and recheck
+                        if percentage_of_balance <= 0:
+                            # If the percentage drops too low (e.g., below 1%), cancel the order
+                            print_log("Not enough buying power for even a single contract.")
+                            return None
+            else:
+                await error_log_and_discord_message(e, "submit_order", "submit_option_order_v2", "Error getting option [ask] price")
+
+            timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+            unique_order_ID = f"{symbol}-{option_type}-{strike}-{expiration_date}-{timestamp}"
+            total_investment = (ask * 100) * quantity
+            _message_ = f"**{strategy_name}**\n-----\n**Ticker Symbol:** {symbol}\n**Strike Price:** {strike}\n**Option Type:** {option_type}\n**Quantity:** {quantity} contracts\n**Price:** ${ask:.2f}\n**Total Investment:** ${total_investment:.2f}\n-----"
+            message_obj = await print_discord(_message_)
+            message_ids_dict[unique_order_ID] = message_obj.id # Save message ID for this specific order
+            save_message_ids(unique_order_ID, message_ids_dict[unique_order_ID])
+            
+            active_order = build_active_order(
+                unique_order_ID, None, ask, quantity, TP_value=TP_value
+            )
+            return active_order
+            
+        except Exception as e:
+            await error_log_and_discord_message(e, "submit_order", "submit_option_order_v2")
+            return None
 
 async def get_order_status(strategy_name, real_money_activated, order_id, b_s, ticker_symbol, cp, strike, expiration_date, order_timestamp, message_ids_dict):
     if real_money_activated:
@@ -0,0 +1,22 @@
+# tests\indicator_unit_tests\conftest.py
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+import types
+import pytest
+import importlib
+
+@pytest.fixture
+def tmp_emas(tmp_path, monkeypatch):
+    paths = importlib.import_module("paths")
+    emas_dir = tmp_path / "storage" / "emas"
+    emas_dir.mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(paths, "EMAS_DIR", emas_dir, raising=False)
+
+    # fresh in-memory engines per test
+    ema_utils = importlib.import_module("utils.ema_utils")
+    monkeypatch.setattr(ema_utils, "_EMA_ENGINES", {}, raising=False)
+
+    yield types.SimpleNamespace(EMAS_DIR=emas_dir, ema_utils=ema_utils)
@@ -0,0 +1,63 @@
+# tests/indicator_unit_tests/test_ema_engine.py
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from utils.ema_utils import IncrementalEMA, ema_alpha, ema_step
+
+WINDOWS = [13, 48, 200]
+
+def _closes(n=600, seed=7):
+    rng = np.random.default_rng(seed)
+    closes = 450 + np.cumsum(rng.normal(0, 0.35, n))
+    closes[50:55] = closes[49]  # flat run, exercises the prev == close branch
+    return closes.round(2)
+
+@pytest.mark.parametrize("window", WINDOWS + [1, 2, 9])
+def test_step_matches_pandas_exactly(window):
+    closes = _closes()
+    expected = pd.Series(closes).ewm(span=window, adjust=False).mean().to_numpy()
+    prev, got = None, []
+    for c in closes:
+        prev = ema_step(prev, c, ema_alpha(window))
+        got.append(prev)
+    assert np.array_equal(np.array(got), expected)  # bit-for-bit, not approx
+
+def test_seed_then_update_matches_full_history():
+    closes = _closes()
+    hist, live = closes[:450], closes[450:]
+    eng = IncrementalEMA("2M", WINDOWS).seed(hist)
+    for i, c in enumerate(live):
+        row = eng.update(c, i)
+    for w in WINDOWS:
+        expected = pd.Series(closes).ewm(span=w, adjust=False).mean().iloc[-1]
+        assert row[str(w)] == expected
+    assert row["x"] == len(live) - 1
+
+def test_state_roundtrip_and_series(tmp_emas):
+    eu = tmp_emas.ema_utils
+    closes = _closes(300)
+    eu.seed_ema_engine("5M", closes[:250])
+
+    async def run():
+        for i, c in enumerate(closes[250:275]):
+            await eu.calculate_save_EMAs({"close": float(c), "timestamp": f"t{i}"}, i, "5M")
+    asyncio.run(run())
+
+    # simulate a restart: drop in-memory engines, reload from the state file
+    eu._EMA_ENGINES.clear()
+    async def run_rest():
+        for i, c in enumerate(closes[275:], start=25):
+            await eu.calculate_save_EMAs({"close": float(c)}, i, "5M")
+    asyncio.run(run_rest())
+
+    series = eu.read_ema_series("5M")
+    assert len(series) == 50
+    assert [r["x"] for r in series] == list(range(50))
+    expected = pd.Series(closes).ewm(span=48, adjust=False).mean()
+    assert series[-1]["48"] == expected.iloc[-1]
+    assert eu.get_latest_ema_values("48", "5M") == (expected.iloc[-1], 49)
+
+    eu.reset_ema_engine("5M")
+    assert eu.read_ema_series("5M") == []
+    assert eu.get_latest_ema_values("48", "5M") == (None, None)
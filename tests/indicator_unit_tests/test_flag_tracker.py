@@ -0,0 +1,62 @@
+# tests/indicator_unit_tests/test_flag_tracker.py
+import json
+import random
+import pytest
+from indicators.flag_manager import FlagPoint, FlagTracker, calculate_slope_intercept, filter_candles
+
+def _reference_fit(points):
+    # the old full-recompute formula
+    n = len(points)
+    sx = sum(p[0] for p in points); sy = sum(p[1] for p in points)
+    sxy = sum(p[0] * p[1] for p in points); sxx = sum(p[0] ** 2 for p in points)
+    slope = (n * sxy - sx * sy) / (n * sxx - sx ** 2)
+    return slope, sy / n - slope * sx / n
+
+def _points(n=150, seed=11):
+    rng = random.Random(seed)
+    y = 600.0
+    out = []
+    for x in range(1, n + 1):
+        y = round(y - rng.uniform(-0.05, 0.12), 2)
+        out.append(FlagPoint(x, y, round(y + 0.1, 2)))
+    return out
+
+def test_running_sums_match_full_recompute_after_adds_and_removals():
+    start = FlagPoint(0, 601.0, 601.2)
+    pts = _points()
+    tracker = FlagTracker(start)
+    for p in pts:
+        tracker.add(p)
+    kept = pts[::3]
+    tracker.retain(kept)
+
+    fresh = FlagTracker(start, kept)
+    assert (tracker.n, tracker.sx, tracker.sxx, tracker.sy, tracker.sxy) == (fresh.n, fresh.sx, fresh.sxx, fresh.sy, fresh.sxy)
+    slope, intercept = tracker.fit()
+    ref_slope, ref_intercept = _reference_fit([start] + kept)
+    assert slope == pytest.approx(ref_slope, rel=1e-12)
+    assert intercept == pytest.approx(ref_intercept, rel=1e-12)
+
+def test_calculate_slope_intercept_same_with_and_without_tracker():
+    start = FlagPoint(0, 601.0, 601.2)
+    pts = _points(40)
+    tracker = FlagTracker(start, pts)
+    a = calculate_slope_intercept(0, pts, start, "bull", False, 41, tracker=tracker)
+    b = calculate_slope_intercept(0, [list(p) for p in pts], list(start), "bull", False, 41)
+    assert a[:2] == pytest.approx(b[:2])
+    assert a[2] == pytest.approx(b[2]) and a[3] == pytest.approx(b[3])
+    # translated line sits on/above every point for a bull flag
+    slope, intercept = a[0], a[1]
+    assert all(p.y <= slope * p.x + intercept + 1e-9 for p in [start] + pts)
+
+def test_flow_dedupe_keeps_latest_x_for_same_price():
+    start = FlagPoint(0, 10.0, 10.2)
+    pts = [FlagPoint(1, 9.5, 9.6), FlagPoint(2, 9.8, 9.9), FlagPoint(3, 9.5, 9.7), FlagPoint(4, 9.9, 10.0)]
+    current = FlagPoint(5, 9.0, 9.1)
+    kept, _ = filter_candles(0, start, pts, current, "bull", False, {"mode": "flow", "last_pivot_point": None})
+    assert [p.x for p in kept] == [2, 3, 4]
+
+def test_points_stay_json_friendly():
+    p = FlagPoint(3, 1.5, 1.7)
+    assert json.loads(json.dumps({"start_point": p})) == {"start_point": [3, 1.5, 1.7]}
+    assert not hasattr(p, "__dict__")
@@ -0,0 +1,75 @@
+# tests/indicator_unit_tests/test_indicator_engine.py
+import importlib
+import numpy as np
+import pandas as pd
+import pytest
+from indicators.indicator_engine import IndicatorEngine, compute_batch, default_indicators
+
+def _bars(n=900, seed=3, with_volume=True):
+    rng = np.random.default_rng(seed)
+    # three sessions of 2m bars so VWAP / session high-low resets are exercised
+    ts = pd.concat([
+        pd.Series(pd.date_range(f"2025-09-0{d} 09:30", periods=n // 3, freq="2min", tz="America/New_York"))
+        for d in (2, 3, 4)
+    ], ignore_index=True)
+    close = 640 + np.cumsum(rng.normal(0, 0.2, n)).round(2)
+    close[n // 9:n // 9 + 4] = close[n // 9 - 1]
+    high = close + rng.uniform(0, 0.3, n).round(2)
+    low = close - rng.uniform(0, 0.3, n).round(2)
+    vol = rng.integers(1_000, 50_000, n).astype(float) if with_volume else np.zeros(n)
+    return pd.DataFrame({"timestamp": ts.map(lambda t: t.isoformat()), "open": close, "high": high,
+                         "low": low, "close": close, "volume": vol})
+
+@pytest.mark.parametrize("with_volume", [True, False])
+def test_incremental_matches_batch_exactly(with_volume):
+    df = _bars(with_volume=with_volume)
+    eng = IndicatorEngine("2m", capacity=256)
+    rows = [eng.on_bar(c).array.copy() for c in df.to_dict("records")]
+    inc = np.vstack(rows)
+
+    batch = compute_batch(df)
+    names = list(eng.index)
+    assert np.array_equal(inc, batch[names].to_numpy(), equal_nan=True)
+
+def test_ema_columns_match_pandas_and_sessions_reset():
+    df = _bars()
+    batch = compute_batch(df)
+    for ind in default_indicators():
+        for name in ind.names:
+            if name.startswith("ema_"):
+                w = int(name.split("_")[1])
+                assert np.array_equal(batch[name].to_numpy(), df["close"].ewm(span=w, adjust=False).mean().to_numpy())
+    first_of_day2 = batch.index[300]
+    assert batch.loc[first_of_day2, "session_high"] == df.loc[300, "high"]
+    assert batch.loc[first_of_day2, "vwap"] == pytest.approx((df.loc[300, "high"] + df.loc[300, "low"] + df.loc[300, "close"]) / 3)
+
+def test_latest_view_is_read_only_and_live():
+    eng = IndicatorEngine("5m")
+    view = eng.latest()
+    eng.on_bar({"timestamp": "2025-09-02T09:30:00-04:00", "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10})
+    assert view["session_high"] == 2.0
+    eng.on_bar({"timestamp": "2025-09-02T09:35:00-04:00", "open": 1.5, "high": 3, "low": 1, "close": 2.5, "volume": 10})
+    assert view["session_high"] == 3.0  # same view object sees the new bar
+    with pytest.raises(ValueError):
+        view.array[0] = 0.0
+    # duplicate / older bars are ignored
+    eng.on_bar({"timestamp": "2025-09-02T09:35:00-04:00", "open": 9, "high": 9, "low": 9, "close": 9, "volume": 1})
+    assert view["session_high"] == 3.0
+    assert list(eng.ring.last("close")) == [1.5, 2.5]
+
+def test_ring_wraps_and_batch_from_storage(tmp_path, monkeypatch):
+    paths = importlib.import_module("paths")
+    monkeypatch.setattr(paths, "DATA_DIR", tmp_path / "data", raising=False)
+    ie = importlib.import_module("indicators.indicator_engine")
+    pw = importlib.import_module("storage.parquet_writer")
+    df = _bars(n=30)
+    for c in df.to_dict("records"):
+        pw.append_candle("SPY", "2m", c)
+
+    eng = ie.IndicatorEngine("2m", capacity=8)
+    eng.warm(ie.load_history("2m"))
+    assert list(eng.ring.last("close")) == list(df["close"].iloc[-8:])
+
+    batch = ie.batch_from_storage("2m")
+    assert len(batch) == 30
+    assert np.array_equal(eng.latest().array, batch[list(eng.index)].iloc[-1].to_numpy(), equal_nan=True)
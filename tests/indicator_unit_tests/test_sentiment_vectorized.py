@@ -0,0 +1,71 @@
+# tests/indicator_unit_tests/test_sentiment_vectorized.py
+import importlib
+import numpy as np
+import pandas as pd
+
+se = importlib.import_module("sentiment_engine")
+
+ZONES = {"resistance_1": (0, 592.0, 591.2), "support_1": (0, 585.0, 585.9), "PDH": (0, 589.4, 589.0)}
+TPLS = {"TPL_1": (0, 588.0), "TPL_2": (0, 590.5)}
+
+# The scalar rules as they were written before the array version (reference)
+def _legacy(candle, zones, tp_lines, emas):
+    score = 0
+    if emas:
+        for a, b, w in (("13", "48", 1), ("13", "200", 2), ("48", "200", 3)):
+            score += w if emas[a] > emas[b] else -w if emas[a] < emas[b] else 0
+        for k, w in (("13", 1), ("48", 2), ("200", 3)):
+            score += w if candle["close"] > emas[k] else -w
+    o, c, h, l = candle["open"], candle["close"], candle["high"], candle["low"]
+    for _, iv, buf in zones.values():
+        top, bottom = max(iv, buf), min(iv, buf)
+        if top >= c >= bottom:
+            break
+        if o < top and c > top:
+            score += 3
+            break
+        if o > bottom and c < bottom:
+            score -= 3
+            break
+    for _, v in tp_lines.values():
+        if o < v < c: score += 2
+        elif o > v > c: score -= 2
+        elif h >= v > c: score -= 1
+        elif l <= v < c: score += 1
+    return score
+
+def _random_bars(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 588 + np.cumsum(rng.normal(0, 0.6, n))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 0.2, n)
+    high = np.maximum(open_, close) + rng.random(n) * 0.8
+    low = np.minimum(open_, close) - rng.random(n) * 0.8
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close})
+
+def test_single_bar_matches_the_scalar_rules():
+    scorer = se.SentimentScorer(ZONES, TPLS)
+    bars = _random_bars(300)
+    emas = {"13": 588.7, "48": 588.1, "200": 589.3}
+    for candle in bars.to_dict("records"):
+        assert sum(scorer.components(candle, emas).values()) == _legacy(candle, ZONES, TPLS, emas)
+        assert sum(scorer.components(candle, None).values()) == _legacy(candle, ZONES, TPLS, None)
+
+def test_batch_scores_a_history_in_one_call():
+    bars = _random_bars(2000)
+    scores = se.score_history(bars, ZONES, TPLS)
+    emas = {str(w): bars["close"].ewm(span=w, adjust=False).mean() for w in (13, 48, 200)}
+    expected = [_legacy(c, ZONES, TPLS, {k: emas[k].iloc[i] for k in emas}) for i, c in enumerate(bars.to_dict("records"))]
+    assert scores.tolist() == expected
+
+    parts = se.score_history(bars.assign(**emas), ZONES, TPLS, components=True)  # precomputed EMA columns
+    assert list(parts.columns) == ["ema_cross", "candle_ema", "zone", "tpl", "score"]
+    assert parts["score"].tolist() == expected
+
+def test_reversal_mask_for_threshold_tuning():
+    scores = np.array([3, 1, -2, -3, 2])
+    assert se.sentiment_reversals(scores, "call", 2).tolist() == [False, False, True, True, False]
+    assert se.sentiment_reversals(scores, "put", 3).tolist() == [True, False, False, False, False]
+
+def test_no_objects():
+    scorer = se.SentimentScorer({}, {})
+    assert scorer.components({"open": 1, "high": 2, "low": 0.5, "close": 1.5}) == {"ema_cross": 0, "candle_ema": 0, "zone": 0, "tpl": 0}
@@ -0,0 +1,123 @@
+# tests/storage_unit_tests/test_backtest.py
+from pathlib import Path
+import sys
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+
+# Ensure repo root on path so we can import tools.backtest
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools import backtest as bt
+from indicators import flag_manager
+from utils import data_utils
+from utils.order_utils import get_entry_action
+
+def _synthetic_bars(n_days=3, seed=3):
+    rng = np.random.default_rng(seed)
+    frames, price = [], 580.0
+    for day in pd.bdate_range("2025-01-06", periods=n_days):
+        ts = pd.date_range(day + pd.Timedelta(hours=8, minutes=30), periods=195, freq="2min")
+        close = rng.normal(0, 0.25, 195).cumsum() + price
+        open_ = np.r_[price, close[:-1]]
+        high = np.maximum(open_, close) + rng.uniform(0, .15, 195)
+        low = np.minimum(open_, close) - rng.uniform(0, .15, 195)
+        frames.append(pd.DataFrame({"ts": ts, "open": open_, "high": high, "low": low, "close": close}))
+        price = close[-1]
+    return pd.concat(frames, ignore_index=True)
+
+def _bar(close, high=None, low=None, ts="2025-01-06 09:00:00"):
+    return {"open": close, "high": high or close, "low": low or close, "close": close, "timestamp": pd.Timestamp(ts)}
+
+def test_entry_action_follows_200_ema_and_blocks_opposite_flags():
+    assert get_entry_action(101, 100) == ("call", None)
+    assert get_entry_action(99, 100, ["state_1_flag_bull_2"]) == (None, "Bull flags completed → Blocking PUT signal.")
+    assert get_entry_action(101, 100, ["state_1_flag_bear_1"])[0] is None
+    assert get_entry_action(101, 100, ["state_1_flag_bear_1", "state_2_flag_bull_1"]) == ("call", None)
+
+def test_sim_broker_trims_targets_then_exits_runner_on_13_ema():
+    broker = bt.SimBroker(premium=1.0, delta=0.5, stop_loss=None, max_open=1, budget=1000, symbol="SPY")
+    position = broker.open("call", 580.0, "2025-01-06 09:00:00", 0.0)
+    assert position.quantity == 10 and len(position.sell_points) > 1
+    assert broker.open("put", 580.0, "2025-01-06 09:02:00", 120.0) is None  # max_open
+
+    # +$0.50 intrabar is +25% on the premium: the first target (20%) fills at its price, not the bar's
+    emas = {"13": 579.0, "48": 579.0, "200": 570.0}
+    broker.on_bar(_bar(580.2, high=580.5, ts="2025-01-06 09:04:00"), emas, 0, 240.0)
+    first = position.adjustments[0]
+    assert first["target"] == position.sell_points[0] == first["sold_price"] and position.remaining < 10
+
+    # close under the 13 EMA once only the runner is left
+    broker.on_bar(_bar(583.0, high=583.0, ts="2025-01-06 09:06:00"), emas, 0, 360.0)
+    broker.on_bar(_bar(578.5, ts="2025-01-06 09:08:00"), emas, 0, 480.0)
+    assert not broker.open_positions
+    (trade,) = broker.trades
+    assert trade["exit_reason"] == "13ema Hit on Runner" and trade["trims"] == len(position.sell_points) - 1
+    assert sum(s["quantity"] for s in position.adjustments) == 10
+    proceeds = sum(s["sold_price"] * 100 * s["quantity"] for s in position.adjustments)
+    assert np.isclose(trade["total_profit"], proceeds - 1000)
+
+def test_stop_loss_shapes_match_the_live_handler():
+    broker = bt.SimBroker(premium=1.0, budget=100, symbol="SPY")
+    put = broker.open("put", 580.0, "2025-01-06 09:00:00", 0.0)
+    emas = {"13": 581.0, "48": 582.0, "200": 590.0}
+    assert bt.stop_loss_reason(["SENTIMENT", 2], put, 1.0, 580, emas, 2) == "Sentiment Reversal Stop Loss"
+    assert bt.stop_loss_reason(["SENTIMENT", 2], put, 1.0, 580, emas, -5) is None
+    assert bt.stop_loss_reason(-20, put, 0.79, 580, emas, 0) == "-20% Stop Loss"
+    assert bt.stop_loss_reason(["EMA 13", -20], put, 0.9, 581.5, emas, 0) is None      # broke, loss not deep enough
+    assert bt.stop_loss_reason(["EMA 13", -20], put, 0.7, 581.5, emas, 0) == "EMA Break and (%) Loss"
+    assert bt.stop_loss_reason("EMA 48", put, 1.0, 582.5, emas, 0) == "13ema Trailing stop Hit"
+
+def test_in_memory_flag_lines_complete_the_same_flags_as_line_data_json(tmp_path, monkeypatch):
+    bars = _synthetic_bars(n_days=1)
+
+    def completed_flags():
+        bt._reset_flag_states()
+        out = []
+        for i, row in enumerate(bars.itertuples()):
+            candle = {"open": row.open, "high": row.high, "low": row.low, "close": row.close,
+                      "timestamp": row.ts, "candle_index": i}
+            out.append(asyncio.run(flag_manager.identify_flag(candle, print_satements=False)))
+        return out
+
+    line_data = tmp_path / "line_data.json"
+    monkeypatch.setattr(flag_manager, "LINE_DATA_PATH", line_data)
+    monkeypatch.setattr(data_utils, "LINE_DATA_PATH", line_data)
+    on_disk = completed_flags()
+    with bt._flag_lines_in_memory():
+        in_memory = completed_flags()
+        assert flag_manager.read_line_data() is flag_manager.LINE_DATA_MEMORY
+
+    assert any(on_disk) and in_memory == on_disk
+    assert flag_manager.LINE_DATA_MEMORY == json.loads(line_data.read_text())
+    flag_manager.clear_all_states()
+
+def test_days_in_parallel_match_serial_and_summary():
+    bars = _synthetic_bars(n_days=3)
+    serial = bt.run_backtest(bars, workers=1)
+    parallel = bt.run_backtest(bars, workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+    assert list(serial.columns) == bt.TRADE_COLUMNS and serial["day"].nunique() == 3
+    assert (serial["time_entered"] < serial["time_exited"]).all()
+    stats = bt.summarize(serial)
+    assert stats["trades"] == len(serial)
+    assert np.isclose(stats["total_profit"], serial["total_profit"].sum(), atol=0.01)
+    assert bt.summarize(serial.iloc[0:0])["trades"] == 0
+
+def test_load_bars_reads_the_candle_lake_with_emas(tmp_storage):
+    bars = _synthetic_bars(n_days=2)
+    for day, group in bars.groupby(bars["ts"].dt.strftime("%Y-%m-%d")):
+        out = tmp_storage.DATA_DIR / "2m" / f"{day}.parquet"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        utc = group["ts"].dt.tz_localize("America/Chicago").dt.tz_convert("UTC")
+        group.assign(symbol="SPY", timeframe="2m", ts=utc.astype("int64") // 1_000_000,
+                     ts_iso=utc.dt.strftime("%Y-%m-%dT%H:%M:%SZ"), volume=0.0).to_parquet(out, index=False)
+
+    loaded = bt.load_bars("2m", symbol="SPY")
+    assert len(loaded) == len(bars) and loaded["day"].nunique() == 2
+    np.testing.assert_allclose(loaded["close"], bars["close"])
+    np.testing.assert_allclose(loaded["200"], bars["close"].ewm(span=200, adjust=False).mean())
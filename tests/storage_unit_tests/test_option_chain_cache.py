@@ -0,0 +1,77 @@
+# tests/storage_unit_tests/test_option_chain_cache.py
+import asyncio
+import importlib
+import random
+
+occ = importlib.import_module("storage.option_chain_cache")
+order_utils = importlib.import_module("utils.order_utils")
+
+def _chain(rng, center=590.0, width=30):
+    options = []
+    for k in range(int(center) - width, int(center) + width + 1):
+        for cp in ("call", "put"):
+            dist = (k - center) if cp == "call" else (center - k)
+            ask = None if rng.random() < 0.05 else round(max(0.01, 2.0 - 0.25 * dist + rng.uniform(-0.2, 0.2)), 2)
+            options.append({"strike": float(k), "option_type": cp, "ask": ask, "bid": None if ask is None else round(ask - 0.02, 2)})
+    rng.shuffle(options)
+    return options
+
+def _legacy_pick(options, cp, price, n):
+    """The old `find_what_to_buy()` scan (chain sorted by strike, as Tradier returns it)."""
+    ordered = sorted((o for o in options if o["option_type"] == cp), key=lambda o: o["strike"])
+    strikes = order_utils.get_strikes_to_consider(cp, price, n, ordered)
+    for lo, hi in occ.PRICE_RANGES:
+        for strike, ask in strikes.items():
+            if lo <= ask <= hi:
+                return strike, ask
+    side = {k: v for k, v in strikes.items() if (float(k) < price if cp == "put" else float(k) > price)}
+    return min(side.items(), key=lambda x: x[1]) if side else None
+
+def test_select_strike_matches_legacy_scan():
+    rng = random.Random(7)
+    for _ in range(200):
+        options = _chain(rng)
+        chain = occ.OptionChain("SPY", "20250102", options)
+        price = round(rng.uniform(575, 605), 2)
+        n = rng.choice([1, 2, 3, 5])
+        for cp in ("call", "put"):
+            assert occ.select_strike(chain, cp, price, n) == _legacy_pick(options, cp, price, n)
+
+def test_sorted_columns_and_exact_quote_lookup():
+    options = [
+        {"strike": 591.0, "option_type": "call", "bid": 0.40, "ask": 0.42},
+        {"strike": 589.0, "option_type": "call", "bid": 1.10, "ask": 1.12},
+        {"strike": 590.0, "option_type": "call", "bid": None, "ask": None},
+        {"strike": 590.0, "option_type": "put", "bid": 0.90, "ask": 0.93},
+    ]
+    chain = occ.OptionChain("SPY", "20250102", options)
+    assert chain.call.strikes.tolist() == [589.0, 590.0, 591.0]
+    assert chain.call.quote(591) == (0.40, 0.42)
+    assert chain.call.quote(590.5) is None
+    assert chain.put.quote(590.0) == (0.90, 0.93)
+    strikes, asks = chain.call.window("call", 589.5, 2)  # 590 has no ask, dropped
+    assert strikes.tolist() == [591.0] and asks.tolist() == [0.42]
+
+def test_cache_fetches_once_and_refetches_when_stale():
+    cache = occ.OptionChainCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return [{"strike": 590.0, "option_type": "call", "bid": 0.3, "ask": 0.32}]
+
+    async def scenario():
+        a = await cache.get_or_fetch("SPY", "20250102", fetch)
+        b = await cache.get_or_fetch("SPY", "20250102", fetch)
+        assert a is b and len(calls) == 1
+        a.fetched -= occ.MAX_AGE + 1
+        c = await cache.get_or_fetch("SPY", "20250102", fetch)
+        assert c is not a and len(calls) == 2
+
+        task = cache.start_refresher("SPY", "20250102", fetch, interval=0.01)
+        assert cache.start_refresher("SPY", "20250102", fetch) is task
+        await asyncio.sleep(0.05)
+        cache.stop()
+        assert len(calls) >= 4
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+# tests/storage_unit_tests/test_order_journal.py
+import importlib
+import json
+import pytest
+
+@pytest.fixture
+def journal_env(tmp_path, monkeypatch):
+    paths = importlib.import_module("paths")
+    orders_dir = tmp_path / "storage" / "orders"
+    monkeypatch.setattr(paths, "ORDERS_DIR", orders_dir, raising=False)
+    monkeypatch.setattr(paths, "ORDER_JOURNAL_PATH", orders_dir / "journal.jsonl", raising=False)
+    monkeypatch.setattr(paths, "get_trades_path", lambda day: orders_dir / day / "trades.parquet", raising=False)
+    ou = importlib.import_module("utils.order_utils")
+    monkeypatch.setattr(ou, "_JOURNAL", None)
+    return ou, orders_dir
+
+OID = "SPY-call-590.0-20250102-20250102103000123456"
+
+def _open(ou, oid=OID, **extra):
+    ou.log_order_details(oid, what_type_of_candle="below support_1 PDL", time_entered="2025-01-02T10:30:00",
+                         ticker_symbol="SPY", strike_price=590.0, option_type="call", order_quantity=4,
+                         order_bid_price=0.42, total_investment=168.0, **extra)
+
+def test_updates_are_indexed_and_appended(journal_env):
+    ou, orders_dir = journal_env
+    _open(ou)
+    ou.update_order_details(OID, lowest_bid=0.35, max_drawdown=16.67, highest_bid=0.61, max_gain=45.24)
+    ou.update_order_details(OID, time_exited="2025-01-02T10:41:07", total_profit=52.0)
+
+    row = ou.get_order_journal().get(OID)
+    assert row["order_quantity"] == 4 and row["max_gain"] == 45.24 and row["total_profit"] == 52.0
+    assert row["avg_sold_bid"] is None  # known column, not set yet
+
+    events = [json.loads(l) for l in (orders_dir / "journal.jsonl").read_text().splitlines()]
+    assert [e["event"] for e in events] == ["open", "update", "update"]
+
+def test_restart_replays_journal(journal_env, monkeypatch):
+    ou, orders_dir = journal_env
+    _open(ou)
+    ou.update_order_details(OID, lowest_bid=0.35)
+    with open(orders_dir / "journal.jsonl", "a") as f:
+        f.write('{"event": "upd')  # crash mid-write
+
+    monkeypatch.setattr(ou, "_JOURNAL", None)
+    row = ou.get_order_journal().get(OID)
+    assert row["lowest_bid"] == 0.35 and row["strike_price"] == 590.0
+
+def test_eod_compaction_to_parquet_and_duckdb_query(journal_env):
+    ou, orders_dir = journal_env
+    _open(ou)
+    _open(ou, oid=OID.replace("call", "put").replace("123456", "999999"), extra_note="kept")
+    ou.update_order_details(OID, total_profit=52.0, time_exited="2025-01-02T10:41:07")
+
+    out = ou.compact_order_journal("2025-01-02")
+    assert out == orders_dir / "2025-01-02" / "trades.parquet" and out.exists()
+    assert not (orders_dir / "journal.jsonl").exists() and ou.get_order_journal().rows() == []
+
+    df = ou.query_trades("SELECT order_id, total_profit, time_exited, extra_note FROM trades ORDER BY order_id")
+    assert len(df) == 2
+    assert df.loc[df.order_id == OID, "total_profit"].item() == 52.0
+    assert str(df.loc[df.order_id == OID, "time_exited"].item()) == "2025-01-02 10:41:07"
+
+    # a later compaction the same day (after a restart) merges instead of overwriting
+    ou.update_order_details(OID, total_profit=60.0)
+    ou.compact_order_journal("2025-01-02")
+    df = ou.query_trades("SELECT order_id, total_profit, ticker_symbol FROM trades")
+    assert len(df) == 2 and df.loc[df.order_id == OID, "total_profit"].item() == 60.0
+    assert df.loc[df.order_id == OID, "ticker_symbol"].item() == "SPY"  # not wiped by the partial update
@@ -0,0 +1,53 @@
+# tests/storage_unit_tests/test_order_path.py
+import importlib
+import math
+import pandas as pd
+import pytest
+
+OID = "SPY-call-590.0-20250102-20250102103000123456"
+
+@pytest.fixture
+def op(tmp_path, monkeypatch):
+    paths = importlib.import_module("paths")
+    orders_dir = tmp_path / "storage" / "orders"
+    monkeypatch.setattr(paths, "ORDERS_DIR", orders_dir, raising=False)
+    monkeypatch.setattr(paths, "get_order_ticks_path", lambda day, oid: orders_dir / day / f"{oid}.parquet", raising=False)
+    return importlib.import_module("utils.order_path"), orders_dir
+
+def test_stats_match_a_full_scan(op):
+    mod, _ = op
+    bids = [0.40, 0.36, 0.33, 0.45, 0.52, 0.61, 0.48]
+    path = mod.OrderPath(OID, 0.40, targets=[0.60, 0.50], started=1000.0)
+    for i, b in enumerate(bids):
+        path.record(b, ask=b + 0.02, underlying=590 + i * 0.1, ts=1000.0 + i * 0.5)
+
+    assert path.lowest_bid == min(bids) and path.highest_bid == max(bids)
+    assert path.max_drawdown == pytest.approx((0.40 - min(bids)) / 0.40 * 100)
+    assert path.max_gain == pytest.approx((max(bids) - 0.40) / 0.40 * 100)
+    # targets are kept ascending: 0.50 first hit at tick 4, 0.60 at tick 5
+    assert path.time_to_target() == pytest.approx(2.0)
+    assert path.time_to_target(0.60) == pytest.approx(2.5)
+    assert path.last_bid == 0.48
+
+def test_untouched_target_and_no_ticks(op):
+    mod, _ = op
+    path = mod.OrderPath(OID, 0.40, targets=[0.80])
+    assert path.summary()["lowest_bid"] == 0.40 and path.max_drawdown == 0 and path.max_gain == 0
+    path.record(0.42)
+    assert path.time_to_target() is None and path.summary()["num_ticks"] == 1
+
+def test_flush_writes_parquet_with_sales(op):
+    mod, orders_dir = op
+    path = mod.OrderPath(OID, 0.40, targets=[0.50], started=1000.0)
+    path.record(0.41, ask=0.43, underlying=590.1, ts=1000.0)
+    path.record(0.50, ts=1000.4)  # no ask / underlying on this tick
+    path.record_sale(3)
+
+    out = path.flush("2025-01-02")
+    assert out == orders_dir / "2025-01-02" / f"{OID}.parquet"
+    df = pd.read_parquet(out)
+    assert list(df.columns) == mod.PATH_COLUMNS
+    assert df["bid"].tolist() == [0.41, 0.50] and df["sold"].tolist() == [0, 3]
+    assert math.isnan(df["ask"].iloc[1]) and df["underlying"].iloc[0] == 590.1
+    assert df["ts"].iloc[1] - df["ts"].iloc[0] == pd.Timedelta(milliseconds=400)
+    pd.testing.assert_frame_equal(mod.read_order_path("2025-01-02", OID), df)
@@ -54,3 +54,22 @@ def test_load_viewport_filters_time_and_price(tmp_storage):
     assert set(df_o["symbol"].unique()) <= {"SPY"}
     if "status" in df_o.columns:
         assert (df_o["status"] != "removed").all()
+
+def test_data_version_moves_only_when_candles_or_objects_change(tmp_storage):
+    parquet_writer = importlib.import_module("storage.parquet_writer")
+    viewport = importlib.import_module("storage.viewport")
+    io = importlib.import_module("storage.objects.io")
+
+    empty = viewport.data_version("2m", include_days=False)
+    parquet_writer.append_candle("SPY", "2m", {
+        "timestamp":"2025-09-02T09:30:00-04:00","open":450,"high":451,"low":449.5,"close":450.5,"volume":100
+    })
+    one_bar = viewport.data_version("2m", include_days=False)
+    assert one_bar != empty and one_bar[0][0] == 1
+    assert viewport.data_version("2m", include_days=False) == one_bar       # nothing written, same version
+    assert viewport.data_version("5m", include_days=False)[0] == (0, 0, 0)  # other timeframes are untouched
+
+    io.upsert_current_objects(pd.DataFrame([{"id":"1","type":"support","left":1,"y":450.0,
+                                             "status":"active","symbol":"SPY","timeframe":"15m"}]))
+    with_objects = viewport.data_version("2m", include_days=False)
+    assert with_objects[0] == one_bar[0] and with_objects[1] != one_bar[1]
@@ -0,0 +1,60 @@
+# tests\storage_unit_tests\test_warmup_cache.py
+import asyncio
+import importlib
+import pandas as pd
+
+TODAY = "2025-09-10"  # a Wednesday
+
+def _day_df(day, n=20, base=500.0):
+    ts = pd.date_range(f"{day} 04:00", periods=n, freq="15min", tz="America/New_York")
+    close = [base + i * 0.1 for i in range(n)]
+    return pd.DataFrame({"timestamp": ts, "open": close, "high": close, "low": close,
+                         "close": close, "volume": 100.0, "vw": close})
+
+def _setup(tmp_storage, monkeypatch, tmp_path):
+    paths = importlib.import_module("paths")
+    monkeypatch.setattr(paths, "WARMUP_DIR", tmp_path / "storage" / "warmup", raising=False)
+    wc = importlib.import_module("storage.warmup_cache")
+    wc.clear_session_cache()
+    return wc
+
+def test_fetches_each_day_once_then_serves_cache(tmp_storage, monkeypatch, tmp_path):
+    wc = _setup(tmp_storage, monkeypatch, tmp_path)
+    calls = []
+
+    async def fetch_day(day):
+        calls.append(day)
+        return _day_df(day)
+
+    df = asyncio.run(wc.get_warmup_history("15m", 50, fetch_day, TODAY))
+    assert len(df) >= 50
+    assert df["timestamp"].is_monotonic_increasing
+    assert df["timestamp"].iloc[-1].strftime("%Y-%m-%d") == "2025-09-09"
+    assert list(df.columns) == wc.COLUMNS
+    first_calls = list(calls)
+    assert len(first_calls) == len(set(first_calls)) == 3  # 20 bars/day → 3 days, no repeats
+
+    # same session: memory hit, no provider calls
+    asyncio.run(wc.get_warmup_history("15m", 50, fetch_day, TODAY))
+    assert calls == first_calls
+
+    # new process: day files on disk, still no provider calls
+    wc.clear_session_cache()
+    df2 = asyncio.run(wc.get_warmup_history("15m", 50, fetch_day, TODAY))
+    assert calls == first_calls
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), df2.reset_index(drop=True))
+
+def test_serves_from_storage_data_when_enough_bars(tmp_storage, monkeypatch, tmp_path):
+    wc = _setup(tmp_storage, monkeypatch, tmp_path)
+    pw = importlib.import_module("storage.parquet_writer")
+    for ts in pd.date_range("2025-09-09 09:30", periods=12, freq="15min", tz="America/New_York"):
+        pw.append_candle("SPY", "15m", {"timestamp": ts.isoformat(), "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10})
+    # today's bars must not leak into the seed
+    pw.append_candle("SPY", "15m", {"timestamp": f"{TODAY}T09:30:00-04:00", "open": 9, "high": 9, "low": 9, "close": 9, "volume": 1})
+
+    async def fetch_day(day):
+        raise AssertionError("provider should not be hit")
+
+    df = asyncio.run(wc.get_warmup_history("15m", 10, fetch_day, TODAY))
+    assert len(df) == 10
+    assert (df["close"] == 1.5).all()
@@ -0,0 +1,6 @@
+# tests\utils_unit_tests\conftest.py
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
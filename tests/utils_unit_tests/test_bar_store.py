@@ -0,0 +1,69 @@
+# tests/utils_unit_tests/test_bar_store.py
+import asyncio
+import json
+import importlib
+import pytest
+
+@pytest.fixture
+def bs(tmp_path, monkeypatch):
+    paths = importlib.import_module("paths")
+    monkeypatch.setattr(paths, "LOGS_DIR", tmp_path / "logs", raising=False)
+    mod = importlib.import_module("utils.bar_store")
+    mod.clear_bar_stores()
+    yield mod
+    mod.clear_bar_stores()
+
+def _bar(i):
+    return {"open": 100 + i, "high": 101 + i, "low": 99 + i, "close": 100.5 + i, "timestamp": f"2025-01-02T09:{30 + i:02d}:00-05:00"}
+
+def test_index_last_and_disk_mirror(bs, tmp_path):
+    assert bs.current_bar_index("2M") == 0 and bs.last_bars("2M") == []
+    working = _bar(0)
+    assert bs.append_bar("2M", working) == 0
+    working["close"] = -1  # the caller's dict is reused for the next candle
+    for i in range(1, 5):
+        assert bs.append_bar("2M", _bar(i)) == i
+
+    assert bs.current_bar_index("2M") == 4
+    assert bs.latest_bar("2M") == _bar(4)
+    assert bs.last_bars("2M", 2) == [_bar(3), _bar(4)]
+    assert bs.get_bar_store("2M").get(0)["close"] == 100.5
+
+    lines = (tmp_path / "logs" / "SPY_2M.log").read_text().splitlines()
+    assert [json.loads(l) for l in lines] == [_bar(i) for i in range(5)]
+
+def test_restart_recovers_session_and_skips_torn_line(bs, tmp_path):
+    for i in range(3):
+        bs.append_bar("5M", _bar(i))
+    with open(tmp_path / "logs" / "SPY_5M.log", "a") as f:
+        f.write('{"open": 1, "hi')  # crash mid-write
+
+    bs.clear_bar_stores()  # "restart"
+    assert bs.current_bar_index("5M") == 2
+    assert bs.append_bar("5M", _bar(3)) == 3
+
+    bs.reset_bar_store("5M")
+    assert bs.current_bar_index("5M") == 0 and not (tmp_path / "logs" / "SPY_5M.log").exists()
+
+def test_readers_are_woken_on_new_bar(bs):
+    seen = []
+    bs.get_bar_store("2M").subscribe(lambda tf, idx, bar: seen.append((tf, idx)))
+
+    async def scenario():
+        waiter = asyncio.create_task(bs.wait_for_bar("2M"))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        bs.append_bar("2M", _bar(0))
+        assert await asyncio.wait_for(waiter, 1) == 0
+        assert await bs.wait_for_bar("2M", after=0, timeout=0.01) is None
+
+    asyncio.run(scenario())
+    assert seen == [("2M", 0)]
+
+def test_legacy_readers_use_the_store(bs, tmp_path):
+    log_utils = importlib.import_module("utils.log_utils")
+    file_utils = importlib.import_module("utils.file_utils")
+    for i in range(3):
+        log_utils.write_to_log(_bar(i), "SPY", "15M")
+    assert file_utils.get_current_candle_index("15M") == 2
+    assert log_utils.read_last_n_lines(tmp_path / "logs" / "SPY_15M.log", 1) == [_bar(2)]
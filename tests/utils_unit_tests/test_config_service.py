@@ -0,0 +1,59 @@
+# tests/utils_unit_tests/test_config_service.py
+import json
+import os
+import pytest
+from utils.config_service import ConfigService
+
+def _write(path, data, bump_ns=0):
+    path.write_text(json.dumps(data))
+    if bump_ns:  # make sure mtime moves even on coarse filesystems
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump_ns))
+
+@pytest.fixture
+def cfg_file(tmp_path):
+    p = tmp_path / "config.json"
+    _write(p, {"SYMBOL": "SPY", "TIMEFRAMES": ["2M", "5M"], "FLAGPOLE_CRITERIA": {"MIN_ANGLE": 5}, "STOP_LOSS": ["SENTIMENT", 2]})
+    return p
+
+def test_snapshot_is_cached_immutable_and_attribute_readable(cfg_file):
+    svc = ConfigService(cfg_file, watch=False)
+    snap = svc.snapshot
+    assert snap.SYMBOL == "SPY" and svc.get("TIMEFRAMES") == ["2M", "5M"]
+    assert svc.get("MISSING") is None
+    assert isinstance(svc.get("STOP_LOSS"), list)  # order_handler relies on isinstance(list)
+    with pytest.raises(TypeError):
+        snap["SYMBOL"] = "QQQ"
+    with pytest.raises(TypeError):
+        snap.TIMEFRAMES.append("15M")
+    with pytest.raises(TypeError):
+        snap.FLAGPOLE_CRITERIA["MIN_ANGLE"] = 1
+    assert json.loads(json.dumps(snap))["FLAGPOLE_CRITERIA"] == {"MIN_ANGLE": 5}
+    assert svc.snapshot is snap  # no re-parse while the file is unchanged
+    assert svc.check() is False
+
+def test_edits_are_picked_up_and_subscribers_notified(cfg_file):
+    svc = ConfigService(cfg_file, watch=False)
+    seen, symbol_only = [], []
+    svc.subscribe(lambda old, new, changed: seen.append(changed))
+    svc.subscribe(lambda old, new, changed: symbol_only.append(new.SYMBOL), keys=["SYMBOL"])
+
+    data = json.loads(cfg_file.read_text())
+    data["TIMEFRAMES"] = ["2M", "5M", "15M"]
+    _write(cfg_file, data, bump_ns=10_000_000)
+    assert svc.check() is True
+    assert svc.get("TIMEFRAMES") == ["2M", "5M", "15M"]
+    assert seen == [{"TIMEFRAMES"}] and symbol_only == []
+
+    svc.set_value("SYMBOL", "QQQ")
+    assert svc.get("SYMBOL") == "QQQ"
+    assert json.loads(cfg_file.read_text())["SYMBOL"] == "QQQ"
+    assert symbol_only == ["QQQ"]
+
+def test_half_written_file_keeps_previous_snapshot(cfg_file):
+    svc = ConfigService(cfg_file, watch=False)
+    cfg_file.write_text('{"SYMBOL": "QQ')
+    st = cfg_file.stat()
+    os.utime(cfg_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+    assert svc.check() is False
+    assert svc.get("SYMBOL") == "SPY"
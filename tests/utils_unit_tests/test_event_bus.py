@@ -0,0 +1,73 @@
+# tests/utils_unit_tests/test_event_bus.py
+import asyncio
+import importlib
+import pytest
+
+eb = importlib.import_module("utils.event_bus")
+
+def _bar(i, tf="2M"):
+    candle = {"open": 100 + i, "high": 101 + i, "low": 99 + i, "close": 100.5 + i, "timestamp": f"2025-01-02T09:{30 + i:02d}:00-05:00"}
+    return eb.BarClosed.from_candle("SPY", tf, i, candle)
+
+def test_typed_payload_round_trip():
+    bar = _bar(3)
+    assert bar.index == 3 and bar.close == 103.5 and bar.volume == 0.0
+    candle = bar.as_candle(zone_type="None")
+    assert candle["candle_index"] == 3 and candle["zone_type"] == "None" and candle["high"] == 104
+
+def test_routing_by_type_and_timeframe():
+    bus = eb.EventBus()
+
+    async def scenario():
+        two = bus.subscribe(eb.BarClosed, "two", timeframe="2M")
+        every = bus.subscribe(eb.BarClosed, "every")
+        flags = bus.subscribe(eb.FlagsCompleted, "flags", timeframe="2M")
+
+        assert bus.publish(_bar(0, "5M")) == 1
+        assert bus.publish(_bar(1, "2M")) == 2
+        assert bus.publish(eb.FlagsCompleted(_bar(1), ("bull_1",))) == 1
+
+        assert (await two.get(timeout=0.1)).index == 1
+        assert [(await every.get()).timeframe for _ in range(2)] == ["5M", "2M"]
+        assert (await flags.get()).flag_names == ("bull_1",)
+        assert await two.get(timeout=0.01) is None
+
+        with two:
+            pass
+        assert bus.publish(_bar(2, "2M")) == 1  # only `every` is left for 2M bars
+
+    asyncio.run(scenario())
+
+def test_bounded_queue_drops_oldest_and_drain_returns_newest():
+    bus = eb.EventBus()
+
+    async def scenario():
+        slow = bus.subscribe(eb.BarClosed, "slow", maxsize=3)
+        for i in range(5):
+            bus.publish(_bar(i))  # never blocks the publisher
+        assert slow.dropped == 2
+        assert (await slow.get()).index == 2
+        assert slow.drain().index == 4 and slow.drain() is None
+
+    asyncio.run(scenario())
+
+def test_flag_detector_publishes_a_result_per_bar():
+    fm = importlib.import_module("indicators.flag_manager")
+
+    async def scenario():
+        fm.clear_all_states()
+        fm.create_state(1, "bull", None, print_satements=False)
+        results = eb.subscribe(eb.FlagsCompleted, "test", timeframe="2M")
+        task = fm.start_flag_detector("2M")
+        try:
+            for i in range(3):
+                eb.publish(_bar(i))
+            got = [await asyncio.wait_for(results.get(), 1) for _ in range(3)]
+            assert [r.bar.index for r in got] == [0, 1, 2]
+            assert all(isinstance(r.flag_names, tuple) for r in got)
+        finally:
+            task.cancel()
+            results.close()
+            fm.clear_all_states()
+
+    asyncio.run(scenario())
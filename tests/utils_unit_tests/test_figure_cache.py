@@ -0,0 +1,104 @@
+# tests/utils_unit_tests/test_figure_cache.py
+import copy
+import pandas as pd
+from web_dash.figure_cache import (FigureCache, Frame, CANDLE_FIELDS, candle_columns,
+                                   plan_candle_patch, plan_catch_up, apply_candle_patch, price_range)
+
+def _candles(start, n, tf_minutes=2, first_close=100.0):
+    ts = pd.date_range(start, periods=n, freq=f"{tf_minutes}min")
+    close = [first_close + i * 0.1 for i in range(n)]
+    df = pd.DataFrame({"_ts_plot": ts, "open": close, "high": [c + .2 for c in close],
+                       "low": [c - .2 for c in close], "close": close})
+    return candle_columns(df)
+
+def _figure(frame):
+    """Shaped like `build_live_figure(...).to_dict()`: candles, one level (shape + marker), one zone."""
+    c = frame.candles
+    return {
+        "data": [{"type": "candlestick", **{f: list(c[f]) for f in CANDLE_FIELDS}},
+                 {"type": "scatter", "mode": "markers", "x": [c["x"][0]], "y": [100.5]}],
+        "layout": {"yaxis": {"range": price_range(c["low"], c["high"])},
+                   "shapes": [{"type": "line", "x0": c["x"][0], "x1": "end"}, {"type": "rect", "x0": c["x"][0], "x1": "end"}]},
+    }
+
+class Source:
+    """A chart whose data is `self.candles` and whose version the test bumps."""
+    def __init__(self, candles):
+        self.candles, self.loads, self.builds = candles, 0, 0
+
+    def load(self):
+        self.loads += 1
+        return Frame(self.candles, tf_minutes=2, max_bars=6)
+
+    def build(self, frame):
+        self.builds += 1
+        return _figure(frame)
+
+def test_appended_bars_become_a_patch_that_matches_a_full_rebuild():
+    day = _candles("2025-09-02 09:30", 8)
+    old = {f: v[:5] for f, v in day.items()}
+    new = {f: v[2:] for f, v in day.items()}   # 2 bars scrolled off, 3 appended
+    plan = plan_candle_patch(old, new, 2)
+    assert plan.drop == 2 and plan.append["x"] == new["x"][3:]
+    assert plan.x0 == new["x"][0] and plan.x1 == "2025-09-02T09:46:00"
+
+    patched = _figure(Frame(old))
+    apply_candle_patch(patched, plan, shape_count=2, marker_traces=[1])
+    expected = _figure(Frame(new))
+    for shape in expected["layout"]["shapes"]:
+        shape["x1"] = plan.x1
+    assert patched == expected
+
+def test_no_patch_when_the_window_jumped_or_history_changed():
+    old = _candles("2025-09-02 09:30", 5)
+    assert plan_candle_patch(old, _candles("2025-09-02 11:00", 5), 2) is None   # no overlap
+    assert plan_candle_patch(old, _candles("2025-09-02 09:30", 3), 2) is None   # bars vanished
+    rewritten = copy.deepcopy(old)
+    rewritten["close"][2] += 1
+    assert plan_candle_patch(old, rewritten, 2) is None
+    assert plan_candle_patch(None, old, 2) is None
+    same = plan_candle_patch(old, old, 2)
+    assert same.drop == 0 and same.append["x"] == []
+
+def test_cache_serves_hits_appends_in_place_and_rebuilds_on_new_objects():
+    cache = FigureCache()
+    src = Source(_candles("2025-09-02 09:30", 5))
+    objects = (1, 10, 100)
+
+    first = cache.refresh("2M", ((5,), objects), src.load, src.build)
+    again = cache.refresh("2M", ((5,), objects), src.load, src.build)       # tab switch
+    assert again is first and (src.loads, src.builds) == (1, 1)
+
+    src.candles = _candles("2025-09-02 09:30", 6)
+    appended = cache.refresh("2M", ((6,), objects), src.load, src.build)  # a bar closed
+    assert src.builds == 1 and appended.figure["data"][0]["x"] == src.candles["x"]
+    assert first.figure["data"][0]["x"] == _candles("2025-09-02 09:30", 5)["x"]  # the old entry is untouched
+
+    # a browser holding the first figure gets the new bar only
+    plan = appended.catch_up(first.held())
+    assert plan.drop == 0 and plan.append["x"] == [src.candles["x"][-1]]
+    assert appended.held()["n"] == 6 and appended.held()["max_bars"] == 6
+
+    rebuilt = cache.refresh("2M", ((6,), (1, 11, 120)), src.load, src.build)  # new objects snapshot
+    assert src.builds == 2 and rebuilt.catch_up(appended.held()) is None
+    assert cache.stats()["2M"] == {"hits": 1, "patched": 1, "rebuilt": 2, "last_ms": cache.stats()["2M"]["last_ms"]}
+
+def test_charts_without_tf_minutes_are_always_rebuilt():
+    cache = FigureCache()
+    builds = []
+    build = lambda frame: builds.append(1) or {"data": [], "layout": {}}
+    cache.refresh("zones", ((1,), ()), lambda: Frame(None), build)
+    cache.refresh("zones", ((2,), ()), lambda: Frame(None), build)
+    cache.refresh("zones", ((2,), ()), lambda: Frame(None), build)
+    assert len(builds) == 2
+    cache.invalidate("zones")
+    assert cache.get("zones") is None
+
+def test_catch_up_from_any_lag_keeps_the_bar_count():
+    day = _candles("2025-09-02 09:30", 10)
+    window = {f: v[4:] for f, v in day.items()}          # server shows bars 4..9
+    plan = plan_catch_up(window, day["x"][5], 6, 2)      # browser shows bars 0..5
+    assert plan.append["x"] == day["x"][6:] and plan.drop == 4
+    assert plan_catch_up(window, day["x"][9], 6, 2).append["x"] == []  # already appended in the browser
+    assert plan_catch_up(window, day["x"][1], 6, 2) is None            # its last bar scrolled out
+    assert plan_catch_up(window, None, 0, 2) is None
@@ -0,0 +1,47 @@
+# tests/utils_unit_tests/test_log_backend.py
+import json
+import os
+import time
+import importlib
+import pytest
+
+@pytest.fixture
+def log_env(tmp_path, monkeypatch):
+    paths = importlib.import_module("paths")
+    log_path = tmp_path / "logs" / "terminal_output.log"
+    monkeypatch.setattr(paths, "TERMINAL_LOG", log_path, raising=False)
+    lb = importlib.import_module("utils.log_backend")
+    writer = lb.LogWriter(echo=False)
+    yield lb, writer, log_path
+    writer.close()
+
+def test_batched_text_and_json_records(log_env):
+    lb, writer, log_path = log_env
+    for i in range(1000):
+        writer.submit(f"[EMA CS] bar {i}")
+    writer.submit("plain line", level="WARNING", component="MAIN")
+    assert writer.flush()
+
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1001 and lines[0] == "[EMA CS] bar 0" and lines[-1] == "plain line"
+    recs = [json.loads(l) for l in log_path.with_suffix(".jsonl").read_text(encoding="utf-8").splitlines()]
+    assert recs[0]["component"] == "EMA CS" and recs[0]["level"] == "INFO"
+    assert recs[-1] == {**recs[-1], "level": "WARNING", "component": "MAIN", "msg": "plain line"}
+
+def test_size_and_day_rotation(log_env, monkeypatch):
+    lb, writer, log_path = log_env
+    monkeypatch.setattr(lb, "ROTATE_BYTES", 200)
+    for i in range(5):  # rotation is checked before each batch: rotates before batches 3 and 5
+        writer.submit("x" * 150)
+        assert writer.flush()
+    assert log_path.with_name("terminal_output.log.1").exists()
+    assert log_path.with_name("terminal_output.log.2").exists()
+
+    # a file last written yesterday is moved aside on the first write of today
+    yesterday = time.time() - 86400
+    os.utime(log_path, (yesterday, yesterday))
+    writer.submit("new day")
+    assert writer.flush()
+    dated = list(log_path.parent.glob("terminal_output-*.log"))
+    assert len(dated) == 1
+    assert log_path.read_text(encoding="utf-8") == "new day\n"
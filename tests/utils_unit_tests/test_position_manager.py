@@ -0,0 +1,85 @@
+# tests/utils_unit_tests/test_position_manager.py
+import asyncio
+import importlib
+import pytest
+
+pm = importlib.import_module("utils.position_manager")
+qb = importlib.import_module("utils.quote_book")
+
+CALL = "SPY-call-590-20250102-20250102103000000001"
+PUT = "SPY-put-585-20250102-20250102103500000002"
+
+@pytest.fixture
+def config(monkeypatch):
+    cfg = {"TIMEFRAMES": ["2M"], "START_OF_DAY_BALANCE": 10_000, "MAX_OPEN_POSITIONS": 2, "MAX_EXPOSURE_PERCENTAGE": 0.05}
+    monkeypatch.setattr(pm, "read_config", lambda key=None: cfg.get(key))
+    return cfg
+
+def _order(order_id, entry=0.40, qty=4):
+    return {"order_id": order_id, "order_retrieval": "123", "entry_price": entry, "quantity": qty,
+            "TP_value": None, "order_adjustments": []}
+
+def test_position_state_is_per_object():
+    pos = pm.Position.from_active_order(_order(CALL), sell_points=[0.48, 0.60], sell_quantities=[3, 1])
+    assert (pos.symbol, pos.option_type, pos.strike, pos.contract) == ("SPY", "call", "590", "SPY250102C00590000")
+    pos.add_sale({"target": 0.48, "sold_price": 0.49, "quantity": 3, "timestamp": "x"})
+    assert pos.remaining == 1 and pos.exposure == pytest.approx(40.0)
+    assert pm.Position.from_active_order(_order(PUT)).adjustments == []
+
+def test_entry_limits(config):
+    manager = pm.PositionManager(qb.QuoteBook())
+    assert manager.can_open(160) == (True, None)
+    manager.add(pm.Position.from_active_order(_order(CALL)))  # $160 held
+    ok, reason = manager.can_open(400)  # 560 > 5% of 10k
+    assert not ok and reason.startswith("Exposure Limit")
+    manager.add(pm.Position.from_active_order(_order(PUT)))
+    ok, reason = manager.can_open(10)
+    assert not ok and reason.startswith("Max Open Positions")
+
+    config["MAX_OPEN_POSITIONS"] = None  # unset -> one position at a time, like before
+    manager.remove(PUT)
+    assert manager.can_open()[0] is False
+
+def test_one_scheduler_batches_quotes_and_drops_closed_positions(config):
+    book = qb.QuoteBook()
+    manager = pm.PositionManager(book)
+    call = manager.add(pm.Position.from_active_order(_order(CALL)))
+    put = manager.add(pm.Position.from_active_order(_order(PUT, entry=0.50)))
+    fetches, steps = [], []
+
+    async def fetch_quotes(contracts):
+        fetches.append(list(contracts))
+        for c in contracts:
+            book.update(c, bid=0.45 if c == call.contract else 0.30, ask=0.47)
+
+    async def step(position, bid, bar_closed):
+        steps.append((position.order_id, bid, bar_closed))
+        return position is put and len(position.path) >= 2  # put exits on its 2nd tick
+
+    async def scenario():
+        await asyncio.wait_for(manager.tick(step, fetch_quotes), 1)
+        await asyncio.sleep(0)
+        await asyncio.wait_for(manager.tick(step, fetch_quotes), 1)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert fetches == [sorted([call.contract, put.contract])]  # one batch, then the quotes were fresh
+    assert (CALL, 0.45, True) in steps and (PUT, 0.30, True) in steps  # EMA checks at entry...
+    assert steps[-1][2] is False                                         # ...then only on bar close
+    assert list(manager.positions) == [CALL] and put.closed
+    assert len(call.path) == 2 and call.path.highest_bid == 0.45
+
+def test_run_exits_when_the_last_position_closes(config):
+    book = qb.QuoteBook()
+    manager = pm.PositionManager(book)
+    pos = manager.add(pm.Position.from_active_order(_order(CALL)))
+    book.update(pos.contract, bid=0.41, ask=0.43)
+
+    async def fetch_quotes(contracts):
+        pass
+
+    async def step(position, bid, bar_closed):
+        return True
+
+    asyncio.run(asyncio.wait_for(manager.run(step, fetch_quotes, interval=0.01), 1))
+    assert len(manager) == 0 and pos.closed
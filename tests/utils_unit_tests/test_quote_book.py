@@ -0,0 +1,40 @@
+# tests/utils_unit_tests/test_quote_book.py
+import asyncio
+import importlib
+
+qb = importlib.import_module("utils.quote_book")
+
+def test_occ_symbol_formats():
+    assert qb.occ_symbol("spy", "20250102", "call", 590) == "SPY250102C00590000"
+    assert qb.occ_symbol("SPY", "2025-01-02", "put", "589.5") == "SPY250102P00589500"
+    assert qb.occ_symbol("SPY", "250102", "call", 0.5) == "SPY250102C00000500"
+
+def test_stream_and_rest_messages_update_the_book():
+    book = qb.QuoteBook()
+    occ = "SPY250102C00590000"
+    assert book.apply({"type": "quote", "symbol": occ, "bid": 1.21, "bidsz": 10, "ask": 1.25, "asksz": 7})
+    assert book.get(occ) == (1.21, 1.25, 10, 7, book.quotes[occ].received)
+    assert not book.apply({"type": "trade", "symbol": occ, "price": 1.23, "size": 1})
+
+    # markets/quotes entry (type "option", bidsize/asksize), bid-only stream update keeps the ask
+    assert book.apply({"type": "option", "symbol": occ, "bid": 1.3, "ask": 1.34, "bidsize": 5, "asksize": 2})
+    book.apply({"type": "quote", "symbol": occ, "bid": 1.31})
+    assert book.bid(occ) == 1.31 and book.get(occ).ask == 1.34
+
+def test_stale_quotes_are_not_served():
+    book = qb.QuoteBook()
+    book.update("X", bid=1.0, ask=1.1, received=0.0)  # monotonic clock start = very old
+    assert book.bid("X") is None
+    assert book.bid("X", max_age=None) == 1.0
+
+def test_wait_for_update_wakes_on_tick():
+    book = qb.QuoteBook()
+
+    async def scenario():
+        waiter = asyncio.create_task(book.wait_for_update("X", timeout=1))
+        await asyncio.sleep(0)
+        book.update("X", bid=2.0, ask=2.1)
+        assert await waiter is True
+        assert await book.wait_for_update("X", timeout=0.01) is False
+
+    asyncio.run(scenario())
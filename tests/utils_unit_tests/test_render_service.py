@@ -0,0 +1,132 @@
+# tests/utils_unit_tests/test_render_service.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from web_dash.render_service import RenderService
+
+class FakeRenderer:
+    """Stands in for `render_png()`: writes a file, blocks on a gate so tests control timing."""
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = set()
+
+    def __call__(self, timeframe, chart_type):
+        self.calls.append((timeframe, chart_type))
+        self.gate.wait(5)
+        if (timeframe, chart_type) in self.fail:
+            raise RuntimeError("kaleido died")
+        out = self.out_dir / f"{timeframe}_{chart_type}.png"
+        out.write_bytes(b"png")
+        return str(out), 0.01
+
+def _service(renderer, workers=2):
+    return RenderService(renderer, workers=workers, executor_factory=lambda n: ThreadPoolExecutor(n))
+
+async def _until(predicate, timeout=2.0):
+    for _ in range(int(timeout / 0.005)):
+        if predicate():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("condition not reached")
+
+def test_requests_for_a_queued_chart_merge_and_latest_wins(tmp_path):
+    renderer = FakeRenderer(tmp_path)
+
+    async def scenario():
+        service = _service(renderer, workers=1)
+        await service.start()
+        try:
+            renderer.gate.clear()
+            first = service.submit("2M")                      # picked up, blocks in the worker
+            await _until(lambda: renderer.calls)
+            queued = [service.submit("2M") for _ in range(3)]  # 2M is busy: one job behind it, 2 merged
+            other = service.submit("5M")
+            assert service.queued() == [("2M", "live"), ("5M", "live")]
+            renderer.gate.set()
+
+            r1 = await first
+            results = await asyncio.gather(*queued)
+            await other
+            assert renderer.calls == [("2M", "live"), ("2M", "live"), ("5M", "live")]
+            assert r1.coalesced == 0 and {r.coalesced for r in results} == {2}
+            assert len({id(r) for r in results}) == 1            # every merged caller got the same render
+            assert service.stats()["2M/live"]["renders"] == 2 and service.stats()["2M/live"]["dropped"] == 2
+        finally:
+            await service.stop()
+
+    asyncio.run(scenario())
+
+def test_distinct_charts_render_in_parallel_but_a_chart_never_twice_at_once(tmp_path):
+    renderer = FakeRenderer(tmp_path)
+
+    async def scenario():
+        service = _service(renderer, workers=3)
+        await service.start()
+        try:
+            renderer.gate.clear()
+            jobs = [service.submit(tf) for tf in ("2M", "5M", "15M")] + [service.submit("15M", "zones")]
+            await _until(lambda: len(renderer.calls) == 3)
+            assert service.queued() == [("15M", "zones")]       # three workers, three charts in flight
+            again = service.submit("2M")
+            await asyncio.sleep(0.05)
+            assert renderer.calls.count(("2M", "live")) == 1     # waits for the running 2M render
+            renderer.gate.set()
+            await asyncio.gather(*jobs, again)
+            assert renderer.calls.count(("2M", "live")) == 2
+        finally:
+            await service.stop()
+
+    asyncio.run(scenario())
+
+def test_only_dirty_charts_are_rendered_again(tmp_path):
+    renderer = FakeRenderer(tmp_path)
+
+    async def scenario():
+        service = _service(renderer)
+        await service.start()
+        try:
+            first = await service.render("15M", "zones")
+            assert not first.cached and first.render_s == 0.01 and first.queued_s >= 0
+            cached = await service.render("15M", "zones")
+            assert cached.cached and cached.path == first.path and len(renderer.calls) == 1
+
+            service.mark_dirty("15M", "zones")                  # a bar closed
+            assert not (await service.render("15M", "zones")).cached
+            (tmp_path / "15M_zones.png").unlink()              # the file went away
+            assert not (await service.render("15M", "zones")).cached
+            assert (await service.render("15M", "zones", force=True)).cached is False
+            assert len(renderer.calls) == 4
+            assert service.stats()["15M/zones"]["last_render_ms"] == 10.0
+        finally:
+            await service.stop()
+
+    asyncio.run(scenario())
+
+def test_a_failed_render_reaches_every_waiter_and_stays_dirty(tmp_path):
+    renderer = FakeRenderer(tmp_path)
+    renderer.fail.add(("5M", "live"))
+
+    async def scenario():
+        service = _service(renderer)
+        await service.start()
+        try:
+            with pytest.raises(RuntimeError, match="kaleido died"):
+                await service.render("5M")
+            assert service.is_dirty("5M")
+            renderer.fail.clear()
+            assert (await service.render("5M")).path.endswith("5M_live.png")
+        finally:
+            await service.stop()
+
+    asyncio.run(scenario())
+
+def test_submit_requires_a_started_service(tmp_path):
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            RenderService(FakeRenderer(tmp_path)).submit("2M")
+
+    asyncio.run(scenario())
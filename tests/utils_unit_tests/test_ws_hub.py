@@ -0,0 +1,85 @@
+# tests/utils_unit_tests/test_ws_hub.py
+import asyncio
+import json
+from web_dash.ws_hub import Hub, bar_payload, parse_topics
+
+class FakeSocket:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay, self.fail = delay, fail
+        self.received = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("gone")
+        self.received.append(json.loads(text))
+
+async def _settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+def test_topics_route_messages_and_subscriptions_change_on_the_socket():
+    async def scenario():
+        hub = Hub()
+        a, b = FakeSocket(), FakeSocket()
+        ca = hub.connect(a.send_text, parse_topics("zones, 2m"), "a")
+        cb = hub.connect(b.send_text, {"5M"}, "b")
+        assert hub.publish("2M") == 1 and hub.publish("orders", "filled", order={"id": 1}) == 0
+        hub.handle(cb, json.dumps({"subscribe": ["orders"], "unsubscribe": ["5M"]}))
+        hub.publish("orders", "filled", order={"id": 2})
+        hub.publish("5M")
+        await _settle()
+        assert a.received == [{"topic": "2M", "kind": "refresh"}]
+        assert b.received == [{"topic": "orders", "kind": "filled", "order": {"id": 2}}]
+        await hub.disconnect(ca)
+        await hub.disconnect(cb)
+        assert not hub.clients
+
+    asyncio.run(scenario())
+
+def test_a_stalled_client_drops_its_oldest_messages_without_holding_up_the_others():
+    async def scenario():
+        hub = Hub(maxsize=3)
+        stuck, fast = FakeSocket(), FakeSocket()
+        stuck.gate.clear()
+        c_stuck = hub.connect(stuck.send_text, {"2M"}, "stuck")
+        hub.connect(fast.send_text, {"2M"}, "fast")
+        for i in range(10):
+            hub.publish("2M", "bar", bar={"i": i})
+            await _settle()
+        assert [m["bar"]["i"] for m in fast.received] == list(range(10))
+        assert c_stuck.dropped > 0 and c_stuck.queue.qsize() == 3
+        stuck.gate.set()
+        await _settle()
+        assert [m["bar"]["i"] for m in stuck.received][-3:] == [7, 8, 9]  # newest survive
+        for client in list(hub.clients):
+            await hub.disconnect(client)
+
+    asyncio.run(scenario())
+
+def test_slow_sends_overlap_and_a_failing_client_is_removed():
+    async def scenario():
+        hub = Hub()
+        slow = [FakeSocket(delay=0.1) for _ in range(5)]
+        for i, sock in enumerate(slow):
+            hub.connect(sock.send_text, {"15M"}, f"slow{i}")
+        broken = hub.connect(FakeSocket(fail=True).send_text, {"15M"}, "broken")
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        hub.publish("15M")
+        while not all(s.received for s in slow):
+            await asyncio.sleep(0.01)
+        assert loop.time() - start < 0.3           # five 0.1s sends ran side by side
+        assert broken not in hub.clients
+        for client in list(hub.clients):
+            await hub.disconnect(client)
+
+    asyncio.run(scenario())
+
+def test_bar_payload_is_in_live_chart_coordinates():
+    bar = bar_payload({"timestamp": "2025-09-02T09:32:00.123456-04:00", "open": 1, "high": 2, "low": 0.5, "close": 1.5})
+    assert bar == {"x": "2025-09-02T09:32:00.123000", "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5}
+    assert bar_payload({"timestamp": "2025-09-02 08:30:00", "open": 1, "high": 1, "low": 1, "close": 1})["x"] == "2025-09-02T09:30:00"
@@ -0,0 +1,321 @@
+# tools/backtest.py
+from pathlib import Path
+import sys
+
+# Ensure repo root (where paths.py AND utils lives) is on sys.path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from indicators import flag_manager
+from utils.json_utils import read_config
+from utils.order_utils import calculate_sell_points, generate_sell_info, get_entry_action
+from utils.position_manager import Position, DEFAULT_MAX_OPEN_POSITIONS
+from sentiment_engine import score_history
+from storage.viewport import get_timeframe_bounds, load_viewport
+
+"""
+Replay the FLAG/ZONE strategy over the candle lake (`storage/data/<tf>`):
+
+    bar ──> flag_manager.identify_flag() ──> completed flags
+        ──> get_entry_action() (the rule_manager direction/flag rule) ──> SimBroker.open()
+    bar ──> SimBroker.on_bar(): trims from TAKE_PROFIT_PERCENTAGES, runner 13 EMA exit,
+            STOP_LOSS (same shapes as `order_handler.check_stop_loss()`), exit all on the last bar
+
+EMAs are computed once over the whole history (`ewm(adjust=False)`, like the
+live engine), sentiment is scored per day in one vectorized call
+(`score_history()`). Flag state is reset every session (as `main.py` does), so
+with EMAs precomputed each day is independent and days run in parallel, one
+process per core. The economic-news check is skipped, like
+`check_order_time_to_event_time(sim_active=True)`.
+
+There is no option history in the lake, so the SimBroker prices the contract
+from the underlying: an ATM premium (`--premium`) that moves `--delta` per $1
+of the underlying, floored at a cent. Trims fill at their target when the
+bar's favorable extreme reaches it; EMA/sentiment stops fill at the close.
+
+python tools/backtest.py --timeframe 2m
+python tools/backtest.py --timeframe 2m --start 2025-01-02 --end 2025-06-30 --workers 8
+python tools/backtest.py --premium 1.20 --delta 0.45 --trades out.parquet
+"""
+
+EMA_WINDOWS = (13, 48, 200)
+DEFAULT_PREMIUM = 1.0  # ATM 0DTE SPY, about a dollar
+DEFAULT_DELTA = 0.5
+MIN_PREMIUM = 0.01
+TRADE_COLUMNS = ["day", "order_id", "option_type", "time_entered", "time_exited", "underlying_entry", "entry_price",
+                 "quantity", "trims", "exit_reason", "total_profit", "total_profit_percent", "max_drawdown", "max_gain"]
+
+# ───🔹 BARS ─────────────────────────────
+
+def load_bars(timeframe: str = "2m", start: Optional[str] = None, end: Optional[str] = None, symbol: Optional[str] = None) -> pd.DataFrame:
+    """
+    Candles of `timeframe` between `start` and `end` (YYYY-MM-DD, default: all of
+    the lake), oldest first, with a `day` column and the 13/48/200 EMA columns.
+    """
+    symbol = symbol or read_config('SYMBOL')
+    if start is None or end is None:
+        first, last, n_files = get_timeframe_bounds(timeframe=timeframe)
+        if not n_files:
+            return pd.DataFrame()
+        start = start or first.strftime("%Y-%m-%d")
+        end = end or last.strftime("%Y-%m-%d")
+    bars, _ = load_viewport(symbol=symbol, timeframe=timeframe, t0_iso=f"{start}T00:00:00", t1_iso=f"{end}T23:59:59")
+    return add_emas(bars)
+
+def add_emas(bars: pd.DataFrame) -> pd.DataFrame:
+    if bars.empty:
+        return bars
+    bars = bars.sort_values("ts").reset_index(drop=True)
+    bars["day"] = pd.to_datetime(bars["ts"]).dt.strftime("%Y-%m-%d")
+    for w in EMA_WINDOWS:
+        bars[str(w)] = bars["close"].astype(float).ewm(span=w, adjust=False).mean()
+    return bars
+
+# ───🔹 SIMULATED BROKER ─────────────────────────────
+
+def stop_loss_reason(stop_loss, position: Position, bid: float, close: float, emas: dict, score: float) -> Optional[str]:
+    """The exit `order_handler.check_stop_loss()` would take on a closed bar, or None."""
+    def ema_broke(ema_type):
+        ema = emas[ema_type]
+        return ema > close if position.option_type == "call" else ema < close
+
+    def sentiment_reversed(threshold):
+        return score <= -threshold if position.option_type == "call" else score >= threshold
+
+    if isinstance(stop_loss, str):
+        if "EMA" in stop_loss and ema_broke(stop_loss.split(' ')[-1]):
+            return "13ema Trailing stop Hit"
+        if "SENTIMENT" in stop_loss and sentiment_reversed(2):
+            return "Sentiment Reversal Stop Loss"
+    elif isinstance(stop_loss, (int, float)):
+        if (bid - position.entry_price) / position.entry_price * 100 <= stop_loss:
+            return f"{stop_loss}% Stop Loss"
+    elif isinstance(stop_loss, list) and len(stop_loss) == 2:
+        sl_string, sl_number = stop_loss
+        if "EMA" in sl_string and ema_broke(sl_string.split(' ')[-1]):
+            loss = (bid - position.entry_price) / position.entry_price * 100
+            if loss <= sl_number or position.adjustments:
+                return "Partial Exit & EMA Break" if position.adjustments else "EMA Break and (%) Loss"
+        elif "SENTIMENT" in sl_string and sentiment_reversed(sl_number):
+            return "Sentiment Reversal Stop Loss"
+    return None
+
+class SimBroker:
+    """
+    Fills and exits for the backtest, on `Position` objects like the live
+    position manager. `premium`/`delta` price the contract off the underlying.
+    """
+    def __init__(self, premium: float = DEFAULT_PREMIUM, delta: float = DEFAULT_DELTA, stop_loss="config",
+                 max_open: Optional[int] = None, budget: Optional[float] = None, symbol: Optional[str] = None):
+        self.premium = float(premium)
+        self.delta = float(delta)
+        self.stop_loss = read_config('STOP_LOSS') if stop_loss == "config" else stop_loss
+        self.max_open = max_open or read_config('MAX_OPEN_POSITIONS') or DEFAULT_MAX_OPEN_POSITIONS
+        self.budget = budget if budget is not None else read_config('START_OF_DAY_BALANCE') * read_config('ACCOUNT_ORDER_PERCENTAGE')
+        self.symbol = symbol or read_config('SYMBOL')
+        self.open_positions: List[Position] = []
+        self.trades: List[dict] = []
+        self._entry_underlying: Dict[str, float] = {}
+        self._entry_time: Dict[str, str] = {}
+
+    def price(self, position: Position, underlying: float) -> float:
+        move = underlying - self._entry_underlying[position.order_id]
+        sign = 1 if position.option_type == "call" else -1
+        return max(MIN_PREMIUM, position.entry_price + sign * self.delta * move)
+
+    def open(self, action: str, underlying: float, ts, tick: float) -> Optional[Position]:
+        if len(self.open_positions) >= self.max_open:
+            return None
+        stamp = pd.Timestamp(ts)
+        quantity = max(1, int(self.budget // (self.premium * 100)))
+        order_id = f"{self.symbol}-{action}-{round(underlying)}-{stamp:%Y%m%d}-{stamp:%H%M%S}"
+        sell_targets, sell_quantities = generate_sell_info(quantity, self.premium, quantity * self.premium * 100)
+        position = Position(order_id, self.premium, quantity,
+                            calculate_sell_points(self.premium, sell_targets[quantity]), sell_quantities[quantity])
+        position.path.started = tick
+        self._entry_underlying[order_id] = float(underlying)
+        self._entry_time[order_id] = stamp.isoformat()
+        self.open_positions.append(position)
+        return position
+
+    def on_bar(self, bar: dict, emas: dict, score: float, tick: float):
+        """Trims (intrabar), then the runner/stop exits at the close, for every open position."""
+        for position in list(self.open_positions):
+            bid = self.price(position, bar["close"])
+            best = self.price(position, bar["high"] if position.option_type == "call" else bar["low"])
+            position.path.record(bid, underlying=bar["close"], ts=tick)
+
+            runner_reason = self._trim(position, best, bar, emas, tick)
+            reason = runner_reason or stop_loss_reason(self.stop_loss, position, bid, bar["close"], emas, score)
+            if reason:
+                self._sell(position, position.remaining, bid, None, bar["timestamp"])
+                self._close(position, reason, bar["timestamp"])
+            elif position.remaining <= 0:
+                self._close(position, "All Targets Sold", bar["timestamp"])
+
+    def close_all(self, bar: dict, reason: str = "Market closing soon. Exiting all positions."):
+        for position in list(self.open_positions):
+            self._sell(position, position.remaining, self.price(position, bar["close"]), None, bar["timestamp"])
+            self._close(position, reason, bar["timestamp"])
+
+    def _trim(self, position: Position, best: float, bar: dict, emas: dict, tick: float) -> Optional[str]:
+        # `order_handler.check_trim_targets()`: every target but the last is sold once, the last is the runner
+        sold_targets = {sale["target"] for sale in position.adjustments}
+        for i, sell_point in enumerate(position.sell_points):
+            is_runner = i == len(position.sell_points) - 1 and all(sp in sold_targets for sp in position.sell_points[:i])
+            if is_runner:
+                broke = emas["13"] > bar["close"] if position.option_type == "call" else emas["13"] < bar["close"]
+                if position.tp_value is None and broke:
+                    return "13ema Hit on Runner"
+            elif best >= sell_point and sell_point not in sold_targets:
+                self._sell(position, min(position.sell_quantities[i], position.remaining), sell_point, sell_point, bar["timestamp"])
+                sold_targets.add(sell_point)
+        return None
+
+    def _sell(self, position: Position, quantity: int, price: float, target, timestamp):
+        if quantity > 0:
+            position.add_sale({"target": target, "sold_price": price, "quantity": quantity, "timestamp": str(timestamp)})
+
+    def _close(self, position: Position, reason: str, timestamp):
+        self.open_positions.remove(position)
+        proceeds = sum(sale["sold_price"] * 100 * sale["quantity"] for sale in position.adjustments)
+        stats = position.path.summary()
+        self.trades.append({
+            "order_id": position.order_id,
+            "option_type": position.option_type,
+            "time_entered": self._entry_time.pop(position.order_id),
+            "time_exited": pd.Timestamp(timestamp).isoformat(),
+            "underlying_entry": self._entry_underlying.pop(position.order_id),
+            "entry_price": position.entry_price,
+            "quantity": position.quantity,
+            "trims": sum(1 for sale in position.adjustments if sale["target"] is not None),
+            "exit_reason": reason,
+            "total_profit": proceeds - position.cost,
+            "total_profit_percent": (proceeds - position.cost) / position.cost * 100,
+            "max_drawdown": stats["max_drawdown"],
+            "max_gain": stats["max_gain"],
+        })
+
+# ───🔹 REPLAY ─────────────────────────────
+
+@contextmanager
+def _flag_lines_in_memory():
+    """identify_flag() would re-write `line_data.json` on every trendline update; keep them in memory instead."""
+    saved = flag_manager.USE_DICT_LINE_DATA
+    flag_manager.USE_DICT_LINE_DATA = True
+    try:
+        yield
+    finally:
+        flag_manager.USE_DICT_LINE_DATA = saved
+
+def _reset_flag_states():
+    # `clear_all_states()` without its log line (it would print once per replayed day)
+    flag_manager.STATE_MEMORY.clear()
+    flag_manager.TRACKERS.clear()
+    flag_manager.LINE_DATA_MEMORY.update({"active_flags": [], "completed_flags": []})
+    flag_manager.create_state(1, "bear", None, print_satements=False)
+    flag_manager.create_state(1, "bull", None, print_satements=False)
+
+async def _replay_day(bars: pd.DataFrame, zones, tp_lines, broker: SimBroker):
+    scores = score_history(bars, zones, tp_lines).to_numpy()
+    ts = pd.to_datetime(bars["ts"])
+    ticks = (ts - pd.Timestamp(0)).dt.total_seconds().to_numpy()
+    cols = {k: bars[k].to_numpy(dtype=np.float64) for k in ("open", "high", "low", "close", "13", "48", "200")}
+
+    _reset_flag_states()
+    for i in range(len(bars)):
+        bar = {"open": cols["open"][i], "high": cols["high"][i], "low": cols["low"][i], "close": cols["close"][i],
+               "timestamp": ts.iat[i], "candle_index": i, "zone_type": "None"}
+        emas = {"13": cols["13"][i], "48": cols["48"][i], "200": cols["200"][i]}
+
+        # Exits for what is already open, then the entry for this bar (filled at its close)
+        broker.on_bar(bar, emas, scores[i], ticks[i])
+        completed = await flag_manager.identify_flag(bar, print_satements=False)
+        if completed and i < len(bars) - 1:
+            action, _ = get_entry_action(bar["close"], emas["200"], completed)
+            if action is not None:
+                broker.open(action, bar["close"], bar["timestamp"], ticks[i])
+    if len(bars):
+        broker.close_all({"close": cols["close"][-1], "timestamp": ts.iat[-1]})
+
+def backtest_day(bars: pd.DataFrame, zones=None, tp_lines=None, broker_kwargs: Optional[dict] = None) -> List[dict]:
+    """One session, fresh flag state and broker. Top-level so worker processes can run it."""
+    broker = SimBroker(**(broker_kwargs or {}))
+    with _flag_lines_in_memory():
+        asyncio.run(_replay_day(bars.reset_index(drop=True), zones, tp_lines, broker))
+    day = bars["day"].iat[0] if len(bars) else None
+    return [{"day": day, **trade} for trade in broker.trades]
+
+def run_backtest(bars: pd.DataFrame, zones=None, tp_lines=None, workers: Optional[int] = None, **broker_kwargs) -> pd.DataFrame:
+    """
+    Every day of `bars` (from `load_bars()`), in parallel across `workers`
+    processes (default: one per core, 1 = in this process). One row per trade.
+    """
+    if "day" not in bars or not all(str(w) in bars for w in EMA_WINDOWS):
+        bars = add_emas(bars)
+    days = [group for _, group in bars.groupby("day", sort=True)] if len(bars) else []
+    workers = min(workers or os.cpu_count() or 1, max(len(days), 1))
+
+    if workers <= 1:
+        results = [backtest_day(day, zones, tp_lines, broker_kwargs) for day in days]
+    else:
+        # spawn: the parent has a log writer thread, forking it mid-write could deadlock a child
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            n = len(days)
+            results = list(pool.map(backtest_day, days, [zones] * n, [tp_lines] * n, [broker_kwargs] * n,
+                                    chunksize=max(1, n // (workers * 4))))
+    rows = [trade for day_trades in results for trade in day_trades]
+    return pd.DataFrame(rows, columns=TRADE_COLUMNS)
+
+# ───🔹 REPORT ─────────────────────────────
+
+def summarize(trades: pd.DataFrame) -> dict:
+    if trades.empty:
+        return {"trades": 0, "days_traded": 0, "win_rate": 0.0, "total_profit": 0.0, "avg_profit": 0.0,
+                "profit_factor": None, "max_drawdown": 0.0}
+    pnl = trades["total_profit"].astype(float)
+    equity = pnl.cumsum()
+    gains, losses = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+    return {
+        "trades": len(trades),
+        "days_traded": trades["day"].nunique(),
+        "win_rate": round(float((pnl > 0).mean()) * 100, 2),
+        "total_profit": round(float(pnl.sum()), 2),
+        "avg_profit": round(float(pnl.mean()), 2),
+        "profit_factor": round(float(gains / losses), 2) if losses else None,
+        "max_drawdown": round(float((equity.cummax().clip(lower=0) - equity).max()), 2),
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--timeframe", default="2m")
+    ap.add_argument("--start", help="YYYY-MM-DD (default: first day in the lake)")
+    ap.add_argument("--end", help="YYYY-MM-DD (default: last day in the lake)")
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    ap.add_argument("--premium", type=float, default=DEFAULT_PREMIUM)
+    ap.add_argument("--delta", type=float, default=DEFAULT_DELTA)
+    ap.add_argument("--trades", help="write the trade table to this .parquet")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    bars = load_bars(args.timeframe, args.start, args.end)
+    t1 = time.perf_counter()
+    trades = run_backtest(bars, workers=args.workers, premium=args.premium, delta=args.delta)
+    t2 = time.perf_counter()
+    print(f"{len(bars)} bars over {bars['day'].nunique() if len(bars) else 0} days: load {t1 - t0:.2f}s, replay {t2 - t1:.2f}s")
+    print(summarize(trades))
+    if len(trades):
+        print(trades.groupby("exit_reason")["total_profit"].agg(["count", "sum"]).round(2))
+    if args.trades:
+        trades.to_parquet(args.trades, index=False)
@@ -0,0 +1,56 @@
+# tools/bench_flag_tracker.py
+from pathlib import Path
+import sys
+
+# Ensure repo root (where paths.py AND utils lives) is on sys.path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import argparse
+import random
+import timeit
+from indicators.flag_manager import FlagPoint, FlagTracker
+
+"""
+Per-bar regression cost of a flag, old full recompute vs the running-sum tracker.
+Benchmark case is config `FLAGPOLE_CRITERIA.MAX_NUM_CANDLES` (150):
+
+python tools/bench_flag_tracker.py
+python tools/bench_flag_tracker.py --points 150 300 600
+"""
+
+def _full_recompute(points):
+    n = len(points)
+    sum_x = sum(p[0] for p in points)
+    sum_y = sum(p[1] for p in points)
+    sum_xy = sum(p[0] * p[1] for p in points)
+    sum_x_squared = sum(p[0] ** 2 for p in points)
+    return (n * sum_xy - sum_x * sum_y) / (n * sum_x_squared - sum_x ** 2)
+
+def bench(n_points: int, repeat: int = 2000) -> dict:
+    rng = random.Random(1)
+    start = FlagPoint(0, 600.0, 600.2)
+    pts = [FlagPoint(x, round(600 - x * 0.02 + rng.uniform(-0.1, 0.1), 2), 0.0) for x in range(1, n_points + 1)]
+    tracker = FlagTracker(start, pts)
+    nxt = FlagPoint(n_points + 1, 599.0, 0.0)
+
+    def old_bar():
+        _full_recompute([start] + pts + [nxt])
+
+    def new_bar():
+        tracker.add(nxt)
+        tracker.fit()
+        tracker.pop()  # undo, keeps the benchmark stationary
+
+    old_us = timeit.timeit(old_bar, number=repeat) / repeat * 1e6
+    new_us = timeit.timeit(new_bar, number=repeat) / repeat * 1e6
+    return {"points": n_points, "full_recompute_us": round(old_us, 2), "tracker_us": round(new_us, 2)}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, nargs="+", default=[150])
+    ap.add_argument("--repeat", type=int, default=2000)
+    args = ap.parse_args()
+    for n in args.points:
+        print(bench(n, args.repeat))
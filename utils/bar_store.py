@@ -0,0 +1,184 @@
+# utils/bar_store.py, in-memory session bars (the `logs/<SYMBOL>_<tf>.log` files are its disk mirror)
+from __future__ import annotations
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import paths
+from shared_state import print_log
+
+"""
+Closed candles of the current session, one store per (symbol, timeframe).
+
+The strategy loop, `is_ema_broke()` and `get_current_candle_index()` used to
+`readlines()` the whole candle log to get the last bar or the line count, so
+every call got slower as the day went on. Now the bars live in a list:
+
+  - the index of a bar is its position in the session (0, 1, 2, ...), same
+    numbers as the old "line number" (markers, EMA index, priority candles)
+  - `logs/<SYMBOL>_<tf>.log` is still written, append-only, one JSON bar per
+    line; the frontend and EOD upload read it and it is how a restarted bot
+    gets its session back (loaded lazily on first access, a torn last line
+    from a crash is skipped)
+  - readers await `wait_for_bar()` (or `subscribe()` a callback) instead of
+    polling the file
+
+Appends come from the event loop (`process_data()` in main), so no locking.
+"""
+
+DEFAULT_SYMBOL = "SPY"
+
+BarCallback = Callable[[str, int, dict], None]
+
+class BarStore:
+    def __init__(self, timeframe: str, symbol: str = DEFAULT_SYMBOL):
+        self.timeframe = timeframe
+        self.symbol = symbol
+        self.bars: List[dict] = []
+        self._loaded = False
+        self._event: Optional[asyncio.Event] = None
+        self._subs: List[BarCallback] = []
+
+    @property
+    def path(self) -> Path:
+        return paths.LOGS_DIR / f"{self.symbol}_{self.timeframe}.log"
+
+    # ───🔹 RECOVERY ─────────────────────────────
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self.bars.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # half-written line from a crash
+        except FileNotFoundError:
+            pass
+
+    # ───🔹 READS ─────────────────────────────
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.bars)
+
+    def current_index(self) -> int:
+        """Index of the newest bar (0 when there are none yet, like the old line count)."""
+        n = len(self)
+        return n - 1 if n else 0
+
+    def latest(self) -> Optional[dict]:
+        self._ensure_loaded()
+        return self.bars[-1] if self.bars else None
+
+    def last(self, n: int) -> List[dict]:
+        self._ensure_loaded()
+        return self.bars[-n:] if n > 0 else []
+
+    def get(self, index: int) -> Optional[dict]:
+        self._ensure_loaded()
+        return self.bars[index] if 0 <= index < len(self.bars) else None
+
+    # ───🔹 WRITES ─────────────────────────────
+
+    def append(self, bar: dict) -> int:
+        """Store a closed bar, mirror it to disk, wake readers. Returns its index."""
+        self._ensure_loaded()
+        bar = dict(bar)  # callers keep mutating their working candle
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(bar) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.bars.append(bar)
+        index = len(self.bars) - 1
+
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+        for callback in list(self._subs):
+            try:
+                callback(self.timeframe, index, bar)
+            except Exception as e:
+                print_log(f"[BAR STORE] Subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+        return index
+
+    def reset(self, delete_file: bool = True):
+        """Forget the session (EOD). The disk mirror is removed too unless told otherwise."""
+        self.bars = []
+        self._loaded = True
+        if delete_file and self.path.exists():
+            self.path.unlink()
+
+    # ───🔹 NOTIFICATIONS ─────────────────────────────
+
+    async def wait_for_bar(self, after: int = -1, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        Wait until a bar with index > `after` exists and return the newest index,
+        or None on timeout. `after=-1` means "any bar at all".
+        """
+        while len(self) - 1 <= after:
+            if self._event is None:
+                self._event = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return len(self.bars) - 1
+
+    def subscribe(self, callback: BarCallback) -> Callable[[], None]:
+        """Call `callback(timeframe, index, bar)` on every append. Returns an unsubscribe function."""
+        self._subs.append(callback)
+        def unsubscribe():
+            if callback in self._subs:
+                self._subs.remove(callback)
+        return unsubscribe
+
+_STORES: Dict[Tuple[str, str], BarStore] = {}
+
+def get_bar_store(timeframe: str, symbol: str = DEFAULT_SYMBOL) -> BarStore:
+    key = (symbol, timeframe)
+    store = _STORES.get(key)
+    if store is None:
+        store = _STORES[key] = BarStore(timeframe, symbol)
+    return store
+
+def store_for_path(file_path) -> Optional[BarStore]:
+    """The store mirrored to `file_path`, if it is a `logs/<SYMBOL>_<tf>.log` candle log."""
+    p = Path(file_path)
+    if p.suffix != ".log" or p.parent != Path(paths.LOGS_DIR) or "_" not in p.stem:
+        return None
+    symbol, timeframe = p.stem.rsplit("_", 1)
+    if not timeframe[:-1].isdigit():
+        return None
+    return get_bar_store(timeframe, symbol)
+
+def append_bar(timeframe: str, bar: dict, symbol: str = DEFAULT_SYMBOL) -> int:
+    return get_bar_store(timeframe, symbol).append(bar)
+
+def last_bars(timeframe: str, n: int = 1, symbol: str = DEFAULT_SYMBOL) -> List[dict]:
+    return get_bar_store(timeframe, symbol).last(n)
+
+def latest_bar(timeframe: str, symbol: str = DEFAULT_SYMBOL) -> Optional[dict]:
+    return get_bar_store(timeframe, symbol).latest()
+
+def current_bar_index(timeframe: str, symbol: str = DEFAULT_SYMBOL) -> int:
+    return get_bar_store(timeframe, symbol).current_index()
+
+async def wait_for_bar(timeframe: str, after: int = -1, timeout: Optional[float] = None,
+                       symbol: str = DEFAULT_SYMBOL) -> Optional[int]:
+    return await get_bar_store(timeframe, symbol).wait_for_bar(after, timeout)
+
+def reset_bar_store(timeframe: str, symbol: str = DEFAULT_SYMBOL, delete_file: bool = True):
+    get_bar_store(timeframe, symbol).reset(delete_file)
+
+def clear_bar_stores():
+    """Drop every in-memory store (tests / full restart); disk mirrors are untouched."""
+    _STORES.clear()
@@ -0,0 +1,196 @@
+# utils/config_service.py, cached + hot-reloadable view of config.json
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import paths
+from shared_state import print_log
+
+"""
+`config.json` is the live control panel (see paths.py), but parsing it on
+every `read_config()` call put a file open + json.load inside per-tick loops.
+
+The service parses the file once into an immutable snapshot and a daemon
+thread polls the file's mtime/size (`WATCH_INTERVAL`). When it changes, the
+file is re-parsed and the snapshot reference is swapped, so readers never
+see a half-applied config. Reads are a dict lookup, and top-level keys are
+also attributes:
+
+    cfg = config()               # current snapshot
+    cfg.TIMEFRAMES, cfg["SYMBOL"], cfg.get("LIVE_BARS")
+
+Components that cache derived values subscribe to edits:
+
+    unsubscribe = subscribe(lambda old, new, changed: ..., keys=["TIMEFRAMES"])
+
+Callbacks run on the watcher thread (or on the thread that called
+`update_config_value`); asyncio code should hop back with
+`loop.call_soon_threadsafe`. A file that fails to parse (e.g. caught
+mid-save) is ignored and the previous snapshot stays active.
+"""
+
+WATCH_INTERVAL = 0.5  # seconds between mtime checks
+
+class FrozenList(list):
+    """A list that refuses mutation (still a `list` for isinstance checks and json.dumps)."""
+    def _blocked(self, *args, **kwargs):
+        raise TypeError("config values are read-only; use update_config_value()")
+    append = extend = insert = pop = remove = clear = sort = reverse = _blocked
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _blocked
+
+class FrozenDict(dict):
+    """A dict that refuses mutation; top-level keys are readable as attributes."""
+    def _blocked(self, *args, **kwargs):
+        raise TypeError("config values are read-only; use update_config_value()")
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _blocked
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return FrozenList(_freeze(v) for v in value)
+    return value
+
+def thaw(value):
+    """Plain, mutable deep copy of a snapshot value."""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [thaw(v) for v in value]
+    return value
+
+Callback = Callable[[FrozenDict, FrozenDict, set], None]
+
+class ConfigService:
+    def __init__(self, path=None, watch: bool = True, interval: float = WATCH_INTERVAL):
+        self.path = path  # None -> paths.CONFIG_PATH at load time (tests monkeypatch it)
+        self.interval = interval
+        self._snapshot: FrozenDict = FrozenDict()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._subs: List[Tuple[Callback, Optional[frozenset]]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reload()
+        if watch:
+            self.start()
+
+    # ───🔹 READS ─────────────────────────────
+
+    @property
+    def snapshot(self) -> FrozenDict:
+        return self._snapshot
+
+    def get(self, key=None, default=None):
+        snap = self._snapshot
+        return snap if key is None else snap.get(key, default)
+
+    # ───🔹 RELOAD / WATCH ─────────────────────────────
+
+    def _path(self):
+        return self.path if self.path is not None else paths.CONFIG_PATH
+
+    def _stat(self):
+        st = os.stat(self._path())
+        return (st.st_mtime_ns, st.st_size)
+
+    def reload(self) -> bool:
+        """Re-parse the file now. Returns True if the snapshot changed."""
+        with self._lock:
+            try:
+                stamp = self._stat()
+                with open(self._path(), "r") as f:
+                    fresh = _freeze(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                print_log(f"[CONFIG] Keeping previous config, reload failed: {e}")
+                return False
+            old, self._stamp = self._snapshot, stamp
+            if fresh == old:
+                return False
+            self._snapshot = fresh
+
+        changed = {k for k in set(old) | set(fresh) if old.get(k) != fresh.get(k)}
+        if old:  # first load is not a "change"
+            self._notify(old, fresh, changed)
+        return True
+
+    def check(self) -> bool:
+        """Reload if the file's mtime/size moved since the last load."""
+        try:
+            if self._stat() == self._stamp:
+                return False
+        except OSError:
+            return False
+        return self.reload()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="ConfigWatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    # ───🔹 SUBSCRIPTIONS ─────────────────────────────
+
+    def subscribe(self, callback: Callback, keys: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Call `callback(old, new, changed_keys)` after an edit (only if one of `keys` changed, when given)."""
+        entry = (callback, frozenset(keys) if keys is not None else None)
+        self._subs.append(entry)
+        def unsubscribe():
+            if entry in self._subs:
+                self._subs.remove(entry)
+        return unsubscribe
+
+    def _notify(self, old, new, changed):
+        for callback, keys in list(self._subs):
+            if keys is not None and not (keys & changed):
+                continue
+            try:
+                callback(old, new, changed)
+            except Exception as e:
+                print_log(f"[CONFIG] Subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+
+    # ───🔹 WRITES ─────────────────────────────
+
+    def set_value(self, key, value):
+        """Write one key back to the file and apply it immediately."""
+        with self._lock:
+            with open(self._path(), "r") as f:
+                raw = json.load(f)
+            raw[key] = thaw(value)
+            tmp = self._path().with_suffix(".json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(raw, f, indent=4)
+            os.replace(tmp, self._path())
+        self.reload()
+
+_SERVICE: Optional[ConfigService] = None
+_SERVICE_LOCK = threading.Lock()
+
+def get_config_service() -> ConfigService:
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None:
+                _SERVICE = ConfigService()
+    return _SERVICE
+
+def config() -> FrozenDict:
+    """Current immutable config snapshot."""
+    return get_config_service().snapshot
+
+def subscribe(callback: Callback, keys: Optional[Iterable[str]] = None) -> Callable[[], None]:
+    return get_config_service().subscribe(callback, keys)
@@ -85,13 +85,14 @@ def get_dates(num_of_days, use_todays_date=False, use_specific_start_date=None):
 
     return start_date_str, end_date_str
          
-def check_valid_points(indent_lvl, line_name, line_type, print_statements=True):
+def check_valid_points(indent_lvl, line_name, line_type, print_statements=True, line_data=None):
     default_structure = {
         "active_flags": [],
         "completed_flags": []
     }
 
-    line_data = safe_read_json(LINE_DATA_PATH, default=default_structure, indent_lvl=indent_lvl+1)
+    if line_data is None:  # the flag manager passes the trendlines it already holds
+        line_data = safe_read_json(LINE_DATA_PATH, default=default_structure, indent_lvl=indent_lvl+1)
     all_flags = line_data.get("active_flags", []) + line_data.get("completed_flags", [])
 
     for flag in all_flags:
@@ -1,23 +1,161 @@
 # utils/ema_utils.py, EMA calculations and JSON handling
 import json
 import pandas as pd
-from utils.json_utils import read_config, load_json_df
+from utils.json_utils import read_config
 from shared_state import indent, print_log, safe_write_json, safe_read_json
-from paths import get_ema_path, get_merged_ema_csv_path, pretty_path, CANDLE_LOGS
+from paths import get_ema_series_path, get_ema_engine_state_path, pretty_path
+from utils.bar_store import get_bar_store
 from error_handler import error_log_and_discord_message
 
-async def read_ema_json(position, timeframe):
-    path = get_ema_path(timeframe)
+# ───🔹 INCREMENTAL EMA ENGINE ─────────────────────────────
+# One engine per timeframe keeps the running EMA for every configured window.
+# A closed bar costs O(1): one step per window, one appended line in the
+# series file (`<TF>.jsonl`) and one tiny state record (`<TF>_state.json`).
+# The step mirrors pandas `ewm(span=w, adjust=False).mean()` bit-for-bit.
+
+def ema_alpha(window):
+    """Smoothing factor pandas derives from `span` (com = (span-1)/2, alpha = 1/(1+com))."""
+    com = (float(window) - 1) / 2.0
+    return 1. / (1. + com)
+
+def ema_step(prev, close, alpha):
+    """One `adjust=False` step, written the same way pandas' cython loop does it."""
+    if prev is None:
+        return float(close)
+    if prev == close:
+        return prev
+    old_wt = 1. - alpha
+    return (old_wt * prev + alpha * close) / (old_wt + alpha)
+
+class IncrementalEMA:
+    """Running EMA values for a single timeframe."""
+    __slots__ = ("timeframe", "windows", "values", "count", "x")
+
+    def __init__(self, timeframe, windows):
+        self.timeframe = timeframe
+        self.windows = [int(w) for w in windows]
+        self.values = {str(w): None for w in self.windows}
+        self.count = 0
+        self.x = None
+
+    def update(self, close, x=None):
+        """Fold one closed bar in and return the row written to the series file."""
+        close = float(close)
+        for w in self.windows:
+            key = str(w)
+            self.values[key] = ema_step(self.values.get(key), close, ema_alpha(w))
+        self.count += 1
+        self.x = x if x is not None else self.count - 1
+        return self.snapshot()
+
+    def seed(self, closes):
+        """Warm the engine from history (oldest → newest) without writing series rows."""
+        for c in closes:
+            if c is None or pd.isna(c):
+                continue
+            for w in self.windows:
+                key = str(w)
+                self.values[key] = ema_step(self.values.get(key), float(c), ema_alpha(w))
+            self.count += 1
+        return self
+
+    def snapshot(self):
+        row = {k: v for k, v in self.values.items()}
+        row["x"] = self.x
+        return row
+
+    def to_record(self):
+        return {
+            "timeframe": self.timeframe,
+            "windows": self.windows,
+            "values": self.values,
+            "count": self.count,
+            "x": self.x,
+        }
+
+    @classmethod
+    def from_record(cls, record, windows=None):
+        eng = cls(record.get("timeframe"), windows or record.get("windows") or [])
+        saved = record.get("values") or {}
+        for key in eng.values:
+            eng.values[key] = saved.get(key)  # windows added to config later start fresh on next close
+        eng.count = int(record.get("count") or 0)
+        eng.x = record.get("x")
+        return eng
+
+_EMA_ENGINES: dict[str, IncrementalEMA] = {}
+
+def _config_windows():
+    return [int(window) for window, _ in read_config('EMAS')]  # window, color
+
+def get_ema_engine(timeframe):
+    """Return the in-memory engine for `timeframe`, loading the persisted state on first use."""
+    eng = _EMA_ENGINES.get(timeframe)
+    if eng is not None:
+        return eng
+    record = safe_read_json(get_ema_engine_state_path(timeframe), default={})
+    if record.get("values"):
+        eng = IncrementalEMA.from_record(record, windows=_config_windows())
+    else:
+        eng = IncrementalEMA(timeframe, _config_windows())
+    _EMA_ENGINES[timeframe] = eng
+    return eng
+
+def _persist_ema_engine(eng):
+    safe_write_json(get_ema_engine_state_path(eng.timeframe), eng.to_record())
+
+def reset_ema_engine(timeframe):
+    """Forget the running EMAs for `timeframe` and truncate its series file."""
+    _EMA_ENGINES.pop(timeframe, None)
+    series_path = get_ema_series_path(timeframe)
+    series_path.parent.mkdir(parents=True, exist_ok=True)
+    series_path.write_text("", encoding="utf-8")
+    state_path = get_ema_engine_state_path(timeframe)
+    if state_path.exists():
+        state_path.unlink()
+
+def seed_ema_engine(timeframe, closes):
+    """Reset and warm the engine from historical closes (e.g. the merged pre/after-market history)."""
+    reset_ema_engine(timeframe)
+    eng = IncrementalEMA(timeframe, _config_windows()).seed(closes)
+    _EMA_ENGINES[timeframe] = eng
+    _persist_ema_engine(eng)
+    return eng
+
+def append_ema_series(timeframe, row):
+    path = get_ema_series_path(timeframe)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(row) + "\n")
+
+def read_ema_series(timeframe):
+    """All EMA rows written this session, oldest first."""
+    path = get_ema_series_path(timeframe)
+    rows = []
     try:
-        with open(path, "r") as file:
-            emas = json.load(file)
-            latest_ema = emas[position]
-            return latest_ema
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # half-written tail line after a crash
     except FileNotFoundError:
-        print_log(f"`{pretty_path(path)}` file not found.")
-        return None
-    except KeyError:
-        print_log(f"EMA type [{position}] not found in `{pretty_path(path)}`.")
+        pass
+    return rows
+
+# ───🔹 EMA HELPERS ─────────────────────────────
+
+async def read_ema_json(position, timeframe):
+    path = get_ema_series_path(timeframe)
+    try:
+        emas = read_ema_series(timeframe)
+        latest_ema = emas[position]
+        return latest_ema
+    except IndexError:
+        print_log(f"EMA position [{position}] not found in `{pretty_path(path)}`.")
         return None
     except Exception as e:
         await error_log_and_discord_message(e, "ema_utils", "read_ema_json")
@@ -25,60 +163,25 @@ async def read_ema_json(position, timeframe):
 
 async def calculate_save_EMAs(candle, X_value, timeframe):
     """
-    Process a single candle: Adds it to CSV, Recalculate EMAs, Saves EMAs to JSON file.
+    Process a single candle: steps the incremental EMA engine, appends the row to the series file, persists the engine state.
     """
-    path = get_ema_path(timeframe)
-    required_columns = ['timestamp', 'open', 'high', 'low', 'close']
-    csv_path = get_merged_ema_csv_path(timeframe)
+    close = candle.get("close")
+    if close is None:
+        print_log(f"{indent(1)}[EMA CS] Candle without close for {timeframe}, skipped: {candle}")
+        return None
 
-    # Load or init
-    try:
-        df = pd.read_csv(csv_path)
-        df = df[required_columns] if not df.empty else pd.DataFrame(columns=required_columns)
-    except FileNotFoundError:
-        df = pd.DataFrame(columns=required_columns)
-
-    # Fix candle
-    candle_df = pd.DataFrame([candle])
-    for col in required_columns:
-        if col not in candle_df.columns:
-            candle_df[col] = pd.Timestamp.now().isoformat() if col == 'timestamp' else 0.0
-
-    candle_df = candle_df[required_columns]  # Ensure correct column order
-    df = pd.concat([df, candle_df], ignore_index=True) #if not candle_df.empty: # Concat only if valid
-    df.to_csv(csv_path, mode='w', header=True, index=False)
-
-    # EMAs
-    current_ema_values = {}
-    for window, _ in read_config('EMAS'):  # window, color
-        ema_col = f"EMA_{window}"
-        df[ema_col] = df['close'].ewm(span=window, adjust=False).mean()
-        #ts_val = candle.get("timestamp")
-        current_ema_values[str(window)] = df[ema_col].iloc[-1]
-
-    current_ema_values['x'] = X_value
-    #current_ema_values["ts"] = ts_val
-    update_ema_json(path, current_ema_values)
+    eng = get_ema_engine(timeframe)
+    current_ema_values = eng.update(close, X_value)
+    append_ema_series(timeframe, current_ema_values)
+    _persist_ema_engine(eng)
+    return current_ema_values
 
 def get_latest_ema_values(ema_type, timeframe):
-    path = get_ema_path(timeframe)
-
-    # Check if the file is empty before reading
-    if not path.exists() or path.stat().st_size == 0:
-        print_log(f"    [GLEV] `{pretty_path(path)}` is empty or missing.")
-        return None, None
-
-    try:
-        emas = safe_read_json(path)
-
-        if not emas:  # Check if the file is empty or contains no data
-            print_log(f"    [GLEV] `{pretty_path(path)}` is empty or contains no data.")
-            return None, None
-        
-        return emas[-1].get(ema_type), emas[-1].get("x")
-    except (FileNotFoundError, KeyError, json.JSONDecodeError) as e:
-        print_log(f"    [GLEV] EMA error: {e}")
+    eng = get_ema_engine(timeframe)
+    if eng.x is None:
+        print_log(f"    [GLEV] `{pretty_path(get_ema_series_path(timeframe))}` has no EMA values yet.")
         return None, None
+    return eng.values.get(str(ema_type)), eng.x
 
 def is_ema_broke(ema_type, timeframe, cp, indent_lvl=1):
     # Get EMA Data
@@ -87,16 +190,12 @@ def is_ema_broke(ema_type, timeframe, cp, indent_lvl=1):
         return False
     
     # Get Candle Data
-    filepath = CANDLE_LOGS.get(timeframe)
-    try:
-        with open(filepath, "r") as file:
-            lines = file.readlines()
-            latest_candle = json.loads(lines[-1])
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print_log(f"Log file error: {e}")
+    store = get_bar_store(timeframe)
+    latest_candle = store.latest()
+    if latest_candle is None:
         return False
 
-    index_candle = len(lines) - 1
+    index_candle = store.current_index()
     if index_candle == index_ema:
         open_price = latest_candle["open"]
         close_price = latest_candle["close"]
@@ -117,25 +216,13 @@ def is_ema_broke(ema_type, timeframe, cp, indent_lvl=1):
 
     return False
 
-def update_ema_json(json_path, new_ema_values):
-    """Update the EMA JSON file with new EMA values by appending."""
-    ema_data = safe_read_json(json_path)
-
-    # Append new EMA values
-    ema_data.append(new_ema_values)
-
-    # Write the updated list back to the file
-    safe_write_json(json_path, ema_data)
-
 def get_last_emas(timeframe, indent_lvl=1, print_statements=True):
-    path= get_ema_path(timeframe)
-    EMAs = load_json_df(path)
-    if EMAs.empty:
+    eng = get_ema_engine(timeframe)
+    if eng.x is None:
         if print_statements:
-            print_log(f"{indent(indent_lvl)}[GET-EMAs] ERROR: data `{pretty_path(path)}` is unavailable.")
+            print_log(f"{indent(indent_lvl)}[GET-EMAs] ERROR: data `{pretty_path(get_ema_series_path(timeframe))}` is unavailable.")
         return None
-    last_EMA = EMAs.iloc[-1]
-    emas = last_EMA.to_dict()
+    emas = eng.snapshot()
     if print_statements:
         print_log(f"{indent(indent_lvl)}[GET-EMAs] x: {emas['x']}, 13: {emas['13']:.2f}, 48: {emas['48']:.2f}, 200: {emas['200']:.2f}")
     return emas
@@ -148,4 +235,3 @@ def load_ema_json(path):
         #return df if not df.empty else None
     except:
         return None
-    
\ No newline at end of file
@@ -0,0 +1,163 @@
+# utils/event_bus.py, in-process pub/sub for bar-close (and derived) events
+from __future__ import annotations
+import asyncio
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type
+from shared_state import print_log
+
+"""
+`process_data()` publishes a `BarClosed` for every candle it closes (after the
+EMAs/indicators are updated, so subscribers see matching values). Consumers
+subscribe to an event type, optionally filtered by timeframe, and each gets
+its own bounded asyncio queue:
+
+    sub = subscribe(BarClosed, name="flags", timeframe="2M")
+    while True:
+        bar = await sub.get()           # or `async for bar in sub`
+
+A slow consumer never blocks the publisher: when its queue is full the oldest
+event is dropped (the newest bar is the one that matters) and counted in
+`sub.dropped`. Publish/consume on the event loop thread only.
+
+Current wiring:
+    process_data ── BarClosed ──> flag detector ── FlagsCompleted ──> strategy
+                              ├─> sentiment      (updates `latest_sentiment_score`)
+                              └─> position manager  (EMA stop checks once per closed bar)
+"""
+
+DEFAULT_MAXSIZE = 64
+
+# ───🔹 PAYLOADS ─────────────────────────────
+
+class BarClosed(NamedTuple):
+    symbol: str
+    timeframe: str
+    index: int          # session bar index (same as `get_current_candle_index()`)
+    timestamp: str      # ISO, bar open time
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 0.0
+
+    @classmethod
+    def from_candle(cls, symbol: str, timeframe: str, index: int, candle: dict) -> "BarClosed":
+        return cls(symbol, timeframe, index, candle["timestamp"],
+                   candle["open"], candle["high"], candle["low"], candle["close"],
+                   candle.get("volume") or 0.0)
+
+    def as_candle(self, **extra) -> dict:
+        """The dict shape the strategy code works with (`candle_index` = bar index)."""
+        return {"open": self.open, "high": self.high, "low": self.low, "close": self.close,
+                "timestamp": self.timestamp, "candle_index": self.index, **extra}
+
+class FlagsCompleted(NamedTuple):
+    bar: BarClosed
+    flag_names: Tuple[str, ...]
+
+    @property
+    def timeframe(self) -> str:
+        return self.bar.timeframe
+
+class SentimentUpdated(NamedTuple):
+    bar: BarClosed
+    score: float
+
+    @property
+    def timeframe(self) -> str:
+        return self.bar.timeframe
+
+# ───🔹 SUBSCRIPTIONS ─────────────────────────────
+
+class Subscription:
+    def __init__(self, bus: "EventBus", event_type: type, name: str,
+                 timeframe: Optional[str] = None, maxsize: int = DEFAULT_MAXSIZE):
+        self.bus = bus
+        self.event_type = event_type
+        self.name = name
+        self.timeframe = timeframe
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _offer(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            print_log(f"[BUS] `{self.name}` is behind, dropped oldest {self.event_type.__name__} ({self.dropped} total)")
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None):
+        """Next event, or None when `timeout` passes first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self):
+        """Empty the queue without waiting; returns the newest event (None if there was none)."""
+        latest = None
+        while not self.queue.empty():
+            latest = self.queue.get_nowait()
+        return latest
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    # `with sub:` / `async with ..., sub:` unsubscribes on the way out
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+class EventBus:
+    def __init__(self):
+        self._subs: Dict[type, List[Subscription]] = {}
+
+    def subscribe(self, event_type: Type, name: str, timeframe: Optional[str] = None,
+                  maxsize: int = DEFAULT_MAXSIZE) -> Subscription:
+        sub = Subscription(self, event_type, name, timeframe, maxsize)
+        self._subs.setdefault(event_type, []).append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        subs = self._subs.get(sub.event_type, [])
+        if sub in subs:
+            subs.remove(sub)
+
+    def publish(self, event) -> int:
+        """Hand `event` to every matching subscriber (never blocks). Returns how many got it."""
+        delivered = 0
+        tf = getattr(event, "timeframe", None)
+        for sub in list(self._subs.get(type(event), ())):
+            if sub.timeframe is not None and sub.timeframe != tf:
+                continue
+            sub._offer(event)
+            delivered += 1
+        return delivered
+
+    def clear(self):
+        self._subs.clear()
+
+_BUS = EventBus()
+
+def get_bus() -> EventBus:
+    return _BUS
+
+def subscribe(event_type: Type, name: str, timeframe: Optional[str] = None,
+              maxsize: int = DEFAULT_MAXSIZE) -> Subscription:
+    return _BUS.subscribe(event_type, name, timeframe, maxsize)
+
+def publish(event) -> int:
+    return _BUS.publish(event)
@@ -2,18 +2,14 @@
 from pathlib import Path
 import json
 from shared_state import indent, print_log, safe_write_json
-from utils.file_utils import get_current_candle_index
+from utils.config_service import get_config_service
 import pandas as pd
 import os
-from paths import pretty_path, get_ema_path, CONFIG_PATH, MARKERS_PATH, MESSAGE_IDS_PATH, ORDER_CANDLE_TYPE_PATH, PRIORITY_CANDLES_PATH, LINE_DATA_PATH
+from paths import pretty_path, MARKERS_PATH, MESSAGE_IDS_PATH, ORDER_CANDLE_TYPE_PATH, LINE_DATA_PATH
 
 def read_config(key=None):
-    """Reads the configuration file and optionally returns a specific key."""
-    with CONFIG_PATH.open("r") as f:
-        config = json.load(f)
-    if key is None:
-        return config  # Return the whole config if no key is provided
-    return config.get(key)  # Return the specific key's value or None if key doesn't exist
+    """Returns the whole config snapshot, or one key's value (None if missing). Cached in memory, reloaded when config.json changes."""
+    return get_config_service().get(key)
 
 def load_message_ids():
     if os.path.exists(MESSAGE_IDS_PATH):
@@ -26,12 +22,8 @@ def load_message_ids():
         return {}
 
 def update_config_value(key, value):
-    """Update a single key in the config file with a new value."""
-    with open(CONFIG_PATH, 'r') as f:
-        config = json.load(f)
-    config[key] = value
-    with open(CONFIG_PATH, 'w') as f:
-        json.dump(config, f, indent=4)
+    """Update a single key in the config file with a new value (applied to the cached snapshot right away)."""
+    get_config_service().set_value(key, value)
 
 def load_json_df(file_path):
     with open(file_path, 'r') as file:
@@ -97,32 +89,6 @@ def check_order_type_json(candle_type):
 
     return True, num_of_matches  # Fewer matches than the threshold, allow more orders
 
-def clear_priority_candles(indent_level):
-    with open(PRIORITY_CANDLES_PATH, 'w') as file:
-        json.dump([], file, indent=4)
-    print_log(f"{indent(indent_level)}[RESET] `{pretty_path(PRIORITY_CANDLES_PATH)}` = [];")
-
-async def record_priority_candle(candle, zone_type_candle, timeframe):
-    # Load existing data or initialize an empty list
-    try:
-        with open(PRIORITY_CANDLES_PATH, 'r') as file:
-            candles_data = json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        candles_data = []
-
-    current_candle_index = get_current_candle_index(timeframe)
-
-    # Append the new candle data along with its type
-    candle_with_type = candle.copy()
-    candle_with_type['zone_type'] = zone_type_candle
-    #candle_with_type['dir_type'] = bull_or_bear_candle
-    candle_with_type['candle_index'] = current_candle_index
-    candles_data.append(candle_with_type)
-
-    # Save updated data back to the file
-    with open(PRIORITY_CANDLES_PATH, 'w') as file:
-        json.dump(candles_data, file, indent=4)
-
 def restart_state_json(indent_level, state_file_path):
     initial_state = {
         'flag_names': [],
@@ -200,8 +166,6 @@ def EOD_reset_all_jsons():
         MESSAGE_IDS_PATH: {},                                     # message id mapping
         #LINE_DATA_PATH: {"active_flags": [], "completed_flags": []},  # <-- keep schema
         #ORDER_CANDLE_TYPE_PATH: [],                               # list/queue
-        #PRIORITY_CANDLES_PATH: [],                                # list
-        **{Path(get_ema_path(tf)): [] for tf in tf_with_emas},    # all EMA files → empty list
     }
 
     failures = []
@@ -218,6 +182,15 @@ def EOD_reset_all_jsons():
         except Exception as e:
             failures.append((path, str(e)))
 
+    # EMA engines: truncate the series + drop the running state (local import, ema_utils imports this module)
+    from utils.ema_utils import reset_ema_engine
+    for tf in tf_with_emas:
+        try:
+            reset_ema_engine(tf)
+            print_log(f" [EOD] Reset: EMA engine {tf}")
+        except Exception as e:
+            failures.append((tf, str(e)))
+
     if failures:
         print_log(" [EOD] ⚠️ Some resets failed:")
         for path, err in failures:
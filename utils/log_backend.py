@@ -0,0 +1,169 @@
+# utils/log_backend.py, background writer behind `shared_state.print_log()`
+from __future__ import annotations
+import atexit
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+import paths
+
+"""
+`print_log()` used to print, mkdir, touch and open/append/close `logs/terminal_output.log`
+for every message, on the event loop. Now it only builds a small record and puts it on a
+bounded queue; one daemon thread does the rest in batches:
+
+  - console print (same text as before)
+  - `logs/terminal_output.log`   human-readable lines (what we send to Discord at EOD)
+  - `logs/terminal_output.jsonl` one JSON record per line: {"ts", "level", "component", "msg"}
+
+Batches are written when `BATCH_MAX` records are waiting or `FLUSH_INTERVAL` passed.
+Files are opened per batch (not held open) so EOD cleanup can delete them on Windows.
+Rotation: size (`ROTATE_BYTES`, keeps `BACKUP_COUNT` numbered copies) and time (the first
+batch of a new day moves yesterday's file to `<name>-YYYY-MM-DD<ext>`).
+
+If the queue is full the caller waits at most `PUT_TIMEOUT`, then the record is dropped
+and counted; the count is logged with the next batch.
+"""
+
+QUEUE_MAX = 10_000
+BATCH_MAX = 500
+FLUSH_INTERVAL = 0.2    # seconds
+PUT_TIMEOUT = 0.05      # seconds the hot path may block on a full queue
+ROTATE_BYTES = 20 * 1024 * 1024
+BACKUP_COUNT = 5
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+_TAG_RE = re.compile(r"^\s*\[([^\]]+)\]")  # "[EMA CS] ..." -> "EMA CS"
+
+def infer_component(message: str) -> Optional[str]:
+    m = _TAG_RE.match(message)
+    return m.group(1).strip() if m else None
+
+def _json_path(text_path: Path) -> Path:
+    return text_path.with_suffix(".jsonl")
+
+def _rotate_if_needed(path: Path, today: str):
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return
+    file_day = datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d")
+    if file_day != today:
+        target = path.with_name(f"{path.stem}-{file_day}{path.suffix}")
+        if not target.exists():
+            os.replace(path, target)
+            return
+    if st.st_size >= ROTATE_BYTES:
+        for i in range(BACKUP_COUNT - 1, 0, -1):
+            src = path.with_name(f"{path.name}.{i}")
+            if src.exists():
+                os.replace(src, path.with_name(f"{path.name}.{i + 1}"))
+        os.replace(path, path.with_name(f"{path.name}.1"))
+
+class LogWriter:
+    def __init__(self, echo: bool = True):
+        self.echo = echo
+        self.q: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=QUEUE_MAX)
+        self.dropped = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+
+    # hot path
+    def submit(self, message: str, level: str = "INFO", component: Optional[str] = None):
+        rec = {"ts": time.time(), "level": level, "component": component, "msg": message}
+        self._idle.clear()
+        try:
+            self.q.put(rec, timeout=PUT_TIMEOUT)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is on disk."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.q.unfinished_tasks == 0 and self._idle.is_set():
+                return True
+            time.sleep(0.005)
+        return False
+
+    def close(self):
+        self.flush()
+        self.q.put(None)
+        self._thread.join(timeout=2)
+
+    # writer thread
+    def _run(self):
+        while True:
+            try:
+                first = self.q.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            batch: List[dict] = [first]
+            while len(batch) < BATCH_MAX:
+                try:
+                    batch.append(self.q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            records = [r for r in batch if r is not None]
+            try:
+                self._write(records)
+            except Exception as e:  # never let logging take the bot down
+                sys.stderr.write(f"[LOG WRITER] write failed: {e}\n")
+            finally:
+                for _ in batch:
+                    self.q.task_done()
+                if self.q.unfinished_tasks == 0:
+                    self._idle.set()
+            if stop:
+                return
+
+    def _write(self, records: List[dict]):
+        if self.dropped:
+            n, self.dropped = self.dropped, 0
+            records.append({"ts": time.time(), "level": "WARNING", "component": "LOG",
+                            "msg": f"[LOG] Queue full, dropped {n} message(s)."})
+        if not records:
+            return
+
+        text_path = Path(paths.TERMINAL_LOG)
+        json_path = _json_path(text_path)
+        text_path.parent.mkdir(parents=True, exist_ok=True)
+        today = datetime.now().strftime("%Y-%m-%d")
+        _rotate_if_needed(text_path, today)
+        _rotate_if_needed(json_path, today)
+
+        lines = [r["msg"] for r in records]
+        if self.echo:
+            print("\n".join(lines), flush=True)
+        with open(text_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        with open(json_path, "a", encoding="utf-8") as f:
+            for r in records:
+                r["component"] = r["component"] or infer_component(r["msg"])
+                r["ts"] = datetime.fromtimestamp(r["ts"]).isoformat(timespec="milliseconds")
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+_WRITER: Optional[LogWriter] = None
+_WRITER_LOCK = threading.Lock()
+
+def get_writer() -> LogWriter:
+    global _WRITER
+    if _WRITER is None:
+        with _WRITER_LOCK:
+            if _WRITER is None:
+                _WRITER = LogWriter()
+                atexit.register(_WRITER.flush)
+    return _WRITER
+
+def flush_logs(timeout: float = 5.0) -> bool:
+    """Make sure everything logged so far is in the files (call before sending/deleting them)."""
+    return get_writer().flush(timeout) if _WRITER is not None else True
@@ -1,6 +1,8 @@
 # utils/log_utils.py
 import json
 from shared_state import print_log
+from utils.log_backend import flush_logs
+from utils.bar_store import append_bar, reset_bar_store, store_for_path
 from paths import pretty_path, LOGS_DIR, STORAGE_DIR, CSV_DIR, TERMINAL_LOG, ORDER_LOG_PATH, SPY_15_MINUTE_CANDLES_PATH
 from utils.json_utils import read_config, EOD_reset_all_jsons
 import pandas as pd
@@ -11,11 +13,8 @@ def read_log_to_df(log_file_path):
     return pd.read_json(log_file_path, lines=True)
 
 def write_to_log(data, symbol, timeframe):
-    filepath = LOGS_DIR / f"{symbol}_{timeframe}.log"
-    LOGS_DIR.mkdir(parents=True, exist_ok=True)
-    with filepath.open("a") as file:
-        json_data = json.dumps(data)
-        file.write(json_data + "\n")
+    """Record a closed candle: bar store in memory + append-only `logs/<symbol>_<tf>.log`. Returns its index."""
+    return append_bar(timeframe, data, symbol)
 
 def clear_log(symbol=None, timeframe=None, terminal_log=None):
     filepath = None
@@ -47,13 +46,13 @@ def empty_log(filename):
     print_log(f"[CLEARED]'{filename}.log' has been emptied.")
 
 def clear_symbol_log(symbol, timeframe):
-    filepath = LOGS_DIR / f"{symbol}_{timeframe}.log"
-    if filepath.exists():
-        filepath.unlink()
+    reset_bar_store(timeframe, symbol)  # drops the session bars and deletes the log file
 
 def clear_terminal_log():
-    if TERMINAL_LOG.exists():
-        TERMINAL_LOG.unlink()
+    flush_logs()  # pending lines would otherwise recreate the file right after
+    for path in (TERMINAL_LOG, TERMINAL_LOG.with_suffix(".jsonl")):
+        if path.exists():
+            path.unlink()
 
 def clear_temp_logs_and_order_files():
     # Only keep the main order archive
@@ -90,6 +89,11 @@ def clear_temp_logs_and_order_files():
     clear_terminal_log()
 
 def read_last_n_lines(file_path, n):
+    # Candle logs are mirrors of the bar store, serve those from memory
+    store = store_for_path(file_path)
+    if store is not None:
+        return store.last(n)
+
     # Ensure the logs directory exists
     if not os.path.exists(LOGS_DIR):
         os.makedirs(LOGS_DIR)
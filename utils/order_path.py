@@ -0,0 +1,143 @@
+# utils/order_path.py, in-memory price path of the order we are managing
+from __future__ import annotations
+import math
+import os
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+import pandas as pd
+import pytz
+import paths
+
+"""
+`manage_active_order()` used to append every polled bid to
+`order_log(<symbol>_<type>_<strike>_<timestamp>).txt` (open/append/close with
+retries), re-read that file at exit to find the lowest/highest bid, attach it
+to the Discord message and delete it.
+
+Now each tick goes into typed arrays (8 bytes per value):
+
+    ts (epoch s) | bid | ask | underlying | sold (contracts sold at that tick)
+
+Missing ask/underlying are NaN. Lowest/highest bid, max drawdown/gain and the
+time it took to first reach each sell target are updated on every tick, so
+closing an order does no scanning. `flush()` writes the path to
+`storage/orders/<day>/<order_id>.parquet` next to the day's `trades.parquet`.
+"""
+
+PATH_COLUMNS = ["ts", "bid", "ask", "underlying", "sold"]
+NY = pytz.timezone("America/New_York")
+
+def _num(value) -> float:
+    return math.nan if value is None else float(value)
+
+class OrderPath:
+    def __init__(self, order_id: str, entry_price: float, targets: Iterable[float] = (), started: Optional[float] = None):
+        self.order_id = order_id
+        self.entry_price = float(entry_price)
+        self.started = time.time() if started is None else started
+        self.ts = array("d")
+        self.bid = array("d")
+        self.ask = array("d")
+        self.underlying = array("d")
+        self.sold = array("l")
+
+        self.lowest_bid: Optional[float] = None
+        self.highest_bid: Optional[float] = None
+        self.targets = sorted(float(t) for t in targets)
+        self.target_times: Dict[float, float] = {}  # target price -> seconds after `started` it was first reached
+        self._next_target = 0
+
+    def __len__(self) -> int:
+        return len(self.bid)
+
+    # ───🔹 TICKS ─────────────────────────────
+
+    def record(self, bid: float, ask=None, underlying=None, ts: Optional[float] = None):
+        """Append one tick and update the running stats."""
+        ts = time.time() if ts is None else ts
+        bid = float(bid)
+        self.ts.append(ts)
+        self.bid.append(bid)
+        self.ask.append(_num(ask))
+        self.underlying.append(_num(underlying))
+        self.sold.append(0)
+
+        if self.lowest_bid is None or bid < self.lowest_bid:
+            self.lowest_bid = bid
+        if self.highest_bid is None or bid > self.highest_bid:
+            self.highest_bid = bid
+        # targets are ascending, so only the next unreached one needs checking
+        while self._next_target < len(self.targets) and bid >= self.targets[self._next_target]:
+            self.target_times[self.targets[self._next_target]] = ts - self.started
+            self._next_target += 1
+
+    def record_sale(self, quantity: int):
+        """Mark `quantity` contracts sold at the latest tick."""
+        if self.sold:
+            self.sold[-1] += int(quantity)
+
+    @property
+    def last_bid(self) -> Optional[float]:
+        return self.bid[-1] if self.bid else None
+
+    # ───🔹 STATS ─────────────────────────────
+
+    @property
+    def max_drawdown(self) -> float:
+        """% from entry down to the lowest bid (positive = it went against us)."""
+        low = self.entry_price if self.lowest_bid is None else self.lowest_bid
+        return (self.entry_price - low) / self.entry_price * 100
+
+    @property
+    def max_gain(self) -> float:
+        high = self.entry_price if self.highest_bid is None else self.highest_bid
+        return (high - self.entry_price) / self.entry_price * 100
+
+    def time_to_target(self, target: Optional[float] = None) -> Optional[float]:
+        """Seconds from entry until `target` (default: the first target) was reached, None if never."""
+        if target is None:
+            if not self.targets:
+                return None
+            target = self.targets[0]
+        return self.target_times.get(float(target))
+
+    def summary(self) -> dict:
+        """Fields for the order journal (`update_order_details()`)."""
+        return {
+            "lowest_bid": self.lowest_bid if self.lowest_bid is not None else self.entry_price,
+            "max_drawdown": self.max_drawdown,
+            "highest_bid": self.highest_bid if self.highest_bid is not None else self.entry_price,
+            "max_gain": self.max_gain,
+            "time_to_first_target": self.time_to_target(),
+            "num_ticks": len(self),
+        }
+
+    # ───🔹 STORAGE ─────────────────────────────
+
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame({
+            "ts": pd.to_datetime(pd.Series(self.ts, dtype="float64"), unit="s"),
+            "bid": pd.Series(self.bid, dtype="float64"),
+            "ask": pd.Series(self.ask, dtype="float64"),
+            "underlying": pd.Series(self.underlying, dtype="float64"),
+            "sold": pd.Series(self.sold, dtype="int64"),
+        })
+        return df[PATH_COLUMNS]
+
+    def flush(self, day: Optional[str] = None):
+        """
+        Write the path to `storage/orders/<day>/<order_id>.parquet` (atomic) and
+        return that path. `day` defaults to the (New York) day the order was entered.
+        """
+        day = day or datetime.fromtimestamp(self.started, NY).strftime("%Y-%m-%d")
+        out = paths.get_order_ticks_path(day, self.order_id)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(out.name + ".tmp")
+        self.to_frame().to_parquet(tmp, index=False)
+        os.replace(tmp, out)
+        return out
+
+def read_order_path(day: str, order_id: str) -> pd.DataFrame:
+    return pd.read_parquet(paths.get_order_ticks_path(day, order_id))
@@ -2,10 +2,12 @@
 from utils.json_utils import read_config
 from datetime import datetime, timedelta
 from shared_state import indent, print_log
-import csv
+import json
 import os
+from pathlib import Path
+import duckdb
 import pandas as pd
-from paths import ORDER_LOG_PATH
+import paths
 
 def build_active_order(order_id, retrieval_id, entry_price, quantity, TP_value=None, order_adjustments=None):
     return {
@@ -181,50 +183,231 @@ def to_float(value):
     else:
         raise ValueError("Value must be a string or a number")
 
-def initialize_csv_order_log():
-    if not os.path.exists(ORDER_LOG_PATH):
-        with open(ORDER_LOG_PATH, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['what_type_of_candle', 'time_entered', 'line_degree_angle', 'ticker_symbol', 'strike_price', 'option_type', 'order_quantity', 'order_bid_price', 'total_investment', 'time_exited', 'lowest_bid', 'max_drawdown', 'highest_bid', 'max_gain', 'avg_sold_bid', 'total_profit', 'total_percentage'])
-
-def log_order_details(what_type_of_candle, time_entered, ema_distance, num_of_matches, line_degree_angle,
-                      ticker_symbol, strike_price, option_type, order_quantity, order_bid_price, total_investment):
-    with open(ORDER_LOG_PATH, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([what_type_of_candle, time_entered, ema_distance, num_of_matches, line_degree_angle,
-                         ticker_symbol, strike_price, option_type, order_quantity, order_bid_price, total_investment])
+def get_entry_action(close, ema_200, completed_flags=None):
+    """
+    The FLAG/ZONE direction rule (`rule_manager.handle_rules_and_order()`, the backtester):
+    above the 200 EMA calls, below puts, unless only opposite-direction flags completed.
+    Returns (action, None) or (None, reason it was blocked).
+    """
+    action = "call" if close > ema_200 else "put"
+    if completed_flags:
+        bull_flags = [f for f in completed_flags if "_flag_bull_" in f.lower()]
+        bear_flags = [f for f in completed_flags if "_flag_bear_" in f.lower()]
+        if action == "call" and bear_flags and not bull_flags:
+            return None, "Bear flags completed → Blocking CALL signal."
+        if action == "put" and bull_flags and not bear_flags:
+            return None, "Bull flags completed → Blocking PUT signal."
+    return action, None
+
+def calculate_sell_points(buy_entry_price, percentages):
+    return [buy_entry_price * (1 + p / 100) for p in percentages]
+
+def distribute_remaining_contracts(remaining, n_targets):
+    proportions = {
+        1: [1.0],  # If only 1 target, put everything on it
+        2: [0.7, 0.3],  # 70% on the first target, 30% on the second
+        3: [0.6, 0.3, 0.1],  # Distribution across three targets
+        4: [0.5, 0.25, 0.15, 0.1]  # Distribution across four targets
+    }
+    if n_targets > len(proportions):
+        n_targets = len(proportions) # Limit num of proportions
+
+    distribution = []
+    allocated = 0
+
+    for proportion in proportions.get(n_targets, []):
+        contracts_for_target = int(remaining * proportion + 0.5)  # Round up if .5 or more
+        allocated += contracts_for_target
+        distribution.append(contracts_for_target)
+
+    # Handle any discrepancies due to rounding
+    while allocated < remaining:
+        for i in range(len(distribution)):
+            distribution[i] += 1
+            allocated += 1
+            if allocated == remaining:
+                break
+
+    while allocated > remaining:  # In case of over-allocation
+        for i in range(len(distribution)):
+            if distribution[i] > 0:
+                distribution[i] -= 1
+                allocated -= 1
+                if allocated == remaining:
+                    break
+
+    return distribution
+
+def generate_sell_info(order_quantity, buy_entry_price, total_cost):
+    sell_targets = {}
+    sell_quantities = {}
+
+    # Helper function to calculate the total cost at a given profit target for a specific number of contracts
+    def calculate_cost_at_target(n_contracts, target_percentage):
+        profit_per_contract = buy_entry_price * (1 + target_percentage / 100)
+        return n_contracts * profit_per_contract * 100
+
+    for i in range(1, order_quantity + 1):
+        cost_at_first_target = calculate_cost_at_target(i, read_config('TAKE_PROFIT_PERCENTAGES')[0])
+        if cost_at_first_target >= total_cost:
+            sell_targets[order_quantity] = [read_config('TAKE_PROFIT_PERCENTAGES')[0]]
+            sell_quantities[order_quantity] = [i]
+
+            #calculate remaining contracts
+            remaining_contracts = order_quantity - i
+            if remaining_contracts >= 1:
+                distribution = distribute_remaining_contracts(remaining_contracts, len(read_config('TAKE_PROFIT_PERCENTAGES')) - 1)
+                sell_targets[order_quantity] = read_config('TAKE_PROFIT_PERCENTAGES')[:1 + len(distribution)]
+                sell_quantities[order_quantity] = [i] + distribution
+            
+            # Cleanup zeros from sell_quantities and adjust sell_targets accordingly
+            # For example: converting this {6: [5, 1, 0, 0]} to this {6: [5, 1]}
+            for qty, quantities in sell_quantities.items():
+                valid_indexes = [i for i, q in enumerate(quantities) if q > 0]
+                sell_quantities[qty] = [quantities[i] for i in valid_indexes]
+                sell_targets[qty] = [read_config('TAKE_PROFIT_PERCENTAGES')[i] for i in valid_indexes]
+
+            return sell_targets, sell_quantities
+
+# ───🔹 ORDER JOURNAL ─────────────────────────────
+# One row per order, keyed by `unique_order_id` (f"{symbol}-{cp}-{strike}-{expiration}-{timestamp}").
+# Every open/update is appended to `storage/orders/journal.jsonl` and applied to an in-memory
+# index, so an update is one dict update + one line (no CSV read/scan/rewrite). The journal is
+# replayed after a restart, and compacted into `storage/orders/<day>/trades.parquet` at EOD:
+#
+#   query_trades("SELECT option_type, sum(total_profit) FROM trades GROUP BY 1")
+
+TRADE_COLUMNS = [
+    'order_id', 'what_type_of_candle', 'time_entered', 'ema_distance', 'num_of_matches', 'line_degree_angle',
+    'ticker_symbol', 'strike_price', 'option_type', 'expiration_date', 'order_quantity', 'order_bid_price',
+    'total_investment', 'time_exited', 'lowest_bid', 'max_drawdown', 'highest_bid', 'max_gain',
+    'avg_sold_bid', 'total_profit', 'total_percentage'
+]
+
+class OrderJournal:
+    def __init__(self, path=None):
+        self.path = path  # None -> paths.ORDER_JOURNAL_PATH at use time (tests monkeypatch it)
+        self.index = {}
+        self._loaded = False
+
+    def _path(self):
+        return Path(self.path if self.path is not None else paths.ORDER_JOURNAL_PATH)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self._path(), 'r') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line after a crash
+                    event.pop('event', None)
+                    self._apply(event.pop('order_id'), event)
+        except FileNotFoundError:
+            pass
+
+    def _apply(self, order_id, fields):
+        fields.pop('ts', None)
+        row = self.index.get(order_id)
+        if row is None:
+            row = self.index[order_id] = dict.fromkeys(TRADE_COLUMNS)
+            row['order_id'] = order_id
+        row.update(fields)
+        return row
+
+    def _append(self, event):
+        path = self._path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(json.dumps(event, default=str) + "\n")
+
+    def open(self, order_id, **fields):
+        self._ensure_loaded()
+        self._apply(order_id, dict(fields))
+        self._append({'ts': datetime.now().isoformat(), 'event': 'open', 'order_id': order_id, **fields})
+
+    def update(self, order_id, **fields) -> bool:
+        self._ensure_loaded()
+        found = order_id in self.index
+        self._apply(order_id, dict(fields))
+        self._append({'ts': datetime.now().isoformat(), 'event': 'update', 'order_id': order_id, **fields})
+        return found
+
+    def get(self, order_id):
+        self._ensure_loaded()
+        row = self.index.get(order_id)
+        return dict(row) if row else None
+
+    def rows(self):
+        self._ensure_loaded()
+        return [dict(r) for r in self.index.values()]
+
+    def compact(self, day):
+        """Merge this session's rows into `storage/orders/<day>/trades.parquet`, then start a fresh journal."""
+        rows = self.rows()
+        if not rows:
+            return None
+        extra = sorted({k for r in rows for k in r} - set(TRADE_COLUMNS))
+        df = pd.DataFrame(rows, columns=TRADE_COLUMNS + extra)
+        for col in ('time_entered', 'time_exited'):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+
+        out = paths.get_trades_path(day)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if out.exists():  # a second compaction the same day (restart): new values win, earlier ones fill the gaps
+            old = pd.read_parquet(out)
+            cols = list(dict.fromkeys(list(df.columns) + list(old.columns)))
+            df = df.set_index('order_id').combine_first(old.set_index('order_id')).reset_index()[cols]
+        tmp = out.with_suffix('.parquet.tmp')
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, out)
+
+        self._path().unlink(missing_ok=True)
+        self.index.clear()
+        return out
+
+_JOURNAL = None
+
+def get_order_journal():
+    global _JOURNAL
+    if _JOURNAL is None:
+        _JOURNAL = OrderJournal()
+    return _JOURNAL
+
+def initialize_order_journal():
+    """Load the session journal (replays orders recorded before a restart)."""
+    journal = get_order_journal()
+    open_orders = [r['order_id'] for r in journal.rows() if r.get('time_exited') is None]
+    if open_orders:
+        print_log(f"[ORDERS] Journal recovered {len(journal.index)} order(s), still open: {open_orders}")
+
+def log_order_details(unique_order_id, **fields):
+    """Record a new order (entry facts: strike, quantity, price, candle type, ...)."""
+    get_order_journal().open(unique_order_id, **fields)
 
 def update_order_details(unique_order_id, **kwargs):
     # UOD means Update Order Details
-    df = pd.read_csv(ORDER_LOG_PATH)
-    
-    # `unique_order_id` is f"{ticker_symbol}-{cp}-{strike}-{expiration_date}-{order_timestamp}"
-    order_id_parts = unique_order_id.split('-')
-    symbol, option_type, strike_price, expiration_date, timestamp = order_id_parts[:5]
-
-    # Convert the timestamp to datetime object
-    dt = datetime.strptime(timestamp[:12], "%Y%m%d%H%M")  # Only use up to minutes
-
-    # Format the datetime object to the desired string format (ignore seconds)
-    formatted_timestamp = dt.strftime("%m/%d/%Y-%I:%M %p")
-    
-    row_found = False
-    for index, row in df.iterrows():
-        # Normalize the row's timestamp for comparison, ensuring AM/PM is preserved
-        row_time_formatted = row['time_entered']
-        #print_log(f"{indent(indent_lvl+1)}[UOD 1] Checking row at index {index}: {row_time_formatted}")
-        
-        if (row['ticker_symbol'] == symbol and 
-            row['strike_price'] == float(strike_price) and 
-            row['option_type'] == option_type and 
-            row_time_formatted == formatted_timestamp):  # Compare normalized timestamps
-            row_found = True
-            for key, value in kwargs.items():
-                df.at[index, key] = value
-            break  # If the correct row is found, no need to continue looping
-    
-    if not row_found:
-        print_log(f"    [UOD] ERROR: No matching row found for timestamp: {formatted_timestamp}")
-
-    df.to_csv(ORDER_LOG_PATH, index=False)
-
+    if not get_order_journal().update(unique_order_id, **kwargs):
+        print_log(f"    [UOD] ERROR: No order `{unique_order_id}` in the journal, recorded the update anyway.")
+
+def compact_order_journal(day):
+    out = get_order_journal().compact(day)
+    if out is not None:
+        print_log(f"[ORDERS] Trades saved to `{paths.pretty_path(out)}`")
+    return out
+
+def query_trades(sql="SELECT * FROM trades ORDER BY time_entered"):
+    """Run `sql` against every day's trade table, exposed as the view `trades`."""
+    files = sorted(str(p) for p in Path(paths.ORDERS_DIR).glob("*/trades.parquet"))
+    if not files:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+    con = duckdb.connect(":memory:")
+    try:
+        file_list = ", ".join("'" + f.replace("'", "''") + "'" for f in files)  # views can't take bound parameters
+        con.execute(f"CREATE VIEW trades AS SELECT * FROM read_parquet([{file_list}], union_by_name=1)")
+        return con.execute(sql).df()
+    finally:
+        con.close()
@@ -0,0 +1,223 @@
+# utils/position_manager.py, every open option position, driven by one scheduler task
+from __future__ import annotations
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import shared_state
+from shared_state import print_log
+from utils.event_bus import BarClosed, subscribe
+from utils.json_utils import read_config
+from utils.order_path import OrderPath
+from utils.quote_book import MAX_QUOTE_AGE, QUOTES, QuoteBook, occ_symbol
+
+"""
+`order_handler.py` used to track a single position through module globals
+(`unique_order_id`, `current_order_active`, `buy_entry_price`, ...) with one
+polling loop per order, and `buy_option_cp()` refused entries while it was set.
+
+Now each position is a `Position` object (entry, trim targets, sales, tick
+path) held by `POSITIONS`. One scheduler task (`PositionManager.run()`) serves
+all of them:
+
+  1. contracts without a fresh streamed quote are fetched in ONE batched
+     `markets/quotes` call
+  2. every position gets its tick recorded and its exit logic (`step`) run
+     as its own task, so a slow sell on one never stalls the others; a
+     position whose previous step is still running is skipped this tick
+  3. sleep until a quote for any held contract arrives, a new position is
+     added, or `TICK_INTERVAL` passes
+
+Entry limits (read from config on every check, defaults when unset):
+    MAX_OPEN_POSITIONS       how many positions may be open at once
+    MAX_EXPOSURE_PERCENTAGE  share of START_OF_DAY_BALANCE all open positions
+                             (remaining contracts at entry price) may cost
+"""
+
+TICK_INTERVAL = .5  # seconds; the loop never waits longer than this for a quote
+DEFAULT_MAX_OPEN_POSITIONS = 1
+
+# step(position, bid, bar_closed) -> True when the position is fully closed
+Step = Callable[["Position", float, bool], Awaitable[bool]]
+FetchQuotes = Callable[[List[str]], Awaitable[None]]
+
+# ───🔹 POSITION ─────────────────────────────
+
+class Position:
+    def __init__(self, order_id: str, entry_price: float, quantity: int, sell_points: Iterable[float] = (),
+                 sell_quantities: Iterable[int] = (), tp_value=None, retrieval_id=None, adjustments=None):
+        # order_id: f"{ticker_symbol}-{cp}-{strike}-{expiration_date}-{order_timestamp}"
+        symbol, option_type, strike, expiration_date = order_id.split('-')[:4]
+        self.order_id = order_id
+        self.retrieval_id = retrieval_id
+        self.symbol = symbol
+        self.option_type = option_type
+        self.strike = strike
+        self.expiration_date = expiration_date  # YYYYMMDD
+        self.contract = occ_symbol(symbol, expiration_date, option_type, strike)
+
+        self.entry_price = float(entry_price)
+        self.quantity = int(quantity)
+        self.tp_value = tp_value
+        self.sell_points = list(sell_points)
+        self.sell_quantities = list(sell_quantities)
+        self.adjustments: List[dict] = list(adjustments or [])
+        self.path = OrderPath(order_id, self.entry_price, self.sell_points)
+        self.check_emas = True  # EMA exits run once at entry, then once per closed bar
+        self.exiting = False    # a full exit (sell of the rest) is in flight
+        self.closed = False
+
+    @classmethod
+    def from_active_order(cls, active_order: dict, sell_points=(), sell_quantities=()) -> "Position":
+        """From the dict built by `utils.order_utils.build_active_order()`."""
+        return cls(active_order["order_id"], active_order["entry_price"], active_order["quantity"],
+                   sell_points, sell_quantities, tp_value=active_order.get("TP_value"),
+                   retrieval_id=active_order.get("order_retrieval"), adjustments=active_order.get("order_adjustments"))
+
+    @property
+    def sold_quantity(self) -> int:
+        return sum(sale["quantity"] for sale in self.adjustments)
+
+    @property
+    def remaining(self) -> int:
+        return self.quantity - self.sold_quantity
+
+    @property
+    def cost(self) -> float:
+        return self.entry_price * 100 * self.quantity
+
+    @property
+    def exposure(self) -> float:
+        """Entry cost of the contracts still held."""
+        return self.entry_price * 100 * self.remaining
+
+    def add_sale(self, sale_info: dict):
+        """Record a (partial) exit, `sale_info` like `{"target", "sold_price", "quantity", "timestamp"}`."""
+        self.adjustments.append(sale_info)
+        self.path.record_sale(sale_info["quantity"])
+
+    def __repr__(self):
+        return f"Position({self.order_id}, {self.remaining}/{self.quantity} @ {self.entry_price})"
+
+# ───🔹 MANAGER ─────────────────────────────
+
+class PositionManager:
+    def __init__(self, book: QuoteBook = QUOTES):
+        self.book = book
+        self.positions: Dict[str, Position] = {}
+        self._steps: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __iter__(self):
+        return iter(list(self.positions.values()))
+
+    def get(self, order_id: str) -> Optional[Position]:
+        return self.positions.get(order_id)
+
+    def contracts(self) -> List[str]:
+        return sorted({p.contract for p in self.positions.values()})
+
+    def exposure(self) -> float:
+        return sum(p.exposure for p in self.positions.values())
+
+    # ───🔹 LIMITS ─────────────────────────────
+
+    def can_open(self, cost: float = 0.0) -> Tuple[bool, Optional[str]]:
+        """(True, None) if one more position costing `cost` fits the limits, else (False, reason)."""
+        max_positions = read_config('MAX_OPEN_POSITIONS') or DEFAULT_MAX_OPEN_POSITIONS
+        if len(self.positions) >= max_positions:
+            return False, f"Max Open Positions Reached ({len(self.positions)}/{max_positions})."
+        max_exposure_pct = read_config('MAX_EXPOSURE_PERCENTAGE')
+        if max_exposure_pct is not None and cost:
+            limit = read_config('START_OF_DAY_BALANCE') * max_exposure_pct
+            if self.exposure() + cost > limit:
+                return False, f"Exposure Limit Reached (${self.exposure() + cost:,.2f} > ${limit:,.2f})."
+        return True, None
+
+    # ───🔹 OPEN / CLOSE ─────────────────────────────
+
+    def add(self, position: Position) -> Position:
+        self.positions[position.order_id] = position
+        self._wake()
+        return position
+
+    def remove(self, order_id: str) -> Optional[Position]:
+        position = self.positions.pop(order_id, None)
+        if position is not None:
+            position.closed = True
+        return position
+
+    def clear(self):
+        self.stop()
+        self.positions.clear()
+
+    # ───🔹 SCHEDULER ─────────────────────────────
+
+    def stop(self):
+        """Cancel step tasks still in flight (the scheduler itself belongs to whoever awaits `run()`)."""
+        for task in self._steps.values():
+            task.cancel()
+        self._steps.clear()
+
+    async def run(self, step: Step, fetch_quotes: FetchQuotes, interval: float = TICK_INTERVAL):
+        """The scheduler loop; returns once no positions (and no step in flight) are left."""
+        closed_bars = subscribe(BarClosed, name="position manager", timeframe=read_config('TIMEFRAMES')[0], maxsize=8)
+        with closed_bars:
+            while self.positions or self._steps:
+                bar_closed = closed_bars.drain() is not None
+                await self.tick(step, fetch_quotes, bar_closed)
+                await self._wait(interval)
+
+    async def tick(self, step: Step, fetch_quotes: FetchQuotes, bar_closed: bool = False):
+        """One pass: batched quote fetch for stale contracts, then a step task per idle position."""
+        stale = [c for c in self.contracts() if self.book.get(c, MAX_QUOTE_AGE) is None]
+        if stale:
+            try:
+                await fetch_quotes(stale)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print_log(f"    [POSITIONS] Quote fetch for {len(stale)} contract(s) failed: {e}")
+
+        for position in self:
+            if bar_closed:
+                position.check_emas = True
+            if position.order_id in self._steps:
+                continue  # still busy with the previous tick (e.g. selling)
+            quote = self.book.get(position.contract, max_age=None)
+            if quote is None or quote.bid is None:
+                continue
+            position.path.record(quote.bid, quote.ask, shared_state.latest_price)
+            emas_now, position.check_emas = position.check_emas, False
+            task = asyncio.create_task(step(position, quote.bid, emas_now), name=f"PositionStep-{position.order_id}")
+            self._steps[position.order_id] = task
+            task.add_done_callback(lambda t, p=position: self._step_done(p, t))
+
+    def _step_done(self, position: Position, task: asyncio.Task):
+        self._steps.pop(position.order_id, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            print_log(f"    [POSITIONS] Step for {position.order_id} failed: {task.exception()}")
+        elif task.result():
+            self.remove(position.order_id)
+        self._wake()
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _wait(self, interval: float):
+        """Sleep until a held contract gets a quote, the set of positions changes, or `interval`."""
+        self._wakeup = asyncio.Event()
+        waiters = [asyncio.ensure_future(self._wakeup.wait())]
+        waiters += [asyncio.ensure_future(self.book.wait_for_update(c)) for c in self.contracts()]
+        try:
+            await asyncio.wait(waiters, timeout=interval, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waiters:
+                w.cancel()
+            self._wakeup = None
+
+POSITIONS = PositionManager()
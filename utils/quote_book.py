@@ -0,0 +1,95 @@
+# utils/quote_book.py, local top-of-book cache for the option contracts we hold
+from __future__ import annotations
+import asyncio
+import time
+from typing import Dict, NamedTuple, Optional
+
+"""
+Filled by the Tradier quote stream (`data_acquisition.OptionQuoteStream`) and,
+when the stream is quiet or down, by one batched `markets/quotes` call for the
+held contracts.
+The position manager (`utils/position_manager.py`) reads the bids from here
+instead of downloading the whole expiration chain every 0.5s, and wakes up on
+each quote tick via `wait_for_update()`.
+
+Keys are OCC symbols, e.g. SPY 590 call expiring 2025-01-02 → `SPY250102C00590000`.
+"""
+
+MAX_QUOTE_AGE = 2.0  # seconds; older quotes are refreshed over REST
+
+def occ_symbol(symbol: str, expiration_date: str, option_type: str, strike) -> str:
+    """OCC option symbol. `expiration_date` as `YYYYMMDD`, `YYYY-MM-DD` or `YYMMDD`."""
+    digits = expiration_date.replace("-", "")
+    yymmdd = digits[2:] if len(digits) == 8 else digits
+    return f"{symbol.upper()}{yymmdd}{option_type[0].upper()}{round(float(strike) * 1000):08d}"
+
+class Quote(NamedTuple):
+    bid: Optional[float]
+    ask: Optional[float]
+    bid_size: int
+    ask_size: int
+    received: float  # time.monotonic() when we got it
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.monotonic() if now is None else now) - self.received
+
+class QuoteBook:
+    def __init__(self):
+        self.quotes: Dict[str, Quote] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+
+    def update(self, symbol: str, bid=None, ask=None, bid_size=0, ask_size=0, received: Optional[float] = None) -> Quote:
+        prev = self.quotes.get(symbol)
+        quote = Quote(
+            float(bid) if bid is not None else (prev.bid if prev else None),
+            float(ask) if ask is not None else (prev.ask if prev else None),
+            int(bid_size or 0), int(ask_size or 0),
+            time.monotonic() if received is None else received,
+        )
+        self.quotes[symbol] = quote
+        event = self._events.pop(symbol, None)
+        if event is not None:
+            event.set()
+        return quote
+
+    def apply(self, message: dict) -> bool:
+        """
+        Take a Tradier streaming `{"type": "quote", ...}` message or one entry of a
+        `markets/quotes` response (`"type": "option"`). Messages without a bid/ask
+        (trade, summary, timesale) are ignored. Returns True if applied.
+        """
+        symbol = message.get("symbol")
+        if not symbol or ("bid" not in message and "ask" not in message):
+            return False
+        self.update(symbol, message.get("bid"), message.get("ask"),
+                    message.get("bidsz") or message.get("bidsize"),
+                    message.get("asksz") or message.get("asksize"))
+        return True
+
+    def get(self, symbol: str, max_age: Optional[float] = MAX_QUOTE_AGE) -> Optional[Quote]:
+        """Cached quote, or None if missing / older than `max_age` seconds (None = any age)."""
+        quote = self.quotes.get(symbol)
+        if quote is None or (max_age is not None and quote.age() > max_age):
+            return None
+        return quote
+
+    def bid(self, symbol: str, max_age: Optional[float] = MAX_QUOTE_AGE) -> Optional[float]:
+        quote = self.get(symbol, max_age)
+        return quote.bid if quote else None
+
+    async def wait_for_update(self, symbol: str, timeout: Optional[float] = None) -> bool:
+        """Sleep until the next quote for `symbol` (True) or `timeout` (False)."""
+        event = self._events.get(symbol)
+        if event is None:
+            event = self._events[symbol] = asyncio.Event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def discard(self, symbol: str):
+        self.quotes.pop(symbol, None)
+        self._events.pop(symbol, None)
+
+QUOTES = QuoteBook()
@@ -0,0 +1,75 @@
+// web_dash/assets/live_bars.js
+// A closed bar from the websocket (`{"kind": "bar"}`, see web_dash/ws_hub.py) is appended to its
+// live tab right here in the browser, no round-trip to the Dash server. The tab's store (`held`)
+// says what the figure shows; the server uses it to send only missing bars later (figure_cache.py).
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    charts: {
+        appendBar: function (msg, figures, ids, held) {
+            const noUpdate = window.dash_clientside.no_update;
+            const none = [ids.map(() => noUpdate), ids.map(() => noUpdate)];
+            let event;
+            try {
+                event = JSON.parse(msg && msg.data);
+            } catch (e) {
+                return none;
+            }
+            if (!event || event.kind !== "bar" || !event.bar) {
+                return none;
+            }
+
+            const figOut = [], heldOut = [];
+            ids.forEach((id, i) => {
+                const h = held[i], fig = figures[i];
+                const candles = fig && fig.data && fig.data[0];
+                // only tabs that already show this chart, and only bars newer than their last one
+                if (id.tf !== event.topic || !h || !h.last_x || !h.tf_minutes || !candles || !candles.x
+                        || event.bar.x <= h.last_x) {
+                    figOut.push(noUpdate);
+                    heldOut.push(noUpdate);
+                    return;
+                }
+                const next = appendToFigure(fig, event.bar, h);
+                figOut.push(next.figure);
+                heldOut.push(next.held);
+            });
+            return [figOut, heldOut];
+        }
+    }
+});
+
+const CANDLE_FIELDS = ["x", "open", "high", "low", "close"];
+
+function appendToFigure(fig, bar, held) {
+    const candles = Object.assign({}, fig.data[0]);
+    const n = held.n + 1;
+    const drop = held.max_bars ? Math.max(n - held.max_bars, 0) : 0;
+    CANDLE_FIELDS.forEach((f) => {
+        candles[f] = Array.from(candles[f]).concat([bar[f]]).slice(drop);
+    });
+
+    // same rules as figure_cache.price_range() and draw_objects(variant="live")
+    const lo = Math.min(...candles.low), hi = Math.max(...candles.high);
+    const pad = Math.max((hi - lo) * 0.05, 0.05);
+    const x0 = candles.x[0], x1 = addMinutes(bar.x, held.tf_minutes);
+
+    const data = fig.data.slice();
+    data[0] = candles;
+    (held.marker_traces || []).forEach((i) => {
+        data[i] = Object.assign({}, data[i], {x: [x0]});
+    });
+    const layout = Object.assign({}, fig.layout);
+    layout.yaxis = Object.assign({}, layout.yaxis, {range: [lo - pad, hi + pad]});
+    layout.shapes = (layout.shapes || []).map((s) => Object.assign({}, s, {x0: x0, x1: x1}));
+
+    return {
+        figure: Object.assign({}, fig, {data: data, layout: layout}),
+        held: Object.assign({}, held, {last_x: bar.x, n: n - drop}),
+    };
+}
+
+function addMinutes(isoNaive, minutes) {
+    // naive ET wall-clock in, naive wall-clock out (no timezone math)
+    const d = new Date(isoNaive.slice(0, 19) + "Z");
+    d.setUTCMinutes(d.getUTCMinutes() + minutes);
+    return d.toISOString().slice(0, 19);
+}
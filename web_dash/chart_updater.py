@@ -11,10 +11,15 @@ def _as_figure(component_or_figure):
     fig_like = getattr(component_or_figure, "figure", component_or_figure)
     return go.Figure(fig_like)
 
+def warm_up():
+    """Start Kaleido (Chromium) now, so the first real export doesn't pay for it (`web_dash/render_service.py`)."""
+    pio.to_image(go.Figure(), format="png", width=10, height=10, engine="kaleido")
+
 def update_chart(timeframe="2M", chart_type="live", notify=False):
     """
-    Saves a snapshot of a chart based on timeframe and chart type.
+    Saves a snapshot of a chart based on timeframe and chart type and returns its path.
     chart_type: "live" (2M/5M/15M) or "zones".
+    Runs inside the render workers (`web_dash/render_service.py`), call `RENDERS.render()` instead.
     """
     # Build a clean figure for static export
     if chart_type == "zones":
@@ -49,3 +54,4 @@ def update_chart(timeframe="2M", chart_type="live", notify=False):
             httpx.post("http://127.0.0.1:8000/trigger-chart-update", json={"timeframes": tfs})
         except Exception as e:
             print(f"[update_chart] WS notify failed: {e}")
+    return out
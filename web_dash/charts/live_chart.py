@@ -10,6 +10,7 @@ from utils.json_utils import read_config
 from storage.viewport import load_viewport, get_timeframe_bounds
 from web_dash.charts.theme import apply_layout, GREEN, RED
 from web_dash.assets.object_styles import draw_objects
+from web_dash.figure_cache import Frame, candle_columns, price_range
 
 #from paths import get_ema_path
 #from utils.ema_utils import load_ema_json
@@ -34,6 +35,11 @@ def _pick_bars_limit(timeframe: str, default: int = 600) -> int:
     return _coerce_pos_int(v, default)
 
 def generate_live_chart(timeframe: str):
+    fig = build_live_figure(load_live_frame(timeframe))
+    return dcc.Graph(figure=fig, style={"height": "700px"})
+
+def load_live_frame(timeframe: str) -> Frame:
+    """The live window's candles (`Frame.candles`, None when empty) and objects, no figure yet."""
     tf = timeframe.lower()
     symbol = read_config("SYMBOL")
     bars_limit = _pick_bars_limit(tf, default=600)
@@ -78,12 +84,7 @@ def generate_live_chart(timeframe: str):
         )
 
     if df_candles.empty:
-        fig = go.Figure()
-        fig.update_layout(
-            title=f"Live {timeframe} Chart - No candle data",
-            xaxis_title="", yaxis_title="", height=700
-        )
-        return dcc.Graph(figure=fig, style={"height": "700px"})
+        return Frame(None, (timeframe, symbol, tf_min, df_candles, df_objects))
 
     # Normalize/clean + tail
     df_candles = df_candles.copy()
@@ -100,17 +101,29 @@ def generate_live_chart(timeframe: str):
         ts_local = ts.dt.tz_convert("America/Chicago")
     ts_et = ts_local.dt.tz_convert(TZ)
     df_candles["_ts_plot"] = ts_et.dt.tz_localize(None)
+    return Frame(candle_columns(df_candles), (timeframe, symbol, tf_min, df_candles, df_objects), tf_min, bars_limit)
+
+def build_live_figure(frame: Frame) -> go.Figure:
+    timeframe, symbol, tf_min, df_candles, df_objects = frame.data
+    if frame.candles is None:
+        fig = go.Figure()
+        fig.update_layout(
+            title=f"Live {timeframe} Chart - No candle data",
+            xaxis_title="", yaxis_title="", height=700
+        )
+        return fig
 
     # Debug
     #print(f"[live_chart] candles={len(df_candles)} objects={len(df_objects)}")
 
     # --- plot ---
     fig = go.Figure()
-    candlex = df_candles["_ts_plot"].to_numpy() #candlex = np.array(df_candles["_ts_plot"].dt.to_pydatetime(), dtype=object)
+    candles = frame.candles  # plain lists, so the figure cache can append to them in place
+    candlex = df_candles["_ts_plot"].to_numpy() # for the (commented out) EMA overlay below
     fig.add_trace(go.Candlestick(
-        x=candlex,
-        open=df_candles["open"], high=df_candles["high"],
-        low=df_candles["low"], close=df_candles["close"],
+        x=candles["x"],
+        open=candles["open"], high=candles["high"],
+        low=candles["low"], close=candles["close"],
         increasing_line_color=GREEN, decreasing_line_color=RED,
         increasing_fillcolor=GREEN, decreasing_fillcolor=RED,
         name="Price",
@@ -141,13 +154,8 @@ def generate_live_chart(timeframe: str):
     draw_objects(fig, df_objects, df_candles, tf_min, variant="live")
 
     # Layout: key on the right, focus y-range on candles only
-    visible_min = float(df_candles["low"].min())
-    visible_max = float(df_candles["high"].max())
-    span = max(visible_max - visible_min, 0.0)
-    pad = max(span * 0.05, 0.05)
-
     apply_layout(fig, title=f"{symbol} — Live ({timeframe.upper()})", uirevision=f"live-{timeframe}")
-    fig.update_yaxes(range=[visible_min - pad, visible_max + pad], autorange=False)
+    fig.update_yaxes(range=price_range(candles["low"], candles["high"]), autorange=False)
     fig.update_traces(cliponaxis=True, selector=dict(type="scatter"))
 
-    return dcc.Graph(figure=fig, style={"height": "700px"})
+    return fig
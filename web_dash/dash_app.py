@@ -4,14 +4,17 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+import json
 import dash
-from dash import dcc, html, callback, ctx
-from dash.dependencies import Input, Output, MATCH, State
+from dash import dcc, html, callback, clientside_callback, ctx, Patch
+from dash.dependencies import Input, Output, ALL, State, ClientsideFunction
 from dash_extensions import WebSocket
 import dash.exceptions
 
-from charts.live_chart import generate_live_chart
+from charts.live_chart import load_live_frame, build_live_figure
 from charts.zones_chart import generate_zones_chart
+from web_dash.figure_cache import FIGURES, Frame, apply_candle_patch
+from storage.viewport import data_version
 from utils.json_utils import read_config
 
 import logging
@@ -31,27 +34,29 @@ app = dash.Dash(__name__, title=f"{SYMBOL} Bot Multi-Timeframe Viewer")
 
 def tab_block(tf_label, tf_key):
     """
-    Builds a tab with its own WebSocket + Graph using pattern-matching IDs.
+    Builds a tab with its Graph using pattern-matching IDs.
     tf_key can be "2M", "5M", "15M", or "zones".
+    The graph starts empty, its figure comes from `FIGURES` when the tab is first opened.
     """
-    ws_id    = {"type": "ws",    "tf": tf_key}
     graph_id = {"type": "graph", "tf": tf_key}
-
-    # Initial figure (seed) — light & fast:
-    initial_fig = generate_zones_chart("15M").figure if tf_key == "zones" else generate_live_chart(tf_key).figure
+    held_id  = {"type": "held",  "tf": tf_key}  # what this browser's figure shows (`CacheEntry.held()`)
 
     return dcc.Tab(
         label=tf_label, value=tf_key,
         children=[
-            WebSocket(id=ws_id, url="ws://127.0.0.1:8000/ws/chart-updates"),
+            dcc.Store(id=held_id),
             dcc.Loading(children=[
-                dcc.Graph(id=graph_id, figure=initial_fig, style={"height": "700px"})
+                dcc.Graph(id=graph_id, figure={"data": [], "layout": {"height": 700}}, style={"height": "700px"})
             ], type="default")
         ]
     )
 
+# One socket for the whole page, subscribed to every chart topic (`web_dash/ws_hub.py`)
+WS_URL = f"ws://127.0.0.1:8000/ws/chart-updates?topics=zones,{','.join(TIMEFRAMES)}"
+
 app.layout = html.Div([
     html.H1(f"{SYMBOL} Bot: Multi-Timeframe View", style={"textAlign": "center"}),
+    WebSocket(id="ws", url=WS_URL),
     dcc.Tabs(
         id="mtf-tabs",
         value="zones",
@@ -63,31 +68,74 @@ app.layout = html.Div([
     ])
 ])
 
+def chart_entry(tf_key):
+    """The tab's `FigureCache` entry, rebuilt/extended only if its parquet data changed."""
+    if tf_key == "zones":
+        return FIGURES.refresh(
+            "zones", data_version("15m", include_days=True, include_parts=False),
+            load=lambda: Frame(None),
+            build=lambda _frame: generate_zones_chart("15m").figure.to_dict(),
+        )
+    return FIGURES.refresh(
+        tf_key, data_version(tf_key.lower(), include_days=False, include_parts=True),
+        load=lambda: load_live_frame(tf_key),
+        build=lambda frame: build_live_figure(frame).to_dict(),
+    )
+
+def _topic(msg):
+    try:
+        event = json.loads(msg.get("data") if isinstance(msg, dict) else msg)
+    except (TypeError, ValueError):
+        return None, None
+    return (event.get("topic"), event.get("kind")) if isinstance(event, dict) else (None, None)
+
 @callback(
-    Output({"type": "graph", "tf": MATCH}, "figure"),
-    Input({"type": "ws", "tf": MATCH}, "message"),
+    Output({"type": "graph", "tf": ALL}, "figure"),
+    Output({"type": "held", "tf": ALL}, "data"),
+    Input("ws", "message"),
     Input("mtf-tabs", "value"),                                     # <— also trigger on tab switch
-    State({"type": "graph", "tf": MATCH}, "id"),                     # <— know which TF this instance owns
+    State({"type": "graph", "tf": ALL}, "id"),
+    State({"type": "held", "tf": ALL}, "data"),
+)
+def refresh_any(msg, selected_tab, graph_ids, held):
+    # Only the open tab is drawn; hidden tabs catch up (from cache) when they are opened
+    if ctx.triggered_id != "mtf-tabs":
+        topic, kind = _topic(msg)
+        if topic != selected_tab or kind == "bar":  # bars are appended in the browser (assets/live_bars.js)
+            raise dash.exceptions.PreventUpdate
+
+    figures = [dash.no_update] * len(graph_ids)
+    stores = [dash.no_update] * len(graph_ids)
+    i = next(i for i, gid in enumerate(graph_ids) if gid["tf"] == selected_tab)
+    entry = chart_entry(selected_tab)
+    held_now = held[i] or {}
+    if held_now.get("token") == entry.token:
+        raise dash.exceptions.PreventUpdate  # the browser already shows this data
+
+    # The browser is only missing bars on the right: send just those
+    plan = entry.catch_up(held_now)
+    if plan is not None:
+        if not plan.append["x"] and not plan.drop:
+            stores[i] = entry.held()  # it already appended them from the websocket
+            return figures, stores
+        patch = Patch()
+        apply_candle_patch(patch, plan, entry.shape_count, list(entry.marker_traces))
+        figures[i] = patch
+    else:
+        figures[i] = entry.figure
+    stores[i] = entry.held()
+    return figures, stores
+
+clientside_callback(
+    ClientsideFunction(namespace="charts", function_name="appendBar"),
+    Output({"type": "graph", "tf": ALL}, "figure", allow_duplicate=True),
+    Output({"type": "held", "tf": ALL}, "data", allow_duplicate=True),
+    Input("ws", "message"),
+    State({"type": "graph", "tf": ALL}, "figure"),
+    State({"type": "graph", "tf": ALL}, "id"),
+    State({"type": "held", "tf": ALL}, "data"),
+    prevent_initial_call=True,
 )
-def refresh_any(msg, selected_tab, graph_id):
-    tf_key = graph_id["tf"]
-
-    # A) WS-driven refresh (payload must match this TF)
-    if msg:
-        payload = msg.get("data") if isinstance(msg, dict) else msg
-        if isinstance(payload, str) and payload == f"chart:{tf_key}":
-            return (generate_zones_chart("15m").figure
-                    if tf_key == "zones"
-                    else generate_live_chart(tf_key).figure)
-
-    # B) Tab-activation refresh (user clicked into this TF)
-    if selected_tab == tf_key:
-        return (generate_zones_chart("15m").figure
-                if tf_key == "zones"
-                else generate_live_chart(tf_key).figure)
-
-    # Otherwise, do nothing for this graph instance
-    raise dash.exceptions.PreventUpdate
 
 if __name__ == "__main__":
     app.run(debug=False, port=8050)
@@ -0,0 +1,224 @@
+# web_dash/figure_cache.py, built figures per chart, reused until the storage data changes
+from __future__ import annotations
+import copy
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+"""
+`refresh_any()` used to rebuild the whole figure (DuckDB read + go.Figure) on
+every websocket kick and every tab switch, and `tab_block()` built all four
+figures before the page could load.
+
+Now every chart has one cache entry:
+
+    key     = "zones" | "2M" | "5M" | "15M"
+    version = `storage.viewport.data_version()`, a stat of the candle files and
+              the objects snapshot (a new part file or a new objects snapshot
+              changes it, nothing else does)
+
+- same version → the cached figure, no read, no build (tab switches)
+- new version, same objects, and the new candles are the cached ones plus
+  bars appended on the right (and maybe some scrolled off the left) → the
+  cached figure is updated in place (`plan_candle_patch()`), no go.Figure
+  built
+- anything else → full rebuild
+
+The browser keeps `CacheEntry.held()` per tab (a `dcc.Store`: which objects,
+last bar and bar count it shows, updated by the browser itself when it
+appends a bar from the websocket). A browser that is only missing bars on the
+right gets a Dash `Patch()` with just those (`plan_catch_up()`), however far
+behind it is; anything else gets the full figure.
+
+Plain Python/pandas only, so it is unit-testable without Dash or Plotly.
+"""
+
+CANDLE_FIELDS = ("x", "open", "high", "low", "close")
+
+Candles = Dict[str, list]  # CANDLE_FIELDS -> list, x as naive ET ISO strings
+
+def candle_columns(df: pd.DataFrame) -> Candles:
+    """The candle trace's arrays from a frame with `_ts_plot` + OHLC, as plain (JSON/Patch-able) lists."""
+    out = {"x": [ts.isoformat() for ts in pd.to_datetime(df["_ts_plot"])]}
+    for col in CANDLE_FIELDS[1:]:
+        out[col] = df[col].astype(float).tolist()
+    return out
+
+def price_range(lows, highs) -> List[float]:
+    """Y-axis range focused on the candles: low..high plus 5% (min 0.05) padding."""
+    lo, hi = float(min(lows)), float(max(highs))
+    pad = max((hi - lo) * 0.05, 0.05)
+    return [lo - pad, hi + pad]
+
+def version_token(version) -> str:
+    """A version as a short string the browser can keep in a `dcc.Store`."""
+    return repr(version)
+
+# ───🔹 APPEND PATCHES ─────────────────────────────
+
+class CandlePatch(NamedTuple):
+    drop: int             # bars that scrolled off the left
+    append: Candles       # bars added on the right
+    y_range: List[float]
+    x0: str               # live object span: first bar ...
+    x1: str               # ... to the end of the last bar
+
+def plan_catch_up(new: Optional[Candles], last_x: Optional[str], held_n: int, tf_minutes: int) -> Optional[CandlePatch]:
+    """
+    Turn a figure that shows `held_n` bars ending at `last_x` into `new`:
+    append what comes after `last_x`, drop from the left so the bar count
+    matches. None when `last_x` isn't in `new` (the window jumped).
+    """
+    if not new or not new["x"] or last_x is None:
+        return None
+    new_x = new["x"]
+    for idx in range(len(new_x) - 1, -1, -1):  # the held bar is almost always one of the last
+        if new_x[idx] == last_x:
+            break
+    else:
+        return None
+    append = {field: new[field][idx + 1:] for field in CANDLE_FIELDS}
+    x1 = (pd.Timestamp(new_x[-1]) + pd.Timedelta(minutes=tf_minutes)).isoformat()
+    return CandlePatch(
+        drop=max(held_n + len(append["x"]) - len(new_x), 0),
+        append=append,
+        y_range=price_range(new["low"], new["high"]),
+        x0=new_x[0], x1=x1,
+    )
+
+def plan_candle_patch(old: Optional[Candles], new: Optional[Candles], tf_minutes: int) -> Optional[CandlePatch]:
+    """
+    How to turn the `old` candle arrays into `new` by dropping bars on the left
+    and appending on the right. None when that isn't possible (a window that
+    jumped, a bar that changed, fewer bars than before...).
+    """
+    if not old or not new or not old["x"] or not new["x"]:
+        return None
+    try:
+        drop = old["x"].index(new["x"][0])
+    except ValueError:
+        return None
+    overlap = len(old["x"]) - drop
+    if overlap > len(new["x"]):
+        return None
+    for field in CANDLE_FIELDS:
+        if old[field][drop:] != new[field][:overlap]:
+            return None  # history was rewritten, redraw it
+    return plan_catch_up(new, old["x"][-1], len(old["x"]), tf_minutes)
+
+def apply_candle_patch(target, patch: CandlePatch, shape_count: int, marker_traces: List[int]):
+    """
+    Write `patch` into a figure dict or a `dash.Patch()` (only item access,
+    `del [0]` and `.extend()`, which both support). Trace 0 is the candles;
+    every shape and the `marker_traces` (level markers) span the live window.
+    """
+    candle = target["data"][0]
+    for field in CANDLE_FIELDS:
+        for _ in range(patch.drop):
+            del candle[field][0]
+        if patch.append[field]:
+            candle[field].extend(patch.append[field])
+    target["layout"]["yaxis"]["range"] = patch.y_range
+    for i in range(shape_count):
+        target["layout"]["shapes"][i]["x0"] = patch.x0
+        target["layout"]["shapes"][i]["x1"] = patch.x1
+    for i in marker_traces:
+        target["data"][i]["x"] = [patch.x0]
+
+# ───🔹 CACHE ─────────────────────────────
+
+class Frame(NamedTuple):
+    """What a chart's loader returns: the candle arrays plus anything its builder needs."""
+    candles: Optional[Candles]
+    data: object = None
+    tf_minutes: Optional[int] = None  # set by live charts: bars can be appended in place
+    max_bars: Optional[int] = None    # live window length, bars scroll off the left past it
+
+class CacheEntry(NamedTuple):
+    version: tuple
+    figure: dict
+    candles: Optional[Candles]
+    shape_count: int = 0
+    marker_traces: Tuple[int, ...] = ()
+    tf_minutes: Optional[int] = None
+    max_bars: Optional[int] = None
+
+    @property
+    def token(self) -> str:
+        return version_token(self.version)
+
+    def held(self) -> dict:
+        """What a browser showing this figure keeps in its `dcc.Store`."""
+        x = (self.candles or {}).get("x") or []
+        return {"token": self.token, "objects": version_token(self.version[1:]),
+                "last_x": x[-1] if x else None, "n": len(x),
+                "tf_minutes": self.tf_minutes, "max_bars": self.max_bars,
+                "shape_count": self.shape_count, "marker_traces": list(self.marker_traces)}
+
+    def catch_up(self, held: Optional[dict]) -> Optional[CandlePatch]:
+        """The patch that brings a browser's `held` figure to this entry, None if it needs the full figure."""
+        if not held or self.tf_minutes is None or held.get("objects") != version_token(self.version[1:]):
+            return None
+        return plan_catch_up(self.candles, held.get("last_x"), int(held.get("n") or 0), self.tf_minutes)
+
+Loader = Callable[[], Frame]
+Builder = Callable[[Frame], dict]  # -> figure dict (lists, not numpy arrays, in trace 0)
+
+class FigureCache:
+    def __init__(self):
+        self._entries: Dict[str, CacheEntry] = {}
+        self._stats: Dict[str, dict] = {}
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        return self._entries.get(key)
+
+    def invalidate(self, key: Optional[str] = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def refresh(self, key: str, version: tuple, load: Loader, build: Builder) -> CacheEntry:
+        """
+        The chart's entry at `version`: the cached one if nothing changed,
+        else the cached figure with appended bars (live frames, `Frame.tf_minutes`),
+        else a fresh `build()`.
+        """
+        entry = self._entries.get(key)
+        stat = self._stat(key)
+        if entry is not None and entry.version == version:
+            stat["hits"] += 1
+            return entry
+
+        start = time.perf_counter()
+        frame = load()
+        plan = None
+        if frame.tf_minutes is not None and entry is not None and entry.version[1:] == tuple(version)[1:]:
+            plan = plan_candle_patch(entry.candles, frame.candles, frame.tf_minutes)  # objects unchanged
+
+        if plan is not None:
+            figure = copy.deepcopy(entry.figure)
+            apply_candle_patch(figure, plan, entry.shape_count, list(entry.marker_traces))
+            new = entry._replace(version=version, figure=figure, candles=frame.candles)
+            stat["patched"] += 1
+        else:
+            figure = build(frame)
+            shapes = (figure.get("layout") or {}).get("shapes") or []
+            markers = tuple(i for i, trace in enumerate(figure.get("data") or [])
+                            if i and trace.get("type") == "scatter" and trace.get("mode") == "markers")
+            new = CacheEntry(version, figure, frame.candles, len(shapes), markers, frame.tf_minutes, frame.max_bars)
+            stat["rebuilt"] += 1
+
+        stat["last_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self._entries[key] = new
+        return new
+
+    def stats(self) -> dict:
+        """Per chart: cache hits, in-place appends, full rebuilds and the last refresh in ms."""
+        return {key: dict(s) for key, s in sorted(self._stats.items())}
+
+    def _stat(self, key: str) -> dict:
+        return self._stats.setdefault(key, {"hits": 0, "patched": 0, "rebuilt": 0, "last_ms": None})
+
+FIGURES = FigureCache()
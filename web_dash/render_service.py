@@ -0,0 +1,221 @@
+# web_dash/render_service.py, PNG exports on a pool of warm Kaleido workers
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+"""
+`/refresh-chart` used to start an `asyncio.to_thread(update_chart, ...)` per
+closed bar: a full figure rebuild plus `pio.write_image()` every time, three at
+once when 2M/5M/15M close together, and a cold Kaleido (Chromium) start that
+could outlast the 15s read timeout in `main.refresh_chart()`.
+
+Now PNGs are rendered only when something will read them (the zones chart at
+the open, the EOD Discord upload) by a few worker PROCESSES that start Kaleido
+once and keep it warm. Jobs go through one coalescing queue:
+
+    key = (timeframe, chart_type)
+    - a request for a key that is already queued merges into that job (the
+      older request is dropped, every caller gets the one newer PNG)
+    - a key is never rendered twice at the same time; a request that comes in
+      while its key renders is queued behind it
+    - a key that is not dirty (no `mark_dirty()` since its last render) and
+      whose PNG exists is answered from that render, no work at all
+
+Every render reports how long it waited in the queue and how long it took
+(`RenderResult`, `stats()`, `/render-stats`).
+"""
+
+DEFAULT_WORKERS = 2  # bar closes on 3 timeframes coalesce, two warm Chromiums are plenty
+
+Key = Tuple[str, str]  # (timeframe, chart_type)
+RenderFn = Callable[[str, str], Tuple[str, float]]  # -> (png path, seconds spent rendering)
+
+class RenderResult(NamedTuple):
+    timeframe: str
+    chart_type: str
+    path: str
+    queued_s: float   # request -> worker picked it up (0 for cached)
+    render_s: float   # figure build + PNG write inside the worker
+    coalesced: int    # requests merged into this render
+    cached: bool = False
+
+# ───🔹 WORKER SIDE ─────────────────────────────
+
+def warm_worker():
+    """Pool initializer: import plotly/the charts and start Kaleido once per worker."""
+    from web_dash.chart_updater import warm_up
+    warm_up()
+
+def render_png(timeframe: str, chart_type: str) -> Tuple[str, float]:
+    from web_dash.chart_updater import update_chart
+    start = time.perf_counter()
+    out = update_chart(timeframe=timeframe, chart_type=chart_type, notify=False)
+    return str(out), time.perf_counter() - start
+
+def _ping():
+    return True
+
+# ───🔹 SERVICE ─────────────────────────────
+
+class _Job:
+    __slots__ = ("key", "requested", "waiters", "coalesced")
+
+    def __init__(self, key: Key):
+        self.key = key
+        self.requested = time.perf_counter()
+        self.waiters: List[asyncio.Future] = []
+        self.coalesced = 0
+
+class RenderService:
+    def __init__(self, render: RenderFn = render_png, workers: int = DEFAULT_WORKERS,
+                 executor_factory: Optional[Callable[[int], Executor]] = None):
+        self.render_fn = render
+        self.workers = workers
+        self._executor_factory = executor_factory or _warm_process_pool
+        self._executor: Optional[Executor] = None
+        self._dispatchers: List[asyncio.Task] = []
+        self._pending: Dict[Key, _Job] = {}  # insertion order = queue order
+        self._running: Set[Key] = set()
+        self._dirty: Set[Key] = set()
+        self._last: Dict[Key, RenderResult] = {}
+        self._stats: Dict[Key, dict] = {}
+        self._ready: Optional[asyncio.Event] = None
+        self._warming: Optional[asyncio.Future] = None
+
+    # ───🔹 LIFECYCLE ─────────────────────────────
+
+    async def start(self):
+        if self._dispatchers:
+            return
+        self._ready = asyncio.Event()
+        self._executor = self._executor_factory(self.workers)
+        self._dispatchers = [asyncio.create_task(self._dispatch(), name=f"RenderWorker-{i}") for i in range(self.workers)]
+        # Start every worker (and its Kaleido) now, not on the first render
+        loop = asyncio.get_running_loop()
+        self._warming = asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)),
+                                       return_exceptions=True)
+
+    async def stop(self):
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        for job in self._pending.values():
+            for waiter in job.waiters:
+                if not waiter.done():
+                    waiter.cancel()
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ───🔹 REQUESTS ─────────────────────────────
+
+    def mark_dirty(self, timeframe: str, chart_type: str = "live"):
+        """The chart's data changed (a bar closed); its next `render()` draws it again."""
+        self._dirty.add((timeframe, chart_type))
+
+    def is_dirty(self, timeframe: str, chart_type: str = "live") -> bool:
+        key = (timeframe, chart_type)
+        last = self._last.get(key)
+        return key in self._dirty or last is None or not Path(last.path).exists()
+
+    def submit(self, timeframe: str, chart_type: str = "live") -> asyncio.Future:
+        """Queue a render (merged into the queued job for the same chart, if any); resolves to a `RenderResult`."""
+        if self._ready is None:
+            raise RuntimeError("RenderService.start() has not been awaited")
+        key = (timeframe, chart_type)
+        job = self._pending.get(key)
+        if job is None:
+            job = self._pending[key] = _Job(key)
+        else:
+            job.coalesced += 1
+            self._stat(key)["dropped"] += 1
+        waiter = asyncio.get_running_loop().create_future()
+        job.waiters.append(waiter)
+        self._ready.set()
+        return waiter
+
+    async def render(self, timeframe: str, chart_type: str = "live", force: bool = False) -> RenderResult:
+        """The chart's PNG, rendered only if it is dirty (or `force`)."""
+        if not force and not self.is_dirty(timeframe, chart_type):
+            return self._last[(timeframe, chart_type)]._replace(queued_s=0.0, render_s=0.0, coalesced=0, cached=True)
+        return await self.submit(timeframe, chart_type)
+
+    def stats(self) -> dict:
+        """Per chart: renders, dropped (coalesced) requests and queue/render latency in ms."""
+        return {f"{tf}/{chart_type}": dict(s) for (tf, chart_type), s in sorted(self._stats.items())}
+
+    def queued(self) -> List[Key]:
+        return list(self._pending)
+
+    # ───🔹 DISPATCH ─────────────────────────────
+
+    def _next_job(self) -> Optional[_Job]:
+        for key in self._pending:
+            if key not in self._running:
+                return self._pending.pop(key)
+        return None
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            self._running.add(job.key)
+            self._dirty.discard(job.key)  # a bar closing from here on makes it dirty again
+            started = time.perf_counter()
+            try:
+                path, render_s = await loop.run_in_executor(self._executor, self.render_fn, *job.key)
+            except asyncio.CancelledError:
+                for waiter in job.waiters:
+                    waiter.cancel()
+                raise
+            except Exception as e:
+                self._dirty.add(job.key)
+                if isinstance(e, BrokenProcessPool):
+                    print(f"[render] worker pool broke ({e}), starting a new one")
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = self._executor_factory(self.workers)
+                for waiter in job.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            else:
+                result = RenderResult(job.key[0], job.key[1], path, started - job.requested, render_s, job.coalesced)
+                self._last[job.key] = result
+                self._record(result)
+                for waiter in job.waiters:
+                    if not waiter.done():
+                        waiter.set_result(result)
+            finally:
+                self._running.discard(job.key)
+                self._ready.set()  # a request for this key may be waiting behind it
+
+    def _stat(self, key: Key) -> dict:
+        return self._stats.setdefault(key, {"renders": 0, "dropped": 0, "last_queued_ms": None,
+                                            "last_render_ms": None, "max_render_ms": None})
+
+    def _record(self, result: RenderResult):
+        stat = self._stat((result.timeframe, result.chart_type))
+        render_ms = round(result.render_s * 1000, 1)
+        stat["renders"] += 1
+        stat["last_queued_ms"] = round(result.queued_s * 1000, 1)
+        stat["last_render_ms"] = render_ms
+        stat["max_render_ms"] = max(stat["max_render_ms"] or 0, render_ms)
+        print(f"[render] {result.timeframe}/{result.chart_type}: {render_ms} ms render, "
+              f"{stat['last_queued_ms']} ms queued, {result.coalesced} request(s) merged")
+
+def _warm_process_pool(workers: int) -> Executor:
+    # spawn: a fresh interpreter per worker, nothing inherited from the server's event loop or threads
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=warm_worker)
+
+RENDERS = RenderService()
@@ -0,0 +1,129 @@
+# web_dash/ws_hub.py, one websocket per browser, topic subscriptions and per-client send queues
+from __future__ import annotations
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+import pandas as pd
+
+"""
+Every Dash tab used to open its own websocket and every connection got every
+`chart:<tf>` cue, sent by `/refresh-chart` in a sequential `await ws.send_text`
+loop, so one slow browser held up the broadcast for all the others.
+
+Now a browser opens ONE socket and names the topics it wants:
+
+    ws://127.0.0.1:8000/ws/chart-updates?topics=zones,2M,5M,15M
+    (later: {"subscribe": ["orders"]} / {"unsubscribe": ["5M"]} on the socket)
+
+    topics: the TIMEFRAMES ("2M", "5M", "15M"), "zones", "orders"
+
+`publish()` never awaits a socket: it puts the message on each subscribed
+client's bounded queue (full → the oldest message is dropped, like
+`utils/event_bus.py`) and every client has its own sender task, so the
+fan-out is concurrent and a stuck client only falls behind itself. A client
+whose send takes longer than `SEND_TIMEOUT` is disconnected.
+
+Messages are JSON, `{"topic": .., "kind": .., ...}`:
+    {"topic": "2M", "kind": "bar", "bar": {"x": "2025-09-02T09:32:00", "open": ..}}
+        a closed bar, already in chart coordinates (naive ET), so the browser
+        appends it without asking the Dash server
+    {"topic": "zones", "kind": "refresh"}     data changed, re-read it
+"""
+
+DEFAULT_MAXSIZE = 32
+SEND_TIMEOUT = 5.0
+CHART_TZ = "America/New_York"  # charts plot naive ET (`web_dash/charts/live_chart.py`)
+STORAGE_TZ = "America/Chicago"  # naive timestamps are market-local, like `storage.viewport`
+
+Send = Callable[[str], Awaitable[None]]
+
+def parse_topics(raw: Optional[str]) -> Set[str]:
+    """`"zones, 2M,5M"` → {"zones", "2M", "5M"}; timeframes are upper-cased."""
+    if not raw:
+        return set()
+    return {t.strip() if t.strip().lower() in ("zones", "orders") else t.strip().upper()
+            for t in raw.split(",") if t.strip()}
+
+def bar_payload(candle: dict) -> dict:
+    """A closed candle as the live chart plots it (x = bar open in naive ET, ms precision)."""
+    ts = pd.Timestamp(candle["timestamp"])
+    ts = ts.tz_localize(STORAGE_TZ) if ts.tzinfo is None else ts
+    x = ts.tz_convert(CHART_TZ).tz_localize(None).floor("ms")  # storage keeps epoch ms
+    return {"x": x.isoformat(), **{k: float(candle[k]) for k in ("open", "high", "low", "close")}}
+
+# ───🔹 CLIENTS ─────────────────────────────
+
+class Client:
+    def __init__(self, hub: "Hub", send: Send, topics: Iterable[str], name: str, maxsize: int):
+        self.hub = hub
+        self.send = send
+        self.topics: Set[str] = set(topics)
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.sent = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def offer(self, text: str):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(text)
+
+    async def _pump(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await asyncio.wait_for(self.send(text), SEND_TIMEOUT)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[ws] dropping client {self.name}: {type(e).__name__} {e}")
+            self.hub.clients.discard(self)
+
+class Hub:
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.clients: Set[Client] = set()
+
+    def connect(self, send: Send, topics: Iterable[str] = (), name: str = "") -> Client:
+        """Register a socket's `send` coroutine; starts its sender task (call on the event loop)."""
+        client = Client(self, send, topics, name, self.maxsize)
+        client.task = asyncio.create_task(client._pump(), name=f"ws-send-{name}")
+        self.clients.add(client)
+        return client
+
+    async def disconnect(self, client: Client):
+        self.clients.discard(client)
+        if client.task is not None:
+            client.task.cancel()
+            await asyncio.gather(client.task, return_exceptions=True)
+
+    def handle(self, client: Client, text: str):
+        """A message from the browser: `{"subscribe": [..]}` and/or `{"unsubscribe": [..]}`."""
+        try:
+            msg = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(msg, dict):
+            return
+        client.topics |= parse_topics(",".join(msg.get("subscribe") or []))
+        client.topics -= parse_topics(",".join(msg.get("unsubscribe") or []))
+
+    def publish(self, topic: str, kind: str = "refresh", **data) -> int:
+        """Queue `{"topic", "kind", **data}` for every client subscribed to `topic` (never blocks)."""
+        text = json.dumps({"topic": topic, "kind": kind, **data})
+        delivered = 0
+        for client in list(self.clients):
+            if topic in client.topics:
+                client.offer(text)
+                delivered += 1
+        return delivered
+
+    def stats(self) -> Dict[str, dict]:
+        return {c.name: {"topics": sorted(c.topics), "queued": c.queue.qsize(), "sent": c.sent, "dropped": c.dropped}
+                for c in self.clients}
+
+HUB = Hub()
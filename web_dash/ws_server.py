@@ -1,46 +1,50 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.responses import JSONResponse
-from typing import List
-import asyncio
+from contextlib import asynccontextmanager
+import json
+from web_dash.render_service import RENDERS
+from web_dash.ws_hub import HUB, bar_payload, parse_topics
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await RENDERS.start()  # warm Kaleido workers, PNGs are rendered on `/render-chart` only
+    try:
+        yield
+    finally:
+        await RENDERS.stop()
 
-# Store active WebSocket connections
-# clients: List[WebSocket] = []
-clients = set()
-#clients: set[WebSocket] = set() # top-level
+app = FastAPI(lifespan=lifespan)
+
+# One socket per browser, fan-out through per-client queues (`web_dash/ws_hub.py`)
+DEFAULT_TOPICS = "zones,2M,5M,15M"
 
 @app.websocket("/ws/chart-updates")
 async def chart_updates(websocket: WebSocket):
     await websocket.accept()
-    clients.add(websocket)
-    try: # Send one “kick” per TF so Dash callbacks render right away
-        for tf in ["2M", "5M", "15M", "zones"]:
-            await websocket.send_text(f"chart:{tf}")
+    topics = parse_topics(websocket.query_params.get("topics") or DEFAULT_TOPICS)
+    peer = websocket.client
+    client = HUB.connect(websocket.send_text, topics, name=f"{peer.host}:{peer.port}" if peer else "")
+    try:
+        # One refresh per chart topic so the open tab catches up right away (also after a reconnect)
+        for topic in sorted(client.topics - {"orders"}):
+            client.offer(json.dumps({"topic": topic, "kind": "refresh"}))
         while True:
-            await asyncio.sleep(60*60)  # keepalive
+            HUB.handle(client, await websocket.receive_text())  # subscribe/unsubscribe
     except WebSocketDisconnect:
-        clients.discard(websocket)
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
-        clients.discard(websocket)
+    finally:
+        await HUB.disconnect(client)
 
 @app.post("/trigger-chart-update")
 async def trigger_chart_update(data: dict):
     tfs = data.get("timeframes") or data.get("timeframe") or ["2M"]
     if isinstance(tfs, str):
         tfs = [tfs]
-    dead = set()
-    for ws in list(clients): # snapshot
-        for tf in tfs:
-            try:
-                await ws.send_text(f"chart:{tf}")
-            except Exception:
-                dead.add(ws)
-                break
-    for ws in dead:
-        clients.discard(ws)
-    return JSONResponse({"status":"broadcasted","timeframes":tfs,"clients":len(clients)})
+    for tf in tfs:
+        HUB.publish(tf)
+    return JSONResponse({"status": "broadcasted", "timeframes": tfs, "clients": len(HUB.clients)})
 
 @app.post("/refresh-chart")
 async def refresh_chart(req: Request):
@@ -48,23 +52,49 @@ async def refresh_chart(req: Request):
     timeframe  = data.get("timeframe", "2M")
     chart_type = data.get("chart_type", "live")  # "live" or "zones"
 
-    # 1) Broadcast first so UI updates immediately
-    tfs = ["zones"] if chart_type == "zones" else [timeframe]
-    dead = set()
-    for ws in list(clients):           # snapshot
-        for tf in tfs:
-            try:
-                await ws.send_text(f"chart:{tf}")
-            except Exception:
-                dead.add(ws)
-                break
-    for ws in dead:
-        clients.discard(ws)
+    # 1) Queue for subscribers (returns at once); a closed bar travels with the message
+    topic = "zones" if chart_type == "zones" else timeframe
+    if chart_type == "live" and data.get("bar"):
+        HUB.publish(topic, "bar", bar=bar_payload(data["bar"]))
+    else:
+        HUB.publish(topic)
+
+    # 2) No PNG here; mark it stale so the next `/render-chart` (a consumer needs the file) draws it
+    RENDERS.mark_dirty(timeframe, chart_type)
+
+    return JSONResponse({"status": "broadcast", "timeframes": [topic], "clients": len(HUB.clients)})
+
+@app.post("/publish")
+async def publish(data: dict):
+    """Any other topic (e.g. {"topic": "orders", "kind": "filled", "order": {...}}) to its subscribers."""
+    topic = data.get("topic")
+    if not topic:
+        return JSONResponse({"status": "failed", "error": "missing topic"}, status_code=400)
+    extra = {k: v for k, v in data.items() if k not in ("topic", "kind")}
+    return JSONResponse({"status": "queued", "clients": HUB.publish(topic, data.get("kind", "update"), **extra)})
+
+@app.get("/ws-stats")
+async def ws_stats():
+    return JSONResponse({"clients": HUB.stats()})
 
-    # 2) Save PNG in the background (non-blocking)
-    async def _save():
-        from web_dash.chart_updater import update_chart
-        await asyncio.to_thread(update_chart, timeframe=timeframe, chart_type=chart_type, notify=False)
-    asyncio.create_task(_save())
+@app.post("/render-chart")
+async def render_chart(req: Request):
+    """Render (or reuse, if nothing changed) a chart's PNG and answer once the file is written."""
+    data = await req.json()
+    timeframe  = data.get("timeframe", "2M")
+    chart_type = data.get("chart_type", "live")  # "live" or "zones"
+    try:
+        result = await RENDERS.render(timeframe, chart_type, force=bool(data.get("force", False)))
+    except Exception as e:
+        return JSONResponse({"status": "failed", "error": str(e)}, status_code=500)
+    return JSONResponse({
+        "status": "cached" if result.cached else "rendered",
+        "path": result.path,
+        "queued_ms": round(result.queued_s * 1000, 1),
+        "render_ms": round(result.render_s * 1000, 1),
+        "coalesced": result.coalesced,
+    })
 
-    return JSONResponse({"status": "saved-and-broadcast", "timeframes": tfs, "clients": len(clients)})
+@app.get("/render-stats")
+async def render_stats():
+    return JSONResponse({"queued": [f"{tf}/{ct}" for tf, ct in RENDERS.queued()], "charts": RENDERS.stats()})